@@ -1,20 +1,77 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from config import Config
+from db import DATABASE_READ_URL
+from src.core.auth import token_cache
+from src.core.compression import CompressionMiddleware
+from src.core.consistency import ReadYourWritesMiddleware
+from src.core.metrics import RequestMetricsMiddleware, render_prometheus
+from src.core.rate_limit import RateLimitMiddleware
+from src.core.responses import NegotiatedResponse, NegotiationMiddleware
+from src.core.static_files import static_files
+from models.cache_model import listen_for_invalidations, sweep_cache
+from models.role_model import Role
+from models.contact_filter import reconcile_contact_filter
+from controllers.data_controller import watch_data_files
 from routes.admin_routes import admin_router
 from routes.credit_routes import credit_router
 from routes.user_routes import user_router
 from routes.auth_routes import auth_router
 from routes.website_routes import website_router
 from routes.data_routes import data_router
+from routes.referral_routes import referral_router
 
 ADMIN_PATH = os.getenv("ADMIN_PORTAL") or "/admin"
+# /metrics exposes route latencies, pool saturation and the admin portal path: it needs
+# "Authorization: Bearer <METRICS_TOKEN>" for scrapers, or an admin access token
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start per-worker background tasks and stop them on shutdown"""
+    if not METRICS_TOKEN:
+        logger.warning("METRICS_TOKEN is not set, so /metrics only answers admin access tokens")
+    stop_event = asyncio.Event()
+    tasks = [
+        asyncio.create_task(reconcile_contact_filter()),
+        asyncio.create_task(sweep_cache()),
+        asyncio.create_task(listen_for_invalidations()),
+    ]
+    watchers = [
+        asyncio.create_task(watch_data_files(stop_event)),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    # file watchers run in a thread and must be stopped, not cancelled
+    stop_event.set()
+    await asyncio.gather(*watchers, return_exceptions=True)
 
 # initialize FastAPI app
-app = FastAPI(title="Taqneeq Backend API")
+# orjson (or MessagePack for `Accept: application/msgpack`) for every response;
+# routes with a response_model also skip jsonable_encoder
+app = FastAPI(title="Taqneeq Backend API", lifespan=lifespan, default_response_class=NegotiatedResponse)
+
+# throttle OTP and lookup endpoints before they reach the database
+app.add_middleware(RateLimitMiddleware)
+
+# gzip/brotli for large JSON and HTML bodies
+app.add_middleware(CompressionMiddleware)
+
+# JSON or MessagePack, from the Accept header
+app.add_middleware(NegotiationMiddleware)
+
+# with a read replica, keep a client that just wrote on the primary for a few seconds
+if DATABASE_READ_URL:
+    app.add_middleware(ReadYourWritesMiddleware)
 
 # enable CORS
 app.add_middleware(
@@ -25,8 +82,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# outermost, so request latency covers every other middleware
+app.add_middleware(RequestMetricsMiddleware)
+
+# mount static files (served from memory, precompressed)
+app.mount("/static", static_files, name="static")
 
 # register routers
 app.include_router(website_router, prefix=ADMIN_PATH, tags=["website"])
@@ -35,27 +95,60 @@ app.include_router(credit_router, tags=["credits"])
 app.include_router(user_router, prefix="/user", tags=["users"])
 app.include_router(auth_router, tags=["auth"])
 app.include_router(data_router, tags=["data"])
+app.include_router(referral_router, prefix="/referrals", tags=["referrals"])
 
 @app.get('/health')
 async def health():
     """Health check endpoint"""
     try:
         # Check database connectivity
-        from db import SessionLocal
+        from db import HealthSessionLocal
         from sqlalchemy import text
-        db = SessionLocal()
+        # its own one-connection pool, so it reports the database and not how busy the other pools are
+        db = HealthSessionLocal()
         db.execute(text("SELECT 1"))
         db.close()
         database_status = "connected"
     except Exception:
         database_status = "disconnected"
-    
+
+    from src.core.metrics import POOL_METRICS
+    # a saturated pool means its routes are queueing for connections or answering 503
+    pools, saturated = {}, []
+    for name, metrics in POOL_METRICS.items():
+        pool = metrics.engine.pool
+        pools[name] = {"checked_out": pool.checkedout(), "capacity": metrics.capacity, "rejected": pool.rejected}
+        # the health pool is full whenever two probes overlap, which is not an outage
+        if name != "health" and metrics.saturated():
+            saturated.append(name)
+
     return {
-        "status": "healthy",
+        "status": "degraded" if saturated else "healthy",
         "version": "1.0.0",
-        "database": database_status
+        "database": database_status,
+        "pools": pools,
+        "saturated_pools": saturated
     }
 
+def _metrics_authorized(authorization: str) -> bool:
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    if METRICS_TOKEN and secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        return True
+    try:
+        claims = token_cache.verify(token)
+    except HTTPException:
+        return False
+    return claims.get("role") == Role.ADMIN.value
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics(request: Request):
+    """Request and connection pool metrics in the Prometheus text format"""
+    if not _metrics_authorized(request.headers.get("authorization", "")):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get('/')
 async def home():
     """Root endpoint - returns API info"""
@@ -71,8 +164,10 @@ async def home():
 @app.get('/sitemap.xml')
 @app.get('/security.txt')
 async def static_from_root(request: Request):
-    filename = request.url.path[1:]
-    return FileResponse(f"static/{filename}")
+    response = static_files.serve(request, request.url.path[1:], cache_control="public, max-age=86400")
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return response
 
 if __name__ == '__main__':
     import uvicorn
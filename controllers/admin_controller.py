@@ -1,8 +1,11 @@
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from models.role_model import Role
-from models.user_model import User
+from models.user_model import User, profile_cache
 from models.database import UserDB
+from models.contact_filter import contact_filter
+from src.core.invalidation import invalidations
+from src.core.metrics import pool_snapshot
 import base64
 import os
 
@@ -15,9 +18,15 @@ def auth_middleware(token: str):
     if token != os.getenv('ADMIN_PASSWORD'):
         raise HTTPException(status_code=401, detail="Unauthorized: Invalid Credentials")
 
-async def get_all_users(db: Session):
+async def get_all_users(db: Session, role: str = None):
     try:
-        users = db.query(UserDB).all()
+        query = db.query(UserDB)
+        if role:
+            try:
+                query = query.filter(UserDB.role == Role(role.upper()).value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid role")
+        users = query.all()
         user_list = []
         for user in users:
             user_list.append({
@@ -26,6 +35,8 @@ async def get_all_users(db: Session):
                 "credits": user.credits or 0,
             })
         return user_list
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -73,18 +84,24 @@ async def remove_user(user_id: str, db: Session):
         
         db.delete(user)
         db.commit()
+        contact_filter.note_removed()
         return {"message": "User removed successfully"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-async def change_user_role(admin_id: str, target_user_id: str, new_role: str, db: Session):
+async def change_user_role(admin_id: str, target_user_id: str, new_role: str, db: Session, claims: dict = None):
     try:
-        admin_user = User.get_by_id(admin_id, db)
-        if not admin_user or admin_user.role != Role.ADMIN:
-            raise HTTPException(status_code=403, detail="Unauthorized")
+        if claims is not None:
+            # authorize from the verified token instead of loading the admin row
+            if claims["role"] != Role.ADMIN.value:
+                raise HTTPException(status_code=403, detail="Unauthorized")
+        else:
+            admin_user = User.get_by_id(admin_id, db)
+            if not admin_user or admin_user.role != Role.ADMIN:
+                raise HTTPException(status_code=403, detail="Unauthorized")
         
-        target_user = User.get_by_id(target_user_id, db)
-        if not target_user:
+        db_user = db.query(UserDB).filter(UserDB.unique_id == target_user_id).first()
+        if not db_user:
             raise HTTPException(status_code=404, detail="User not found")
         
         try:
@@ -92,7 +109,6 @@ async def change_user_role(admin_id: str, target_user_id: str, new_role: str, db
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid role")
         
-        db_user = db.query(UserDB).filter(UserDB.unique_id == target_user_id).first()
         db_user.role = new_role_enum.value
         db.commit()
         
@@ -108,3 +124,9 @@ async def change_user_role(admin_id: str, target_user_id: str, new_role: str, db
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
+
+async def get_cache_stats():
+    return {"profile": profile_cache.stats(), "invalidations": invalidations.stats()}
+
+async def get_pool_metrics():
+    return pool_snapshot()
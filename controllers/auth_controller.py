@@ -2,8 +2,11 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from models.user_model import User
 from models.database import PhoneAuthDB, UserDB
+from models.contact_filter import contact_filter
+from models.referral_model import claim_referral_slot
 from datetime import datetime, timedelta, timezone
 from utils import send_otp
+from src.core.token import create_access_token, create_refresh_token
 import base64
 from dotenv import load_dotenv
 import os
@@ -12,6 +15,14 @@ load_dotenv()
 
 TEST_PHONE = os.getenv('TEST_PHONE_NUMBER') or '7777777777'
 TEST_OTP = os.getenv('TEST_OTP') or '123456'
+MAX_VERIFY_ATTEMPTS = int(os.getenv('MAX_VERIFY_ATTEMPTS', 5))
+
+def issue_tokens(unique_id: str, role: str) -> dict:
+    return {
+        "access_token": create_access_token(unique_id, role),
+        "refresh_token": create_refresh_token(unique_id),
+        "token_type": "bearer"
+    }
 
 async def send_verification_code(phone_data: dict, db: Session):
     try:
@@ -104,6 +115,10 @@ async def verify_code(verify_data: dict, db: Session):
         if phone_auth.verified:
             raise HTTPException(status_code=400, detail="Code already verified")
 
+        # Lock the verification once too many wrong codes were tried
+        if (phone_auth.attempts or 0) >= MAX_VERIFY_ATTEMPTS:
+            raise HTTPException(status_code=429, detail="Too many attempts, request a new code")
+
         # Check if the code has expired 
         if phone_auth.expires_at < datetime.now(timezone.utc):
             raise HTTPException(status_code=400, detail="Verification code has expired")
@@ -114,6 +129,10 @@ async def verify_code(verify_data: dict, db: Session):
 
         # Verify code
         if phone_auth.otp != verification_code:
+            db.query(PhoneAuthDB).filter(
+                PhoneAuthDB.verification_id == verification_id
+            ).update({PhoneAuthDB.attempts: PhoneAuthDB.attempts + 1}, synchronize_session=False)
+            db.commit()
             raise HTTPException(status_code=400, detail="Invalid verification code")
 
         token = base64.b64encode((phone_number+"::"+verification_id).encode('utf-8')).decode('utf-8')
@@ -124,7 +143,9 @@ async def verify_code(verify_data: dict, db: Session):
         phone_auth.token = token
         db.commit()
 
-        # Check if user exists
+        # Check if user exists. Always asked of the database: the contact filter
+        # can lag behind another worker's write, and a wrong miss here would
+        # send an existing user down the signup path
         user = db.query(UserDB).filter(UserDB.phone_number == phone_number).first()
 
         if user:
@@ -141,7 +162,8 @@ async def verify_code(verify_data: dict, db: Session):
             }
             return {
                 "message": "User found",
-                "user": user_data
+                "user": user_data,
+                **issue_tokens(user.unique_id, user.role)
             }
 
         return {
@@ -173,7 +195,7 @@ async def create_user_by_token(user_data: dict, db: Session):
                 credits=user_points
             )
             user.save(db)
-            return {"message": "Test user added successfully", "user": user.to_dict()}
+            return {"message": "Test user added successfully", "user": user.to_dict(), **issue_tokens(user.unique_id, user.role.value)}
         # TEST USER CREATION END
 
         token_decoded = base64.b64decode(token).decode('utf-8')
@@ -193,11 +215,6 @@ async def create_user_by_token(user_data: dict, db: Session):
             if not referrer:
                 raise HTTPException(status_code=400, detail="Invalid referral code")
                 
-            # Check if referrer has reached the limit
-            current_referrals = referrer.referrals or []
-            if len(current_referrals) >= 5:
-                raise HTTPException(status_code=400, detail="Referral limit reached for this code")
-                
             user_points += 20
             
             # Create new user with referrer's ID
@@ -209,17 +226,18 @@ async def create_user_by_token(user_data: dict, db: Session):
                 credits=user_points,
                 referred_by=[referrer.unique_id]
             )
+
+            # Claim one of the referrer's slots, committed together with the new user
+            if not claim_referral_slot(referrer.unique_id, newUser.unique_id, db):
+                db.rollback()
+                raise HTTPException(status_code=400, detail="Referral limit reached for this code")
             newUser.save(db)
             
-            # Update referrer's credits and referrals
+            # Update referrer's credits
             referrer_user = User.get_by_id(referrer.unique_id, db)
             referrer_user.update_credits(20, "Referral bonus", first_name + " " + last_name, db)
             
-            # Update referral count
-            referrer.referrals = current_referrals + [newUser.unique_id]
-            db.commit()
-            
-            return {"message": "User added successfully with referral", "user": newUser.to_dict()}
+            return {"message": "User added successfully with referral", "user": newUser.to_dict(), **issue_tokens(newUser.unique_id, newUser.role.value)}
         
         else:
             newUser = User(
@@ -231,7 +249,7 @@ async def create_user_by_token(user_data: dict, db: Session):
             )
             newUser.save(db)
 
-            return {"message": "User added successfully without referral", "user": newUser.to_dict()}
+            return {"message": "User added successfully without referral", "user": newUser.to_dict(), **issue_tokens(newUser.unique_id, newUser.role.value)}
     except HTTPException:
         raise
     except Exception as e:
@@ -244,6 +262,10 @@ async def search_user_by_email(email_data: dict, db: Session):
         if not email:
             raise HTTPException(status_code=400, detail="Email is required")
 
+        # Definite misses are answered without touching the database
+        if not contact_filter.might_have_email(email):
+            return {"message": "Email is available", "user_exists": False}
+
         user = db.query(UserDB).filter(UserDB.email == email).first()
 
         if user:
@@ -276,6 +298,10 @@ async def search_user_by_phone(phone_data: dict, db: Session):
         if not phone:
             raise HTTPException(status_code=400, detail="Phone is required")
 
+        # Definite misses are answered without touching the database
+        if not contact_filter.might_have_phone(phone):
+            return {"message": "Phone is available", "user_exists": False}
+
         user = db.query(UserDB).filter(UserDB.phone_number == phone).first()
 
         if user:
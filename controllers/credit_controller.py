@@ -2,11 +2,49 @@ from fastapi import HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from models.role_model import Role
-from models.user_model import User
-from models.database import UserDB, CacheDB
+from models.user_model import TRANSACTION_FIELDS, User, parse_fields
+from models.cache_model import cache
+from models.database import UserDB
+from src.core.cache import MISSING, MemoryCache
+from src.core.invalidation import invalidations
 import time
 
-async def allocate_points(points_data: dict, db: Session):
+# Rankings are cached for LEADERBOARD_CACHE_TTL seconds; the route allows limit up to LEADERBOARD_SIZE
+LEADERBOARD_SIZE = 50
+LEADERBOARD_CACHE_TTL = 45
+
+def evict_leaderboard(key: str):
+    """
+    Drop the cached rankings only when the change in a 'leaderboard' event
+    (see leaderboard_event_key) can show on them: a listed user changed or
+    was deleted, or an unlisted one now ranks above the cutoff. Credits
+    change all the time, and most of those changes are far below the top.
+    """
+    credits, _, unique_id = key.partition('|')
+    if not unique_id:
+        # no details (the plain 'leaderboard' key), so assume the worst
+        cache.delete('leaderboard')
+        return
+    cached = cache.get('leaderboard')
+    if cached is MISSING:
+        return
+    rankings = cached['rankings']
+    if any(entry['id'] == unique_id for entry in rankings):
+        cache.delete('leaderboard')
+    elif credits == '':
+        return  # an unlisted user was deleted
+    elif len(rankings) < LEADERBOARD_SIZE:
+        cache.delete('leaderboard')
+    else:
+        cutoff = rankings[-1]
+        # same order as the query: credits descending, then unique_id
+        if (-int(credits), unique_id) < (-cutoff['credits'], cutoff['id']):
+            cache.delete('leaderboard')
+
+# after missed events only a per-worker cache needs emptying; a shared one was evicted by the writer
+invalidations.subscribe('leaderboard', evict_leaderboard, cache.clear if isinstance(cache, MemoryCache) else lambda: None)
+
+async def allocate_points(points_data: dict, db: Session, claims: dict = None):
     """Allocate points with atomic transaction and row-level locking"""
     try:
             # extract the current user (who is allocating the points) and the target user
@@ -17,53 +55,53 @@ async def allocate_points(points_data: dict, db: Session):
             if points <= 0:
                 raise HTTPException(status_code=400, detail="Points must be positive")
 
-            # Fetch current user with row-level lock
-            current_user_db = db.query(UserDB).with_for_update().filter(
-                UserDB.unique_id == current_user_id
-            ).first()
-
-            if not current_user_db:
-                raise HTTPException(status_code=404, detail="Current user not found")
+            if claims is not None:
+                # the verified token already carries the caller's id and role
+                if current_user_id and current_user_id != claims["user_id"]:
+                    raise HTTPException(status_code=403, detail="Unauthorized: current_user_id does not match token")
+                current_user_id = claims["user_id"]
+                current_role = Role(claims["role"])
+            else:
+                current_role = None
 
-            # Convert to User model
-            current_user = User.get_by_id(current_user_id, db)
-            if not current_user:
-                raise HTTPException(status_code=404, detail="Current user not found")
+            # lock every row this allocation changes in one query: the target,
+            # and the current user too unless the token says they are an ADMIN
+            # (a SALES balance is deducted below, and the row's role wins over a stale token)
+            current_user = None
+            if current_role is None or current_role == Role.SALES:
+                users = User.lock_by_ids([current_user_id, target_user_id], db)
+                current_user = users.get(current_user_id)
+                if not current_user:
+                    raise HTTPException(status_code=404, detail="Current user not found")
+                current_role = current_user.role
+            else:
+                users = User.lock_by_ids([target_user_id], db)
 
             # check if the current user has the proper role (SALES or ADMIN)
-            if current_user.role not in [Role.SALES, Role.ADMIN]:
+            if current_role not in [Role.SALES, Role.ADMIN]:
                 raise HTTPException(status_code=403, detail="Unauthorized: Only SALES or ADMIN can allocate points")
 
             # ensure the user is not allocating points to themselves
             if current_user_id == target_user_id:
                 raise HTTPException(status_code=400, detail="You cannot allocate points to yourself")
 
-            # Fetch target user with row-level lock
-            target_user_db = db.query(UserDB).with_for_update().filter(
-                UserDB.unique_id == target_user_id
-            ).first()
-
-            if not target_user_db:
-                raise HTTPException(status_code=404, detail="Target user not found")
-            
-            # Convert to User model
-            target_user = User.get_by_id(target_user_id, db)
+            target_user = users.get(target_user_id)
             if not target_user:
                 raise HTTPException(status_code=404, detail="Target user not found")
-            
+
             # Handle SALES balance deduction atomically
-            if current_user.role == Role.SALES:
+            if current_role == Role.SALES:
                 if current_user.balance < points:
                     raise HTTPException(status_code=400, detail="Insufficient balance to allocate points")
                 current_user.balance -= points
-                current_user.save(db)
+                current_user.save(db, commit=False)
 
             # allocate points to the target user
-            target_user.update_credits(points, "ALLOCATE", current_user_id, db)
+            target_user.update_credits(points, "ALLOCATE", current_user_id, db, commit=False)
 
-            # Commit transaction
+            # Commit both changes together, releasing the locks
             db.commit()
-            
+
             return {"message": f"Points successfully allocated to user {target_user_id}"}
 
     except HTTPException:
@@ -84,15 +122,7 @@ async def redeem_points(redeem_data: dict, db: Session):
                 raise HTTPException(status_code=400, detail="Points must be positive")
 
             # Fetch user with row-level lock to prevent race conditions
-            user_db = db.query(UserDB).with_for_update().filter(
-                UserDB.unique_id == current_user_id
-            ).first()
-
-            if not user_db:
-                raise HTTPException(status_code=404, detail="User not found")
-
-            # Convert to User model
-            current_user = User.get_by_id(current_user_id, db)
+            current_user = User.lock_by_ids([current_user_id], db).get(current_user_id)
             if not current_user:
                 raise HTTPException(status_code=404, detail="User not found")
 
@@ -102,11 +132,11 @@ async def redeem_points(redeem_data: dict, db: Session):
                 raise HTTPException(status_code=400, detail="Insufficient credits to redeem")
 
             # redeem the points (deduct them from user's credits)
-            current_user.update_credits(-points, "REDEEM", current_user_id, db)
+            current_user.update_credits(-points, "REDEEM", current_user_id, db, commit=False)
 
             # Commit transaction
             db.commit()
-            
+
             return {"message": "Points redeemed successfully"}
 
     except HTTPException:
@@ -118,7 +148,7 @@ async def redeem_points(redeem_data: dict, db: Session):
 
 async def transaction_history(user_id: str, db: Session, page: int = 1, limit: int = 20, 
                               transaction_type: str = None, start_date: str = None, 
-                              end_date: str = None, format: str = "json"):
+                              end_date: str = None, format: str = "json", fields: str = None):
     """Get transaction history with pagination, filtering, and CSV export"""
     try:
         from datetime import datetime
@@ -126,14 +156,15 @@ async def transaction_history(user_id: str, db: Session, page: int = 1, limit: i
         from io import StringIO
         from fastapi.responses import Response
         
-        # fetch user from the database
-        user = User.get_by_id(user_id, db)
+        # only the history column is needed, not the whole user
+        row = db.query(UserDB.transaction_history).filter(UserDB.unique_id == user_id).first()
 
-        if not user:
+        if row is None:
             raise HTTPException(status_code=404, detail="User not found")
 
         # Get transaction history
-        transactions = user.transaction_history or []
+        transactions = row.transaction_history or []
+        selected = parse_fields(fields, TRANSACTION_FIELDS) if fields else None
         
         # Apply filters
         if transaction_type:
@@ -159,10 +190,10 @@ async def transaction_history(user_id: str, db: Session, page: int = 1, limit: i
         # Handle CSV export
         if format == "csv":
             output = StringIO()
-            writer = csv.DictWriter(output, fieldnames=[
+            writer = csv.DictWriter(output, fieldnames=selected or [
                 "transaction_id", "type", "points", "balance_before", 
                 "balance_after", "timestamp", "action_user", "status"
-            ])
+            ], extrasaction="ignore")
             writer.writeheader()
             for t in transactions:
                 writer.writerow({
@@ -187,6 +218,8 @@ async def transaction_history(user_id: str, db: Session, page: int = 1, limit: i
         offset = (page - 1) * limit
         paginated_transactions = transactions[offset:offset + limit]
         has_more = offset + limit < total
+        if selected:
+            paginated_transactions = [{k: t[k] for k in selected if k in t} for t in paginated_transactions]
         
         return {
             "transaction_history": paginated_transactions,
@@ -204,57 +237,38 @@ async def transaction_history(user_id: str, db: Session, page: int = 1, limit: i
 async def leaderboard(limit: int, db: Session):
     try:
         current_time = int(time.time())
-        
-        # check cache
-        cached_data = db.query(CacheDB).filter(CacheDB.key == 'leaderboard').first()
-        
-        if cached_data:
-            last_updated = cached_data.last_updated
-            cache_age = current_time - last_updated
-            print(f"Cache age: {cache_age} seconds")
-            
-            # return cached data if less than 45 seconds old
-            if cache_age < 45:
-                leaderboard_data = cached_data.value.get('rankings', [])[:limit]
-                print(f"Using cached data from {last_updated}")
-                return {
-                    "data": leaderboard_data,
-                    "count": len(leaderboard_data),
-                    "cached": True,
-                    "cache_age": cache_age
-                }
-        
+
+        # the cache holds the top LEADERBOARD_SIZE, so any limit up to that is served from it
+        cached_data = cache.get('leaderboard')
+        if cached_data is not MISSING:
+            cache_age = current_time - cached_data['updated_at']
+            leaderboard_data = cached_data['rankings'][:limit]
+            return {
+                "data": leaderboard_data,
+                "count": len(leaderboard_data),
+                "cached": True,
+                "cache_age": cache_age
+            }
+
         # Cache expired or doesn't exist, fetch fresh data
-        print("Fetching fresh leaderboard data")
-        users = db.query(UserDB).order_by(
+        users = db.query(UserDB.unique_id, UserDB.first_name, UserDB.last_name, UserDB.credits).order_by(
             UserDB.credits.desc(),
             UserDB.unique_id.asc()
-        ).limit(limit).all()
-        
-        leaderboard_data = []
+        ).limit(LEADERBOARD_SIZE).all()
+
+        rankings = []
         for user in users:
             entry = {
                 'id': user.unique_id,
                 'name': f"{user.first_name or ''} {user.last_name or ''}".strip(),
                 'credits': user.credits or 0
             }
-            leaderboard_data.append(entry)
-        
-        # Update cache with new data
-        if leaderboard_data:
-            print(f"Updating cache at {current_time}")
-            if cached_data:
-                cached_data.value = {'rankings': leaderboard_data}
-                cached_data.last_updated = current_time
-            else:
-                new_cache = CacheDB(
-                    key='leaderboard',
-                    value={'rankings': leaderboard_data},
-                    last_updated=current_time
-                )
-                db.add(new_cache)
-            db.commit()
-        
+            rankings.append(entry)
+
+        if rankings:
+            cache.set('leaderboard', {'rankings': rankings, 'updated_at': current_time}, ttl=LEADERBOARD_CACHE_TTL)
+
+        leaderboard_data = rankings[:limit]
         return {
             "data": leaderboard_data,
             "count": len(leaderboard_data),
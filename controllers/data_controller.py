@@ -1,25 +1,129 @@
 import json
+import os
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from watchfiles import awatch
+from models.schedule_model import ScheduleIndex, format_time, parse_time
+from src.core.http_cache import CachedPayload
+from src.core.responses import MSGPACK_MEDIA_TYPE, msgpack, wants_msgpack
+
+load_dotenv()
+
+DATA_DIR = 'data'
+SCHEDULE_TIMEZONE = ZoneInfo(os.getenv('SCHEDULE_TIMEZONE', 'Asia/Kolkata'))
+# Date of "Day 1", lets "what's on now" work without an explicit ?day=
+SCHEDULE_START_DATE = os.getenv('SCHEDULE_START_DATE')
+
+class DataFile:
+    """
+    A JSON file from the data directory, parsed and serialized once (as JSON,
+    and as MessagePack when available). The parsed value and the ready-to-send
+    payloads are swapped in together when the file changes on disk.
+    """
+
+    def __init__(self, filename: str):
+        self.path = os.path.join(DATA_DIR, filename)
+        self.data = None
+        self.payload = None
+        self.msgpack_payload = None
+        self.listeners = []
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {'error': 'File not found'}
+        except ValueError as e:
+            # a half-written file: keep serving the previous version
+            if self.data is not None:
+                print(f"Ignoring invalid {self.path}: {str(e)}")
+                return
+            raise
+
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+        packed = CachedPayload(msgpack.packb(data), MSGPACK_MEDIA_TYPE) if msgpack is not None else None
+        self.data, self.payload, self.msgpack_payload = data, CachedPayload(body, "application/json"), packed
+        for listener in self.listeners:
+            listener(data)
+
+    def response(self, request):
+        payload = self.payload
+        if self.msgpack_payload is not None and wants_msgpack(request.headers.get("accept")):
+            payload = self.msgpack_payload
+        response = payload.response(request)
+        response.headers["Vary"] = "Accept, Accept-Encoding"
+        return response
+
+    def on_reload(self, listener):
+        """Call `listener(data)` now and after every reload."""
+        self.listeners.append(listener)
+        listener(self.data)
+
+schedule_file = DataFile('schedule.json')
+items_file = DataFile('items.json')
+events_file = DataFile('events.json')
+
+schedule_index = ScheduleIndex()
+schedule_file.on_reload(schedule_index.rebuild)
+
+DATA_FILES = {os.path.abspath(data_file.path): data_file for data_file in (schedule_file, items_file, events_file)}
 
 def get_schedule():
-    try:
-        with open(f'data/schedule.json', 'r', encoding='utf-8') as f:
-            events = json.load(f)
-        return events
-    except FileNotFoundError:
-        return {'error': 'File not found'}
+    return schedule_file.data
 
 def get_items():
-    try:
-        with open('data/items.json', 'r', encoding='utf-8') as f:
-            items = json.load(f)
-        return items
-    except FileNotFoundError:
-        return {'error': 'File not found'}
-    
+    return items_file.data
+
 def get_events():
-    try:
-        with open('data/events.json', 'r', encoding='utf-8') as f:
-            events = json.load(f)
-        return events
-    except FileNotFoundError:
-        return {'error': 'File not found'}
\ No newline at end of file
+    return events_file.data
+
+def _current_day(now: datetime):
+    if not SCHEDULE_START_DATE:
+        return None
+    offset = (now.date() - date.fromisoformat(SCHEDULE_START_DATE)).days
+    return schedule_index.find_day(f"Day {offset + 1}") if offset >= 0 else None
+
+async def query_schedule(day: str = None, at: str = None, next: int = None):
+    """Events of one day, what is on at a given time and what starts next"""
+    now = datetime.now(SCHEDULE_TIMEZONE)
+
+    if day:
+        day_name = schedule_index.find_day(day)
+        if not day_name:
+            raise HTTPException(status_code=404, detail=f"Unknown day: {day}")
+    else:
+        day_name = _current_day(now)
+        if not day_name:
+            raise HTTPException(status_code=400, detail="day is required, there is no schedule for today")
+    day_schedule = schedule_index.days[day_name]
+
+    if at is None and next is None:
+        return {"day": day_name, "events": day_schedule.events}
+
+    if at is not None:
+        minutes = parse_time(at)
+        if minutes is None:
+            raise HTTPException(status_code=400, detail="Invalid time, use HH:MM or h:mm AM/PM")
+    else:
+        minutes = now.hour * 60 + now.minute
+
+    result = {"day": day_name, "at": format_time(minutes), "happening_now": day_schedule.at(minutes)}
+    if next is not None:
+        result["up_next"] = day_schedule.next(minutes, next)
+    return result
+
+async def watch_data_files(stop_event=None):
+    """Background task: reload data files when they change on disk, until `stop_event` is set."""
+    async for changes in awatch(DATA_DIR, stop_event=stop_event):
+        changed = {os.path.abspath(path) for _, path in changes}
+        for path, data_file in DATA_FILES.items():
+            if path in changed:
+                try:
+                    data_file.load()
+                    print(f"Reloaded {data_file.path}")
+                except Exception as e:
+                    print(f"Failed to reload {data_file.path}: {str(e)}")
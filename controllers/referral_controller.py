@@ -0,0 +1,54 @@
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from models.database import UserDB
+from models.referral_model import (
+    REFERRAL_LIMIT,
+    get_referral_tree,
+    get_referral_level_counts,
+    get_referrer,
+    get_top_referrers
+)
+
+def _get_referral_user(user_id: str, db: Session):
+    user = db.query(UserDB.unique_id, UserDB.referral_count).filter(UserDB.unique_id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+async def referral_tree(user_id: str, depth: int, db: Session):
+    try:
+        user = _get_referral_user(user_id, db)
+        return {
+            "user_id": user_id,
+            "referred_by": get_referrer(user_id, db),
+            "referral_count": user.referral_count or 0,
+            "referral_limit": REFERRAL_LIMIT,
+            "depth": depth,
+            "referrals": get_referral_tree(user_id, depth, db)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def referral_levels(user_id: str, depth: int, db: Session):
+    try:
+        _get_referral_user(user_id, db)
+        counts = get_referral_level_counts(user_id, depth, db)
+        levels = [{"level": level, "count": counts.get(level, 0)} for level in range(1, depth + 1)]
+        return {
+            "user_id": user_id,
+            "levels": levels,
+            "total": sum(counts.values())
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def top_referrers(limit: int, db: Session):
+    try:
+        data = get_top_referrers(limit, db)
+        return {"data": data, "count": len(data)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
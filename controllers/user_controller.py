@@ -1,7 +1,48 @@
-from fastapi import HTTPException
+import base64
+import os
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from models.user_model import User
+from models.cache_model import cache
+from models.user_model import USER_FIELDS, User, leaderboard_event_key, parse_fields, profile_cache
 from models.database import UserDB
+from models.contact_filter import contact_filter
+from models.referral_model import claim_referral_slot, release_referral_slot
+from src.core.cache import MISSING
+from src.core.http_cache import http_date, is_not_modified
+from src.core.invalidation import invalidations
+
+load_dotenv()
+
+# The changes feed stays this far behind the clock so transactions still in
+# flight cannot commit a change behind a cursor that was already handed out
+CHANGES_SETTLE_SECONDS = float(os.getenv('CHANGES_SETTLE_SECONDS', 2))
+CHANGES_MAX_LIMIT = 500
+
+# Upper bound on ids per /user/batch request
+BATCH_MAX_IDS = 500
+# Everything but transaction_history, which a batch or list of profiles rarely needs
+BATCH_DEFAULT_FIELDS = [field for field in USER_FIELDS if field != 'transaction_history']
+# /user/list has always returned whole profiles (User.to_dict), history included; ask for less with ?fields=
+LIST_DEFAULT_FIELDS = [field for field in USER_FIELDS if field not in ('version', 'updated_at')]
+
+# /user/list totals: "cached" is an exact count reused for this many seconds,
+# "estimate" the planner's row estimate and "none" skips counting
+USER_COUNT_CACHE_TTL = int(os.getenv('USER_COUNT_CACHE_TTL', 60))
+LIST_COUNT_MODES = ('cached', 'estimate', 'none')
+
+# Opaque (timestamp, unique_id) keyset cursors, used by the changes feed and /user/list
+def encode_cursor(timestamp: datetime, unique_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{unique_id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        timestamp, unique_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|', 1)
+        return datetime.fromisoformat(timestamp), unique_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 def validate_contact_info(email, phone_number):
     if not email and not phone_number:
@@ -39,6 +80,11 @@ async def add_user(user_data: dict, db: Session):
                 credits=user_points,
                 referred_by=[referrer_id]
             )
+
+            # Claim one of the referrer's slots, committed together with the new user
+            if not claim_referral_slot(referrer_id, newUser.unique_id, db):
+                db.rollback()
+                raise HTTPException(status_code=400, detail="Referral limit reached for this code")
         else:
             newUser = User(
                 first_name=first_name,
@@ -94,9 +140,15 @@ async def delete_profile(user_data: dict, db: Session):
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
+        # a deleted referee frees the referrer's slot, in the same transaction
+        release_referral_slot(unique_id, db)
+
         # Delete user from database
         db.query(UserDB).filter(UserDB.unique_id == unique_id).delete()
+        invalidations.publish(db, 'profile', unique_id)
+        invalidations.publish(db, 'leaderboard', leaderboard_event_key(unique_id))
         db.commit()
+        contact_filter.note_removed()
 
         return {"message": "User profile deleted successfully"}
     except HTTPException:
@@ -104,64 +156,167 @@ async def delete_profile(user_data: dict, db: Session):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-async def get_profile(unique_id: str, db: Session):
+def _profile_cache_headers(version, updated_at) -> dict:
+    headers = {"ETag": f'W/"{version}"', "Cache-Control": "private, no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = http_date(updated_at)
+    return headers
+
+async def get_profile(unique_id: str, db: Session, fields: str = None, request: Request = None, response: Response = None,
+                      primary: Session = None):
+    """
+    Profile with an ETag (the row version) and Last-Modified (updated_at).
+    Whole profiles are served from profile_cache. Sparse (?fields=) requests
+    read only their columns, and answer conditional requests from the two
+    validator columns alone. `db` may be a replica; cache misses load from
+    `primary` when given.
+    """
     try:
-        user = User.get_by_id(unique_id, db)
-        if user:
-            return {"user": user.to_dict()}
+        if not fields:
+            # whole profiles come from the read-through cache, validators included. A miss right
+            # after an invalidation must not cache the pre-write row from a lagging replica
+            entry = await profile_cache.get(unique_id, primary or db)
+            if entry is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            version = entry['version']
+            updated_at = datetime.fromisoformat(entry['updated_at']) if entry['updated_at'] else None
+            if request is not None and is_not_modified(request.headers, f'W/"{version}"', updated_at):
+                return Response(status_code=304, headers=_profile_cache_headers(version, updated_at))
+            body = {"user": entry['user']}
         else:
-            raise HTTPException(status_code=404, detail="User not found")
+            if request is not None and ("if-none-match" in request.headers or "if-modified-since" in request.headers):
+                row = db.query(UserDB.version, UserDB.updated_at).filter(UserDB.unique_id == unique_id).first()
+                if row is None:
+                    raise HTTPException(status_code=404, detail="User not found")
+                headers = _profile_cache_headers(row.version, row.updated_at)
+                if is_not_modified(request.headers, headers["ETag"], row.updated_at):
+                    return Response(status_code=304, headers=headers)
+
+            selected = parse_fields(fields, USER_FIELDS)
+            user = User.get_fields_by_id(unique_id, selected + [f for f in ('version', 'updated_at') if f not in selected], db)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            version, updated_at = user['version'], user['updated_at']
+            body = {"user": {field: user[field] for field in selected}}
+
+        if response is not None:
+            response.headers.update(_profile_cache_headers(version, updated_at))
+        return body
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def get_users_batch(unique_ids, db: Session, fields: str = None):
+    """Several users in one query, in the order asked for; ids that do not exist are listed under `missing`.
+    unique_id is always returned so results can be matched to ids"""
+    try:
+        if isinstance(unique_ids, str):
+            unique_ids = unique_ids.split(',')
+        if not isinstance(unique_ids, list):
+            raise HTTPException(status_code=400, detail="ids must be a list of user ids")
+        unique_ids = list(dict.fromkeys(str(uid).strip() for uid in unique_ids if str(uid).strip()))
+        if not unique_ids:
+            raise HTTPException(status_code=400, detail="ids is required")
+        if len(unique_ids) > BATCH_MAX_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_IDS} ids per request")
+
+        selected = parse_fields(fields, USER_FIELDS) if fields else BATCH_DEFAULT_FIELDS
+        found = User.get_fields_by_ids(unique_ids, selected, db)
+        return {
+            "users": [found[uid] for uid in unique_ids if uid in found],
+            "missing": [uid for uid in unique_ids if uid not in found]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def list_changes(db: Session, since: str = None, limit: int = 100, fields: str = None):
+    """
+    Users created or updated after the `since` cursor, oldest first, plus the
+    ids deleted in the same window. Pass `next` back as `since` to continue;
+    without `since` the feed starts from the beginning (a full sync).
+    """
+    try:
+        limit = max(1, min(limit, CHANGES_MAX_LIMIT))
+        selected = parse_fields(fields, USER_FIELDS) if fields else BATCH_DEFAULT_FIELDS
+        if 'unique_id' not in selected:
+            selected = ['unique_id'] + selected
+        after = decode_cursor(since) if since else None
+
+        # on a replica, only what has been replayed: WAL replays in commit order, so every
+        # transaction committed before the last replayed one is visible (NULL on the primary)
+        replayed = func.coalesce(func.pg_last_xact_replay_timestamp(), func.now())
+        horizon = db.query(func.least(func.now(), replayed) - timedelta(seconds=CHANGES_SETTLE_SECONDS)).scalar()
+        users = User.changes_since(selected, db, horizon, after, limit)
+        has_more = len(users) > limit
+        users = users[:limit]
+
+        # without more to fetch the cursor jumps to the horizon, so quiet periods are skipped
+        end = (users[-1]['updated_at'], users[-1]['unique_id']) if has_more else (horizon, '')
+        deleted = User.deleted_between(db, after[0] if after else None, end[0])
+        return {
+            "users": [{field: user[field] for field in selected} for user in users],
+            "deleted": deleted,
+            "next": encode_cursor(*end),
+            "has_more": has_more
+        }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-async def list_users(page: int = 1, limit: int = 10, db: Session = None):
+def count_users(db: Session, mode: str = 'cached'):
+    """Total for /user/list without a count(*) per request; None when mode is "none"."""
+    if mode == 'none':
+        return None
+    if mode == 'estimate':
+        # reltuples is -1 until the table is first analyzed
+        estimate = User.estimated_count(db)
+        if estimate >= 0:
+            return estimate
+    total = cache.get('user_count')
+    if total is MISSING:
+        total = db.query(func.count(UserDB.unique_id)).scalar()
+        cache.set('user_count', total, ttl=USER_COUNT_CACHE_TTL)
+    return total
+
+async def list_users(page: int = 1, limit: int = 10, db: Session = None, fields: str = None,
+                     cursor: str = None, count: str = 'cached'):
+    """
+    Users in (created_at, unique_id) order. Pass `next` back as `cursor` for
+    the following page; that is a keyset seek, so every page costs the same.
+    `page` still works but skips rows with OFFSET, which slows down deep pages.
+    Only the requested columns are read (the User.to_dict keys by default).
+    """
     if db is None:
         raise HTTPException(status_code=500, detail="Database session not provided")
-    """List users with pagination"""
     try:
         if page < 1:
             page = 1
         if limit < 1 or limit > 100:
             limit = 10
-        
-        # Calculate offset
-        offset = (page - 1) * limit
-        
-        # Get total count
-        total = db.query(UserDB).count()
-        
-        # Get paginated users
-        db_users = db.query(UserDB).offset(offset).limit(limit).all()
-        
-        users = []
-        for db_user in db_users:
-            user = User(
-                unique_id=db_user.unique_id,
-                first_name=db_user.first_name,
-                last_name=db_user.last_name,
-                email=db_user.email,
-                phone_number=db_user.phone_number,
-                is_user=db_user.role == "USER",
-                is_admin=db_user.role == "ADMIN",
-                is_sales=db_user.role == "SALES",
-                credits=db_user.credits,
-                transaction_history=db_user.transaction_history or [],
-                balance=db_user.balance or 0,
-                referral_code=db_user.referral_code,
-                referred_by=db_user.referred_by or []
-            )
-            users.append(user.to_dict())
-        
-        has_more = offset + limit < total
-        
-        return {
+        if count not in LIST_COUNT_MODES:
+            raise HTTPException(status_code=400, detail=f"count must be one of {', '.join(LIST_COUNT_MODES)}")
+
+        selected = parse_fields(fields, USER_FIELDS) if fields else LIST_DEFAULT_FIELDS
+        after = decode_cursor(cursor) if cursor else None
+        offset = 0 if after else (page - 1) * limit
+        users, next_key = User.list_page(selected, db, after=after, offset=offset, limit=limit)
+
+        result = {
             "users": users,
-            "total": total,
             "page": page,
             "limit": limit,
-            "has_more": has_more
+            "has_more": next_key is not None,
+            "next": encode_cursor(*next_key) if next_key else None
         }
+        total = count_users(db, count)
+        if total is not None:
+            result["total"] = total
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
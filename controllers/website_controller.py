@@ -5,12 +5,15 @@ from sqlalchemy.orm import Session
 from models.database import UserDB
 from controllers.admin_controller import add_user
 from models.user_model import User
+from models.contact_filter import contact_filter
+from src.core.static_files import static_files
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_files.url_for
 
 async def home(request: Request, db: Session):
     sort_by = "default"
@@ -117,6 +120,7 @@ async def delete_user_logic(user_id: str, db: Session):
         
         db.delete(user)
         db.commit()
+        contact_filter.note_removed()
         return {"message": "User deleted successfully"}
     except HTTPException:
         raise
@@ -1,8 +1,14 @@
 import os
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from fastapi import Request
 from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
+from src.core.bulkhead import BulkheadPool
+from src.core.consistency import reads_from_primary
+from src.core.invalidation import invalidations
+from src.core.metrics import PoolMetrics
+from src.core import query_counter
 
 # Load environment variables from .env file
 load_dotenv(dotenv_path=".env", override=True)
@@ -12,11 +18,69 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-# Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, pool_size=10, max_overflow=20)
+# Optional streaming replica for read-only routes
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# One pool per class of routes (bulkheads), so a burst in one class cannot take
+# the connections another needs. "size,max_overflow,checkout timeout in seconds",
+# overridable per class with DB_POOL_<CLASS>, e.g. DB_POOL_ADMIN=2,0,1
+POOL_DEFAULTS = {
+    'critical': '5,5,10',  # point allocation and redemption
+    'default': '5,10,5',   # every other write, and reads pinned to the primary
+    'reads': '8,8,3',      # user-facing reads (replica when configured)
+    'admin': '2,2,2',      # admin listings, portal pages and reports (replica when configured)
+    'health': '1,0,1',     # /health, so it answers even when the others are saturated
+}
+
+def _create_engine(url: str, bulkhead: str):
+    size, overflow, timeout = os.getenv(f"DB_POOL_{bulkhead.upper()}", POOL_DEFAULTS[bulkhead]).split(',')
+    size, overflow, timeout = int(size), int(overflow), float(timeout)
+    bulkhead_engine = create_engine(
+        url,
+        poolclass=BulkheadPool,
+        pool_pre_ping=True,
+        pool_size=size,
+        max_overflow=overflow,
+        pool_timeout=timeout
+    )
+    bulkhead_engine.pool.bulkhead = bulkhead
+    PoolMetrics.attach(bulkhead_engine, bulkhead, size, overflow, timeout)
+    query_counter.install(bulkhead_engine)
+    return bulkhead_engine
+
+# Create SQLAlchemy engines
+engine = _create_engine(DATABASE_URL, 'default')
+critical_engine = _create_engine(DATABASE_URL, 'critical')
+health_engine = _create_engine(DATABASE_URL, 'health')
+
+# Read-only sessions: on the replica when there is one, otherwise on the primary.
+# Either way writes through them fail, so a read route cannot write by accident.
+read_engine = _create_engine(DATABASE_READ_URL or DATABASE_URL, 'reads').execution_options(postgresql_readonly=True)
+admin_engine = _create_engine(DATABASE_READ_URL or DATABASE_URL, 'admin').execution_options(postgresql_readonly=True)
+
+ENGINES = {
+    'critical': critical_engine,
+    'default': engine,
+    'reads': read_engine,
+    'admin': admin_engine,
+    'health': health_engine,
+}
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+CriticalSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=critical_engine)
+HealthSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=health_engine)
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+AdminSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=admin_engine)
+
+# publish cache invalidations for what each session commits
+invalidations.install(SessionLocal)
+invalidations.install(CriticalSessionLocal)
+
+# Sessions only check out a connection on their first query, so routes that
+# answer from a cache or the contact filter never touch their pool. When the
+# pool is exhausted the query raises PoolExhausted, a 503.
 
 def get_db() -> Session:
     """
@@ -29,6 +93,34 @@ def get_db() -> Session:
     finally:
         db.close()
 
+def get_critical_db() -> Session:
+    """Dependency for point allocation and redemption, on a pool nothing else can drain"""
+    db = CriticalSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _read_session(request: Request, factory) -> Session:
+    # a client that wrote within the last READ_YOUR_WRITES_SECONDS reads from the primary
+    db = SessionLocal() if reads_from_primary(request.cookies) else factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db(request: Request) -> Session:
+    """
+    Dependency for routes that only read. Uses the replica, except for a
+    client that wrote within the last READ_YOUR_WRITES_SECONDS, which reads
+    from the primary so it sees its own change.
+    """
+    yield from _read_session(request, ReadSessionLocal)
+
+def get_admin_db(request: Request) -> Session:
+    """Like get_read_db, for admin listings and reports, on their own small pool"""
+    yield from _read_session(request, AdminSessionLocal)
+
 @contextmanager
 def get_db_context():
     """
@@ -40,3 +132,11 @@ def get_db_context():
         yield db
     finally:
         db.close()
+
+def connect_unpooled():
+    """
+    A new DBAPI connection outside the pool, for long-lived uses such as
+    LISTEN that would otherwise hold a pooled connection forever.
+    """
+    cargs, cparams = engine.dialect.create_connect_args(engine.url)
+    return engine.dialect.connect(*cargs, **cparams)
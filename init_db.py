@@ -1,5 +1,8 @@
 from models.database import Base
 from db import engine
+from models.cache_model import CACHE_TABLE_UNLOGGED
+from migrations import apply_migrations
+from sqlalchemy import text
 import sys
 
 def init_database():
@@ -14,11 +17,38 @@ def init_database():
         print("\nCreated tables:")
         for table in Base.metadata.sorted_tables:
             print(f"  - {table.name}")
-        return True
+        return apply_schema_updates()
     except Exception as e:
         print(f"Error creating database tables: {str(e)}")
         return False
 
+def apply_schema_updates():
+    """
+    Bring existing tables up to date with the models by applying pending
+    migrations (see migrations/). Safe to run repeatedly.
+    """
+    try:
+        print("Applying schema updates...")
+        applied = apply_migrations(engine)
+        with engine.begin() as conn:
+            set_cache_persistence(conn, CACHE_TABLE_UNLOGGED)
+        print(f"Schema updates applied successfully! ({len(applied)} new migrations)")
+        return True
+    except Exception as e:
+        print(f"Error applying schema updates: {str(e)}")
+        return False
+
+def set_cache_persistence(conn, unlogged: bool):
+    """
+    Switch the cache table between UNLOGGED and LOGGED. Changing it rewrites
+    the table, so it is only done when the current setting differs.
+    """
+    persistence = conn.execute(text("SELECT relpersistence FROM pg_class WHERE oid = 'cache'::regclass")).scalar()
+    if unlogged and persistence != 'u':
+        conn.execute(text("ALTER TABLE cache SET UNLOGGED"))
+    elif not unlogged and persistence == 'u':
+        conn.execute(text("ALTER TABLE cache SET LOGGED"))
+
 def drop_all_tables():
     """
     Drop all tables. Use with caution!
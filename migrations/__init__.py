@@ -0,0 +1,132 @@
+"""
+Versioned schema migrations for changes create_all() cannot make to existing
+tables. Every migration runs once per database, in version order, and is
+recorded in schema_migrations. Each change is a new module named
+mNNNN_<name>.py defining `migration`; never edit one that has shipped.
+
+    python init_db.py    # create_all, then apply pending migrations
+"""
+import importlib
+import pkgutil
+from typing import Callable, List, Union
+
+from sqlalchemy import text
+
+# Serializes migrations when several workers or deploys start at once
+ADVISORY_LOCK_KEY = 727_001
+
+# Rows changed per transaction by backfill_in_batches
+BACKFILL_BATCH_SIZE = 5000
+
+Step = Union[str, Callable]
+
+
+class Migration:
+    """
+    `steps` are SQL strings or callables taking a connection. A transactional
+    migration runs in one transaction with its bookkeeping row. One that is
+    not (needed for CREATE INDEX CONCURRENTLY) runs each step in autocommit,
+    so its steps must be safe to repeat after a failure part way through.
+    """
+
+    def __init__(self, version: int, name: str, steps: List[Step], transactional: bool = True):
+        self.version = version
+        self.name = name
+        self.steps = steps
+        self.transactional = transactional
+
+
+def create_index_concurrently(name: str, table: str, definition: str, where: str = None) -> Callable:
+    """
+    A step that builds an index without blocking writes. A build that failed
+    earlier leaves an INVALID index behind, which is dropped and rebuilt.
+    """
+    statement = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}"
+    if where:
+        statement += f" WHERE {where}"
+
+    def step(conn):
+        valid = conn.execute(
+            text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+        ).scalar()
+        if valid is False:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(statement))
+
+    step.__name__ = f"create_index_concurrently({name})"
+    return step
+
+
+def backfill_in_batches(name: str, statement: str, batch_size: int = BACKFILL_BATCH_SIZE) -> Callable:
+    """
+    A step for non-transactional migrations that repeats `statement` until it
+    changes no rows. The statement must touch at most :batch_size rows and stop
+    matching the rows it has fixed, so each batch commits on its own and only
+    holds its rows' locks briefly. The session sets app.backfill, which the
+    users_track_change trigger reads to leave version and updated_at alone.
+    """
+    def step(conn):
+        conn.execute(text("SET app.backfill = 'on'"))
+        try:
+            while conn.execute(text(statement), {"batch_size": batch_size}).rowcount:
+                pass
+        finally:
+            conn.execute(text("RESET app.backfill"))
+
+    step.__name__ = f"backfill_in_batches({name})"
+    return step
+
+
+def _run(conn, step: Step):
+    if callable(step):
+        step(conn)
+    else:
+        conn.execute(text(step))
+
+
+def _record(conn, migration: Migration):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+        {"version": migration.version, "name": migration.name}
+    )
+
+
+def load_migrations() -> List[Migration]:
+    modules = [info.name for info in pkgutil.iter_modules(__path__) if info.name.startswith("m")]
+    migrations = [importlib.import_module(f"{__name__}.{module}").migration for module in modules]
+    return sorted(migrations, key=lambda migration: migration.version)
+
+
+def apply_migrations(engine) -> list:
+    """Apply pending migrations in order and return the versions applied."""
+    migrations = load_migrations()
+    applied_now = []
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            lock_conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+            """))
+            applied = set(lock_conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+            for migration in migrations:
+                if migration.version in applied:
+                    continue
+                print(f"Applying migration {migration.version:04d} {migration.name}...")
+                if migration.transactional:
+                    with engine.begin() as conn:
+                        for step in migration.steps:
+                            _run(conn, step)
+                        _record(conn, migration)
+                else:
+                    # concurrent index builds cannot run inside a transaction
+                    for step in migration.steps:
+                        _run(lock_conn, step)
+                    _record(lock_conn, migration)
+                applied_now.append(migration.version)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+    return applied_now
@@ -0,0 +1,26 @@
+from migrations import Migration
+
+# The schema updates init_db.py applied on every run before migrations were
+# versioned, minus anything that scans users. All idempotent and catalog-only,
+# so the transaction holds its locks for milliseconds. The indexes are built
+# concurrently by m0003_baseline_indexes.py, the backfills and the change
+# trigger run in batches in m0004_baseline_backfills.py.
+migration = Migration(1, "baseline", [
+    # referral graph: the counter, kept in step with referral_edges
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS referral_count INTEGER NOT NULL DEFAULT 0",
+    # profile versions, bumped by users_track_change
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    # the changes feed: every delete leaves a row in user_deletions
+    """
+    CREATE OR REPLACE FUNCTION users_record_deletion() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO user_deletions (unique_id, deleted_at) VALUES (OLD.unique_id, clock_timestamp());
+        RETURN OLD;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS users_record_deletion ON users",
+    "CREATE TRIGGER users_record_deletion AFTER DELETE ON users FOR EACH ROW EXECUTE FUNCTION users_record_deletion()",
+    # cache TTLs, so expired rows can be skipped on read and swept in bulk (ix_cache_expires_at)
+    "ALTER TABLE cache ADD COLUMN IF NOT EXISTS expires_at INTEGER NOT NULL DEFAULT 0",
+])
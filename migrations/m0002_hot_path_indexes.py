@@ -0,0 +1,15 @@
+from migrations import Migration, create_index_concurrently
+
+# Indexes for the queries that sort or filter users on every request. Built
+# concurrently, so a live table keeps taking writes while they are created.
+# tests/test_query_plans.py checks that each query still uses its index.
+migration = Migration(2, "hot path indexes", [
+    # GET /leaderboard: ORDER BY credits DESC, unique_id LIMIT 50
+    create_index_concurrently("ix_users_leaderboard", "users", "(credits DESC, unique_id)"),
+    # GET /referrals/top: only users who referred someone, most referrals first
+    create_index_concurrently(
+        "ix_users_top_referrers", "users", "(referral_count DESC, unique_id)", where="referral_count > 0"
+    ),
+    # GET /admin/users?role=: staff are a handful of rows, plain users are read with a full scan anyway
+    create_index_concurrently("ix_users_staff_role", "users", "(role)", where="role <> 'USER'"),
+], transactional=False)
@@ -0,0 +1,15 @@
+from migrations import Migration, create_index_concurrently
+
+# The indexes for the baseline's columns, built concurrently so a large users
+# table keeps taking writes. Databases that already have them skip each one.
+migration = Migration(3, "baseline indexes", [
+    # reverse lookups ("whose referred_by/referrals contains X")
+    create_index_concurrently("ix_users_referred_by_gin", "users", "USING gin (referred_by)"),
+    create_index_concurrently("ix_users_referrals_gin", "users", "USING gin (referrals)"),
+    # keyset order of the /user/changes feed
+    create_index_concurrently("ix_users_updated_at", "users", "(updated_at, unique_id)"),
+    # keyset pagination for /user/list
+    create_index_concurrently("ix_users_created_at", "users", "(created_at, unique_id)"),
+    # sweeping expired cache rows
+    create_index_concurrently("ix_cache_expires_at", "cache", "(expires_at)"),
+], transactional=False)
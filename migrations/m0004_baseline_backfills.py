@@ -0,0 +1,76 @@
+from migrations import Migration, backfill_in_batches
+
+# The baseline's data changes, in batches that each commit on their own so
+# users stays writable throughout. The change trigger is created after the
+# backfills, and databases that already have it (from init_db.py before
+# migrations) skip it through app.backfill, so no row gets a new version or
+# updated_at, and no ETag or /user/changes cursor moves, because of this.
+migration = Migration(4, "baseline backfills", [
+    # every insert/update stamps updated_at and bumps version, unless the session is backfilling
+    """
+    CREATE OR REPLACE FUNCTION users_track_change() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('app.backfill', true) = 'on' THEN
+            RETURN NEW;
+        END IF;
+        IF TG_OP = 'UPDATE' THEN
+            NEW.version := OLD.version + 1;
+        END IF;
+        NEW.updated_at := clock_timestamp();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    # referral edges from the arrays, then the counters from the edges
+    backfill_in_batches("referral_edges", """
+    INSERT INTO referral_edges (referee_id, referrer_id)
+    SELECT u.unique_id, u.referred_by[1]
+    FROM users u JOIN users r ON r.unique_id = u.referred_by[1]
+    WHERE cardinality(u.referred_by) > 0
+      AND NOT EXISTS (SELECT 1 FROM referral_edges e WHERE e.referee_id = u.unique_id)
+    LIMIT :batch_size
+    ON CONFLICT (referee_id) DO NOTHING
+    """),
+    backfill_in_batches("referral_count", """
+    WITH batch AS (
+        SELECT edges.referrer_id, edges.total
+        FROM (SELECT referrer_id, count(*) AS total FROM referral_edges GROUP BY referrer_id) edges
+        JOIN users u ON u.unique_id = edges.referrer_id
+        WHERE u.referral_count <> edges.total
+        LIMIT :batch_size
+    )
+    UPDATE users SET referral_count = batch.total
+    FROM batch WHERE users.unique_id = batch.referrer_id
+    """),
+    backfill_in_batches("updated_at", """
+    UPDATE users SET updated_at = created_at
+    WHERE unique_id IN (
+        SELECT unique_id FROM users WHERE updated_at IS NULL AND created_at IS NOT NULL LIMIT :batch_size
+    )
+    """),
+    # /user/list pages by (created_at, unique_id); NULLs would fall outside every keyset
+    backfill_in_batches("created_at", """
+    UPDATE users SET created_at = COALESCE(updated_at, now())
+    WHERE unique_id IN (SELECT unique_id FROM users WHERE created_at IS NULL LIMIT :batch_size)
+    """),
+    # one statement, so there is no moment without the trigger
+    """
+    DROP TRIGGER IF EXISTS users_track_change ON users;
+    CREATE TRIGGER users_track_change BEFORE INSERT OR UPDATE ON users FOR EACH ROW EXECUTE FUNCTION users_track_change()
+    """,
+    # NOT NULL without a scan under ACCESS EXCLUSIVE: the NOT VALID check applies to new
+    # writes at once, VALIDATE scans holding only SHARE UPDATE EXCLUSIVE, and SET NOT NULL
+    # then trusts the validated check instead of scanning again
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'users_created_at_not_null') THEN
+            ALTER TABLE users ADD CONSTRAINT users_created_at_not_null CHECK (created_at IS NOT NULL) NOT VALID;
+        END IF;
+    END
+    $$
+    """,
+    "ALTER TABLE users VALIDATE CONSTRAINT users_created_at_not_null",
+    "ALTER TABLE users ALTER COLUMN created_at SET NOT NULL",
+    "ALTER TABLE users DROP CONSTRAINT IF EXISTS users_created_at_not_null",
+], transactional=False)
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+from typing import Any, Optional
+from dotenv import load_dotenv
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from starlette.concurrency import run_in_threadpool
+
+from models.database import CacheDB
+from src.core.cache import MISSING, MemoryCache, RedisCache
+from src.core.invalidation import invalidations
+
+load_dotenv()
+
+# Shared application cache: memory (per worker), postgres (the `cache` table) or redis
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory').lower()
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+CACHE_DEFAULT_TTL = float(os.getenv('CACHE_DEFAULT_TTL', 60))
+CACHE_SWEEP_SECONDS = int(os.getenv('CACHE_SWEEP_SECONDS', 300))
+# init_db makes the table UNLOGGED: faster writes, emptied after a crash and not replicated
+CACHE_TABLE_UNLOGGED = os.getenv('CACHE_TABLE_UNLOGGED', 'false').lower() == 'true'
+
+
+class PostgresCache:
+    """
+    Cache backed by the `cache` table, shared by every worker. Each call runs
+    in its own short transaction on `engine`, independent of the caller's
+    session. Expired rows are never returned and are deleted by sweep().
+    """
+
+    def __init__(self, engine, ttl: float = 60):
+        self.engine = engine
+        self.ttl = ttl
+
+    def get(self, key: str):
+        with self.engine.connect() as conn:
+            value = conn.execute(
+                select(CacheDB.value).where(CacheDB.key == key, CacheDB.expires_at > int(time.time()))
+            ).scalar()
+        return MISSING if value is None else value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = int(time.time())
+        expires_at = now + int(self.ttl if ttl is None else ttl)
+        statement = insert(CacheDB).values(key=key, value=value, last_updated=now, expires_at=expires_at)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CacheDB.key],
+            set_={'value': statement.excluded.value, 'last_updated': now, 'expires_at': expires_at},
+        )
+        with self.engine.begin() as conn:
+            conn.execute(statement)
+
+    def delete(self, key: str):
+        with self.engine.begin() as conn:
+            conn.execute(delete(CacheDB).where(CacheDB.key == key))
+
+    def clear(self):
+        with self.engine.begin() as conn:
+            conn.execute(delete(CacheDB))
+
+    def sweep(self) -> int:
+        """Delete expired rows and return how many were removed"""
+        with self.engine.begin() as conn:
+            result = conn.execute(delete(CacheDB).where(CacheDB.expires_at <= int(time.time())))
+        return result.rowcount
+
+
+def create_cache(backend: str = CACHE_BACKEND):
+    if backend == 'postgres':
+        from db import engine
+        return PostgresCache(engine, ttl=CACHE_DEFAULT_TTL)
+    if backend == 'redis':
+        if not CACHE_REDIS_URL:
+            raise ValueError("CACHE_REDIS_URL must be set when CACHE_BACKEND=redis")
+        return RedisCache(CACHE_REDIS_URL, ttl=CACHE_DEFAULT_TTL, prefix='app:')
+    if backend == 'memory':
+        return MemoryCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_DEFAULT_TTL)
+    raise ValueError(f"Unknown CACHE_BACKEND: {backend}")
+
+# Controllers use cache.get(key) (MISSING when absent), cache.set(key, value, ttl=...) and cache.delete(key)
+cache = create_cache()
+
+async def sweep_cache(interval: int = CACHE_SWEEP_SECONDS):
+    """Background task: remove expired rows when the cache lives in Postgres."""
+    if not hasattr(cache, 'sweep'):
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            removed = await run_in_threadpool(cache.sweep)
+            if removed:
+                print(f"Cache sweep removed {removed} expired entries")
+        except Exception as e:
+            print(f"Cache sweep failed: {str(e)}")
+
+async def listen_for_invalidations():
+    """Background task: apply cache invalidations published by other workers."""
+    from db import connect_unpooled
+    from models.contact_filter import contact_filter
+    # the contact filter is a per-worker cache of user rows too
+    invalidations.subscribe('contact', contact_filter.add_key, contact_filter.reset)
+    await invalidations.listen(connect_unpooled)
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Iterable, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from models.database import UserDB
+from src.core.bloom import BloomFilter
+from src.core.rate_limit import normalize_phone
+
+load_dotenv()
+
+CONTACT_FILTER_CAPACITY = int(os.getenv("CONTACT_FILTER_CAPACITY", 200000))
+CONTACT_FILTER_ERROR_RATE = float(os.getenv("CONTACT_FILTER_ERROR_RATE", 0.01))
+CONTACT_FILTER_RECONCILE_SECONDS = int(os.getenv("CONTACT_FILTER_RECONCILE_SECONDS", 300))
+
+# Rebuild early once this share of the entries belongs to deleted or changed contacts
+STALE_REBUILD_RATIO = 0.05
+
+
+def normalize_email(email) -> Optional[str]:
+    if not email:
+        return None
+    return str(email).strip().lower() or None
+
+
+class ContactFilter:
+    """
+    Bloom filters of every registered email and phone number. A miss means the
+    contact is definitely not in the users table, so availability checks can
+    answer without a query. Until the first build finishes every lookup is a
+    "maybe" and falls through to the database.
+
+    Other workers' new contacts arrive over the invalidation bus, so a miss
+    can briefly be wrong; only the "available" lookups may rely on it, never
+    authentication or signup decisions.
+    """
+
+    def __init__(self, capacity: int = CONTACT_FILTER_CAPACITY, error_rate: float = CONTACT_FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ready = False
+        self.stale = 0
+        self.built_at = None
+        self._emails = BloomFilter(capacity, error_rate)
+        self._phones = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+        self._pending = None  # contacts added while a rebuild is reading the table
+
+    def might_have_email(self, email) -> bool:
+        email = normalize_email(email)
+        if not self.ready or email is None:
+            return True
+        return email in self._emails
+
+    def might_have_phone(self, phone) -> bool:
+        phone = normalize_phone(phone)
+        if not self.ready or phone is None:
+            return True
+        return phone in self._phones
+
+    def add(self, email=None, phone_number=None):
+        email = normalize_email(email)
+        phone = normalize_phone(phone_number)
+        with self._lock:
+            if email:
+                self._emails.add(email)
+            if phone:
+                self._phones.add(phone)
+            if self._pending is not None:
+                self._pending.append((email, phone))
+
+    def add_key(self, key: str):
+        """Add a contact published on the invalidation bus as "email:<email>" or "phone:<phone>"."""
+        kind, _, value = key.partition(":")
+        if kind == "email":
+            self.add(email=value)
+        elif kind == "phone":
+            self.add(phone_number=value)
+
+    def reset(self):
+        """
+        Contacts may have been missed (the invalidation listener reconnected):
+        answer "maybe" until the next rebuild, which reconcile_contact_filter starts right away.
+        """
+        with self._lock:
+            self.ready = False
+
+    def note_removed(self, count: int = 1):
+        """Deleted or replaced contacts stay in the filter as false positives until the next rebuild."""
+        with self._lock:
+            self.stale += count
+
+    @property
+    def needs_rebuild(self) -> bool:
+        if not self.ready:
+            return True
+        return self.stale > max(len(self._emails), len(self._phones), 1) * STALE_REBUILD_RATIO
+
+    def build(self, contacts: Iterable[Tuple[Optional[str], Optional[str]]], total: int = 0):
+        """Build fresh filters from (email, phone) pairs and swap them in."""
+        with self._lock:
+            self._pending = []
+        try:
+            capacity = max(self.capacity, total * 2)
+            emails = BloomFilter(capacity, self.error_rate)
+            phones = BloomFilter(capacity, self.error_rate)
+            for email, phone in contacts:
+                email = normalize_email(email)
+                phone = normalize_phone(phone)
+                if email:
+                    emails.add(email)
+                if phone:
+                    phones.add(phone)
+
+            with self._lock:
+                for email, phone in self._pending:
+                    if email:
+                        emails.add(email)
+                    if phone:
+                        phones.add(phone)
+                self._emails = emails
+                self._phones = phones
+                self.stale = 0
+                self.ready = True
+                self.built_at = time.time()
+        finally:
+            with self._lock:
+                self._pending = None
+
+
+contact_filter = ContactFilter()
+
+
+def rebuild_contact_filter(db: Session):
+    total = db.query(UserDB).count()
+    contacts = db.query(UserDB.email, UserDB.phone_number).yield_per(10000)
+    contact_filter.build(contacts, total)
+    print(f"Contact filter rebuilt with {total} users")
+
+
+async def reconcile_contact_filter(interval: int = CONTACT_FILTER_RECONCILE_SECONDS):
+    """Background task: build the filter at startup, then rebuild it periodically."""
+    from db import get_db_context
+
+    def rebuild():
+        with get_db_context() as db:
+            rebuild_contact_filter(db)
+
+    while True:
+        try:
+            await run_in_threadpool(rebuild)
+        except Exception as e:
+            print(f"Contact filter rebuild failed: {str(e)}")
+
+        # wake up early if deletions have made the filter noticeably stale, or it was reset
+        deadline = time.monotonic() + interval
+        while time.monotonic() < deadline and not contact_filter.needs_rebuild:
+            await asyncio.sleep(min(10, interval))
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, Text, ARRAY
+from sqlalchemy import text, Column, String, Integer, Boolean, DateTime, JSON, Text, ARRAY, Sequence, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from datetime import datetime
 
 Base = declarative_base()
 
+# Numbers referral codes are derived from (see models/referral_code.py)
+referral_code_seq = Sequence("referral_code_seq", metadata=Base.metadata)
+
 class UserDB(Base):
     __tablename__ = "users"
     
@@ -19,9 +22,44 @@ class UserDB(Base):
     referral_code = Column(String, unique=True, index=True)
     referred_by = Column(ARRAY(String), default=[])
     referrals = Column(ARRAY(String), default=[])
+    referral_count = Column(Integer, nullable=False, default=0, server_default="0")
     transaction_history = Column(JSON, default=[])
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # both maintained by the users_track_change trigger (see migrations/m0004_baseline_backfills.py), whatever path writes the row
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __table_args__ = (
+        # built concurrently on existing databases by migrations/m0003_baseline_indexes.py
+        # reverse lookups ("whose referred_by/referrals contains X")
+        Index("ix_users_referred_by_gin", "referred_by", postgresql_using="gin"),
+        Index("ix_users_referrals_gin", "referrals", postgresql_using="gin"),
+        # keyset pagination for /user/list
+        Index("ix_users_created_at", "created_at", "unique_id"),
+        # keyset order of the /user/changes feed
+        Index("ix_users_updated_at", "updated_at", "unique_id"),
+        # hot paths, also built concurrently on existing databases (migrations/m0002_hot_path_indexes.py)
+        Index("ix_users_leaderboard", text("credits DESC"), "unique_id"),
+        Index("ix_users_top_referrers", text("referral_count DESC"), "unique_id", postgresql_where=text("referral_count > 0")),
+        Index("ix_users_staff_role", "role", postgresql_where=text("role <> 'USER'")),
+    )
+
+class UserDeletionDB(Base):
+    __tablename__ = "user_deletions"
+
+    # written by the users_record_deletion trigger so the changes feed can report deletes
+    id = Column(Integer, primary_key=True)
+    unique_id = Column(String, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+
+class ReferralEdgeDB(Base):
+    __tablename__ = "referral_edges"
+
+    # a user is referred at most once, so the referee is the key; the foreign
+    # keys are checked at commit so the edge can be written before the new user
+    referee_id = Column(String, ForeignKey("users.unique_id", ondelete="CASCADE", deferrable=True, initially="DEFERRED"), primary_key=True)
+    referrer_id = Column(String, ForeignKey("users.unique_id", ondelete="CASCADE", deferrable=True, initially="DEFERRED"), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class PhoneAuthDB(Base):
     __tablename__ = "phone_auth"
@@ -42,4 +80,5 @@ class CacheDB(Base):
     key = Column(String, primary_key=True, index=True)
     value = Column(JSON, nullable=False)
     last_updated = Column(Integer, nullable=False)
+    expires_at = Column(Integer, nullable=False, server_default="0", index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
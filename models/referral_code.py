@@ -0,0 +1,86 @@
+import os
+import string
+import threading
+from collections import deque
+from typing import List
+from dotenv import load_dotenv
+from sqlalchemy import select, text
+
+from models.database import UserDB
+
+load_dotenv()
+
+ALPHABET = string.ascii_uppercase + string.digits
+REFERRAL_CODE_MIN_LENGTH = int(os.getenv("REFERRAL_CODE_MIN_LENGTH", 4))
+REFERRAL_CODE_BLOCK_SIZE = int(os.getenv("REFERRAL_CODE_BLOCK_SIZE", 100))
+
+# Any multiplier coprime with 36 makes the affine map below a bijection on
+# every code length; this one is prime, so consecutive numbers land far apart.
+_MULTIPLIER = 2654435761
+_OFFSET = 1013904223
+
+
+def encode_referral_code(n: int, min_length: int = REFERRAL_CODE_MIN_LENGTH) -> str:
+    """
+    Map a sequence number to a referral code, one-to-one.
+
+    Numbers fill all codes of `min_length` characters first, then move on to
+    one character more, so the code length grows by itself once the shorter
+    space is used up. Within a length the number is scrambled by an affine
+    permutation so consecutive users do not get consecutive codes.
+    """
+    if n < 0:
+        raise ValueError("Referral code sequence number must not be negative")
+    length = min_length
+    space = len(ALPHABET) ** length
+    while n >= space:
+        n -= space
+        length += 1
+        space = len(ALPHABET) ** length
+
+    value = (n * _MULTIPLIER + _OFFSET) % space
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+class ReferralCodeAllocator:
+    """
+    Hands out referral codes from a block reserved in one round-trip.
+
+    Blocks come from the `referral_code_seq` sequence, so two workers never
+    reserve the same number, and every number maps to a distinct code. Codes
+    already taken by older, randomly generated users are dropped when the
+    block is reserved, so creating a user never retries on a collision.
+    """
+
+    def __init__(self, block_size: int = REFERRAL_CODE_BLOCK_SIZE):
+        self.block_size = block_size
+        self._codes = deque()
+        self._lock = threading.Lock()
+
+    def allocate(self) -> str:
+        with self._lock:
+            while not self._codes:
+                self._codes.extend(self._reserve_block())
+            return self._codes.popleft()
+
+    def _reserve_block(self) -> List[str]:
+        from db import engine
+
+        with engine.begin() as conn:
+            numbers = conn.execute(
+                text("SELECT nextval('referral_code_seq') FROM generate_series(1, :n)"),
+                {"n": self.block_size}
+            ).scalars().all()
+            # sequences start at 1, codes are numbered from 0
+            codes = [encode_referral_code(number - 1) for number in numbers]
+            taken = set(conn.execute(
+                select(UserDB.referral_code).where(UserDB.referral_code.in_(codes))
+            ).scalars())
+        return [code for code in codes if code not in taken]
+
+
+referral_code_allocator = ReferralCodeAllocator()
@@ -0,0 +1,143 @@
+from sqlalchemy import Integer, func, literal, select, update
+from sqlalchemy.orm import Session
+from models.database import ReferralEdgeDB, UserDB
+from src.core.invalidation import invalidations
+
+REFERRAL_LIMIT = 5
+
+def claim_referral_slot(referrer_id: str, referee_id: str, db: Session) -> bool:
+    """
+    Record that `referrer_id` referred `referee_id`, unless the referrer is at
+    REFERRAL_LIMIT. The counter is checked and bumped in a single UPDATE, so
+    concurrent signups cannot push a referrer past the limit. Nothing is
+    committed here; the caller commits together with the new user.
+    """
+    result = db.execute(
+        update(UserDB)
+        .where(UserDB.unique_id == referrer_id, UserDB.referral_count < REFERRAL_LIMIT)
+        .values(
+            referral_count=UserDB.referral_count + 1,
+            referrals=func.array_append(UserDB.referrals, referee_id)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        return False
+
+    # a bulk UPDATE, so the ORM hooks never see the referrer change
+    invalidations.publish(db, 'profile', referrer_id)
+    db.add(ReferralEdgeDB(referee_id=referee_id, referrer_id=referrer_id))
+    return True
+
+def release_referral_slot(referee_id: str, db: Session):
+    """
+    Give the slot `referee_id` took back to their referrer, for when the
+    referee is deleted: the count drops and the id leaves `referrals`, while
+    the bonus already paid is kept. The edge itself goes with the referee's
+    row (ON DELETE CASCADE). Nothing is committed here; call it in the
+    transaction that deletes the referee. Returns the referrer's id, if any.
+    """
+    referrer_id = get_referrer(referee_id, db)
+    if referrer_id is None:
+        return None
+    db.execute(
+        update(UserDB)
+        .where(UserDB.unique_id == referrer_id)
+        .values(
+            referral_count=func.greatest(UserDB.referral_count - 1, 0),
+            referrals=func.array_remove(UserDB.referrals, referee_id)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    invalidations.publish(db, 'profile', referrer_id)
+    return referrer_id
+
+def _descendants(user_id: str, max_depth: int):
+    """
+    Recursive CTE of (referee_id, referrer_id, depth) below `user_id`. Each
+    user has one referrer, so a cycle under `user_id` has to come back
+    through it; never following an edge back to `user_id` ends every cycle.
+    """
+    base = select(
+        ReferralEdgeDB.referee_id,
+        ReferralEdgeDB.referrer_id,
+        literal(1, Integer).label("depth")
+    ).where(ReferralEdgeDB.referrer_id == user_id, ReferralEdgeDB.referee_id != user_id)
+    tree = base.cte("referral_tree", recursive=True)
+
+    edge = ReferralEdgeDB.__table__.alias("edge")
+    tree = tree.union_all(
+        select(edge.c.referee_id, edge.c.referrer_id, tree.c.depth + 1)
+        .where(
+            edge.c.referrer_id == tree.c.referee_id,
+            edge.c.referee_id != user_id,
+            tree.c.depth < max_depth
+        )
+    )
+    return tree
+
+def get_referral_tree(user_id: str, max_depth: int, db: Session) -> list:
+    """Everyone `user_id` referred, directly or indirectly, as a nested tree."""
+    tree = _descendants(user_id, max_depth)
+    rows = db.execute(
+        select(
+            tree.c.referee_id,
+            tree.c.referrer_id,
+            tree.c.depth,
+            UserDB.first_name,
+            UserDB.last_name,
+            UserDB.referral_count
+        )
+        .join(UserDB, UserDB.unique_id == tree.c.referee_id)
+        .order_by(tree.c.depth, UserDB.created_at)
+    ).all()
+
+    nodes = {}
+    roots = []
+    for row in rows:
+        node = {
+            "id": row.referee_id,
+            "name": f"{row.first_name or ''} {row.last_name or ''}".strip(),
+            "depth": row.depth,
+            "referral_count": row.referral_count or 0,
+            "referrals": []
+        }
+        nodes[row.referee_id] = node
+        parent = nodes.get(row.referrer_id)
+        if parent is not None:
+            parent["referrals"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+def get_referral_level_counts(user_id: str, max_depth: int, db: Session) -> dict:
+    """Number of users referred at each depth below `user_id`."""
+    tree = _descendants(user_id, max_depth)
+    rows = db.execute(
+        select(tree.c.depth, func.count()).group_by(tree.c.depth).order_by(tree.c.depth)
+    ).all()
+    return {depth: count for depth, count in rows}
+
+def get_referrer(user_id: str, db: Session):
+    edge = db.query(ReferralEdgeDB.referrer_id).filter(ReferralEdgeDB.referee_id == user_id).first()
+    return edge.referrer_id if edge else None
+
+def get_top_referrers(limit: int, db: Session) -> list:
+    rows = db.query(
+        UserDB.unique_id,
+        UserDB.first_name,
+        UserDB.last_name,
+        UserDB.referral_count
+    ).filter(UserDB.referral_count > 0).order_by(
+        UserDB.referral_count.desc(),
+        UserDB.unique_id.asc()
+    ).limit(limit).all()
+
+    return [
+        {
+            "id": row.unique_id,
+            "name": f"{row.first_name or ''} {row.last_name or ''}".strip(),
+            "referral_count": row.referral_count
+        }
+        for row in rows
+    ]
@@ -0,0 +1,121 @@
+import re
+from bisect import bisect_right
+from typing import Dict, List, Optional
+
+# Events listed with only a start time ("6:00 PM", "12 Noon") are assumed to last this long
+DEFAULT_EVENT_MINUTES = 60
+
+_TIME_PATTERN = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?\s*$", re.IGNORECASE)
+
+
+def parse_time(value: str) -> Optional[int]:
+    """Minutes after midnight for "10:00 AM", "4 PM", "16:30", "12 Noon" or "Midnight"."""
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ("noon", "12 noon"):
+        return 12 * 60
+    if value in ("midnight", "12 midnight"):
+        return 0
+
+    match = _TIME_PATTERN.match(value)
+    if not match:
+        return None
+    hours = int(match.group(1))
+    minutes = int(match.group(2) or 0)
+    meridiem = (match.group(3) or "").replace(".", "")
+    if minutes > 59:
+        return None
+    if meridiem:
+        if not 1 <= hours <= 12:
+            return None
+        hours = hours % 12 + (12 if meridiem == "pm" else 0)
+    elif hours > 23:
+        return None
+    return hours * 60 + minutes
+
+
+def parse_time_range(value: str):
+    """(start, end) minutes for "10:00 AM - 11:00 AM"; a lone time gets DEFAULT_EVENT_MINUTES."""
+    if not value:
+        return None, None
+    parts = re.split(r"\s*[-–—]\s*|\s+to\s+", value.strip(), maxsplit=1)
+    start = parse_time(parts[0])
+    if start is None:
+        return None, None
+    end = parse_time(parts[1]) if len(parts) > 1 else None
+    if end is None or end <= start:
+        end = min(start + DEFAULT_EVENT_MINUTES, 24 * 60)
+    return start, end
+
+
+def format_time(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class DaySchedule:
+    """
+    Events of one day indexed by time. The day is cut at every start and end
+    into elementary segments, each holding the events running through it,
+    so "what is on at T" is one binary search. Start times are kept sorted
+    for "what is next".
+    """
+
+    def __init__(self, events: List[dict]):
+        timed = []
+        untimed = []
+        for position, event in enumerate(events):
+            start, end = parse_time_range(event.get("time"))
+            entry = dict(event)
+            if start is None:
+                untimed.append(entry)
+                continue
+            entry["start"] = format_time(start)
+            entry["end"] = format_time(end)
+            timed.append((start, end, position, entry))
+        timed.sort(key=lambda item: (item[0], item[2]))
+
+        self.events = [item[3] for item in timed] + untimed
+        self._starts = [item[0] for item in timed]
+        self._by_start = [item[3] for item in timed]
+
+        self._bounds = sorted({t for item in timed for t in item[:2]})
+        self._segments = []
+        for i, bound in enumerate(self._bounds[:-1]):
+            self._segments.append([entry for start, end, _, entry in timed if start <= bound < end])
+
+    def at(self, minutes: int) -> List[dict]:
+        i = bisect_right(self._bounds, minutes) - 1
+        if i < 0 or i >= len(self._segments):
+            return []
+        return self._segments[i]
+
+    def next(self, minutes: int, count: int) -> List[dict]:
+        i = bisect_right(self._starts, minutes)
+        return self._by_start[i:i + count]
+
+
+class ScheduleIndex:
+    """Per-day indexes over the parsed schedule file, rebuilt whenever it reloads."""
+
+    def __init__(self):
+        self.days: Dict[str, DaySchedule] = {}
+
+    def rebuild(self, data):
+        days = {}
+        if isinstance(data, dict):
+            for day, events in data.items():
+                if isinstance(events, list):
+                    days[day] = DaySchedule(events)
+        self.days = days
+
+    def find_day(self, day: str) -> Optional[str]:
+        """Accepts "Day 1", "day 1", "day1" or "1"."""
+        if day in self.days:
+            return day
+        wanted = day.lower().replace(" ", "")
+        for name in self.days:
+            normalized = name.lower().replace(" ", "")
+            if normalized == wanted or normalized == f"day{wanted}":
+                return name
+        return None
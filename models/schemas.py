@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -36,26 +36,62 @@ class UserUpdate(BaseModel):
         }
 
 class UserResponse(BaseModel):
-    unique_id: str
-    first_name: str
-    last_name: Optional[str]
-    email: Optional[str]
-    phone_number: Optional[str]
-    role: str
-    credits: int
-    balance: int
-    referral_code: str
-    referred_by: List[str]
-    created_at: Optional[datetime] = None
+    # fields left out by a sparse fieldset (?fields=) stay unset and are not serialized
+    unique_id: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    email: Optional[str] = None
+    phone_number: Optional[str] = None
+    role: Optional[str] = None
+    credits: Optional[int] = None
+    transaction_history: Optional[List[Dict[str, Any]]] = None
+    balance: Optional[int] = None
+    referral_code: Optional[str] = None
+    referred_by: Optional[List[str]] = None
+    version: Optional[int] = None
     updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
+class UserProfileResponse(BaseModel):
+    user: UserResponse
+
 class UserListResponse(BaseModel):
     users: List[UserResponse]
+    # left out with count=none
+    total: Optional[int] = None
+    page: int
+    limit: int
+    has_more: bool
+    next: Optional[str] = None
+
+class UserBatchResponse(BaseModel):
+    users: List[UserResponse]
+    missing: List[str]
+
+class UserChangesResponse(BaseModel):
+    users: List[UserResponse]
+    deleted: List[str]
+    next: str
+    has_more: bool
+
+class TransactionHistoryResponse(BaseModel):
+    # entries are the stored JSON as written by User.update_credits, passed through as-is
+    transaction_history: List[Dict[str, Any]]
     total: int
     page: int
     limit: int
     has_more: bool
 
+class LeaderboardEntry(BaseModel):
+    id: str
+    name: str
+    credits: int
+
+class LeaderboardResponse(BaseModel):
+    data: List[LeaderboardEntry]
+    count: int
+    cached: bool
+    cache_age: Optional[int] = None
+    updated_at: Optional[int] = None
@@ -1,11 +1,74 @@
 from models.role_model import Role
-from models.database import UserDB
+from models.database import UserDB, UserDeletionDB
+from models.contact_filter import contact_filter
+from models.referral_code import referral_code_allocator
+from sqlalchemy import ARRAY, String, any_, bindparam, inspect, text, tuple_
 from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from src.core.cache import MemoryCache, ReadThroughCache, RedisCache
+from src.core.invalidation import invalidations
 import datetime
-import random
-import string
+import os
 import uuid
 
+load_dotenv()
+
+PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', 30))
+PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 20000))
+PROFILE_CACHE_REDIS_URL = os.getenv('PROFILE_CACHE_REDIS_URL')
+
+# Public field name -> column, for sparse fieldsets (?fields=) that only read what they return
+USER_FIELDS = {
+    'unique_id': UserDB.unique_id,
+    'first_name': UserDB.first_name,
+    'last_name': UserDB.last_name,
+    'email': UserDB.email,
+    'phone_number': UserDB.phone_number,
+    'role': UserDB.role,
+    'credits': UserDB.credits,
+    'transaction_history': UserDB.transaction_history,
+    'balance': UserDB.balance,
+    'referral_code': UserDB.referral_code,
+    'referred_by': UserDB.referred_by,
+    'version': UserDB.version,
+    'updated_at': UserDB.updated_at,
+}
+
+# Keys of a transaction_history entry, see User.update_credits
+TRANSACTION_FIELDS = (
+    'transaction_id', 'type', 'points', 'balance_before', 'balance_after',
+    'timestamp', 'action_user', 'status', 'metadata'
+)
+
+_ROLE_VALUES = {role.value for role in Role}
+
+def parse_fields(fields: str, allowed) -> list:
+    """Split a comma-separated `fields` parameter, keeping order and rejecting unknown names."""
+    names = []
+    for name in fields.split(','):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in allowed:
+            raise ValueError(f"Unknown field: {name}")
+        names.append(name)
+    if not names:
+        raise ValueError("fields must name at least one field")
+    return names
+
+def _field_value(field: str, value):
+    # same defaults as User.get_by_id(...).to_dict()
+    if field == 'role':
+        return value if value in _ROLE_VALUES else Role.USER.value
+    if field in ('transaction_history', 'referred_by'):
+        return value or []
+    if field == 'balance':
+        return value or 0
+    return value
+
+def _project(fields: list, row) -> dict:
+    return {field: _field_value(field, value) for field, value in zip(fields, row)}
+
 class User:
     def __init__(self, first_name: str, last_name: str, unique_id: str = None, email: str = "", phone_number: str = "", is_user: bool = False, is_admin: bool = False, is_sales: bool = False, credits: int = 0, transaction_history: list = None, balance=0, referral_code:str=None, referred_by:list[str]=None):
         self.unique_id = unique_id or str(uuid.uuid4())
@@ -17,9 +80,12 @@ class User:
         self.credits = credits
         self.transaction_history = transaction_history if transaction_history is not None else []
         self.balance = balance
-        self.referral_code = referral_code or generate_referral_code()
+        # allocated by save() when the user is inserted; building a User never touches the database
+        self.referral_code = referral_code
         self.referred_by = referred_by if referred_by is not None else []
         self.referrals = []
+        self.version = None
+        self.updated_at = None
 
     def to_dict(self):
         return {
@@ -36,11 +102,15 @@ class User:
             'referred_by': self.referred_by
         }
 
-    def save(self, db: Session):
-        # Check if user exists
-        db_user = db.query(UserDB).filter(UserDB.unique_id == self.unique_id).first()
+    def save(self, db: Session, commit: bool = True):
+        # Check if user exists (no query when the session already loaded the row, e.g. to lock it)
+        db_user = db.get(UserDB, self.unique_id)
         
         if db_user:
+            # Replaced contacts linger in the availability filter until its next rebuild
+            if db_user.email != self.email or db_user.phone_number != self.phone_number:
+                contact_filter.note_removed()
+
             # Update existing user
             db_user.first_name = self.first_name
             db_user.last_name = self.last_name
@@ -52,10 +122,12 @@ class User:
             db_user.balance = self.balance
             db_user.referral_code = self.referral_code
             db_user.referred_by = self.referred_by
-            db_user.referrals = self.referrals
+            # referrals are only appended atomically by claim_referral_slot
             print(f"User {self.unique_id} updated.")
         else:
             # Create new user
+            if not self.referral_code:
+                self.referral_code = generate_referral_code()
             db_user = UserDB(
                 unique_id=self.unique_id,
                 first_name=self.first_name,
@@ -72,11 +144,13 @@ class User:
             )
             db.add(db_user)
             print(f"User {self.unique_id} created.")
-        
-        db.commit()
-        db.refresh(db_user)
 
-    def update_credits(self, amount: int, transaction_type: str, action_user: str, db: Session):
+        # commit=False leaves the change to the caller's transaction, which keeps its row locks
+        if commit:
+            db.commit()
+        contact_filter.add(self.email, self.phone_number)
+
+    def update_credits(self, amount: int, transaction_type: str, action_user: str, db: Session, commit: bool = True):
         # Ensure that credits don't go below 0 for redemption
         if self.credits + amount < 0:
             raise ValueError("Insufficient credits to redeem")
@@ -105,33 +179,113 @@ class User:
         self.transaction_history.append(transaction_entry)
 
         # Save the updated user data
-        self.save(db)
+        self.save(db, commit)
 
     def get_current_credits(self):
         return self.credits
 
+    @classmethod
+    def from_db(cls, db_user: UserDB):
+        user = cls(
+            unique_id=db_user.unique_id,
+            first_name=db_user.first_name,
+            last_name=db_user.last_name,
+            email=db_user.email,
+            phone_number=db_user.phone_number,
+            is_user=db_user.role == Role.USER.value,
+            is_admin=db_user.role == Role.ADMIN.value,
+            is_sales=db_user.role == Role.SALES.value,
+            credits=db_user.credits,
+            # copies: save() assigns them back, and the ORM only writes a JSON/ARRAY
+            # column when it gets a different object, not the same list mutated in place
+            transaction_history=list(db_user.transaction_history or []),
+            balance=db_user.balance or 0,
+            referral_code=db_user.referral_code,
+            referred_by=list(db_user.referred_by or [])
+        )
+        user.referrals = db_user.referrals or []
+        user.version = db_user.version
+        user.updated_at = db_user.updated_at
+        return user
+
     @classmethod
     def get_by_id(cls, unique_id: str, db: Session):
         db_user = db.query(UserDB).filter(UserDB.unique_id == unique_id).first()
-        if db_user:
-            user = cls(
-                unique_id=db_user.unique_id,
-                first_name=db_user.first_name,
-                last_name=db_user.last_name,
-                email=db_user.email,
-                phone_number=db_user.phone_number,
-                is_user=db_user.role == Role.USER.value,
-                is_admin=db_user.role == Role.ADMIN.value,
-                is_sales=db_user.role == Role.SALES.value,
-                credits=db_user.credits,
-                transaction_history=db_user.transaction_history or [],
-                balance=db_user.balance or 0,
-                referral_code=db_user.referral_code,
-                referred_by=db_user.referred_by or []
-            )
-            user.referrals = db_user.referrals or []
-            return user
-        return None
+        return cls.from_db(db_user) if db_user else None
+
+    @classmethod
+    def lock_by_ids(cls, unique_ids: list, db: Session) -> dict:
+        """
+        Load and row-lock (FOR UPDATE) the given users in one query, as a dict
+        by unique_id. Rows are locked in unique_id order, so two transactions
+        locking the same pair cannot deadlock.
+        """
+        rows = db.query(UserDB).filter(UserDB.unique_id.in_(unique_ids)) \
+            .order_by(UserDB.unique_id).with_for_update().all()
+        users = {}
+        for row in rows:
+            users[row.unique_id] = user = cls.from_db(row)
+            # the session only holds rows weakly; keeping the locked row alive lets save() reuse it without a query
+            user._row = row
+        return users
+
+    @staticmethod
+    def get_fields_by_id(unique_id: str, fields: list, db: Session):
+        """Only the given fields of one user as a dict, reading just those columns."""
+        row = db.query(*(USER_FIELDS[field] for field in fields)).filter(UserDB.unique_id == unique_id).first()
+        return _project(fields, row) if row is not None else None
+
+    @staticmethod
+    def get_fields_by_ids(unique_ids: list, fields: list, db: Session) -> dict:
+        """unique_id -> projected dict for the ids that exist, in one `unique_id = ANY(:ids)` query."""
+        if 'unique_id' not in fields:
+            fields = ['unique_id'] + fields
+        ids = bindparam('ids', unique_ids, type_=ARRAY(String))
+        rows = db.query(*(USER_FIELDS[field] for field in fields)).filter(UserDB.unique_id == any_(ids)).all()
+        projected = [_project(fields, row) for row in rows]
+        return {user['unique_id']: user for user in projected}
+
+    @staticmethod
+    def list_page(fields: list, db: Session, after=None, offset: int = 0, limit: int = 10):
+        """
+        A page of projected users in (created_at, unique_id) order, starting
+        after the keyset `after` (served by ix_users_created_at) or at `offset`.
+        Returns the rows and the key to continue from, None on the last page.
+        """
+        query = db.query(*(USER_FIELDS[field] for field in fields), UserDB.created_at, UserDB.unique_id)
+        if after is not None:
+            query = query.filter(tuple_(UserDB.created_at, UserDB.unique_id) > tuple_(*after))
+        rows = query.order_by(UserDB.created_at, UserDB.unique_id).offset(offset).limit(limit + 1).all()
+        next_key = (rows[limit - 1][-2], rows[limit - 1][-1]) if len(rows) > limit else None
+        return [_project(fields, row[:-2]) for row in rows[:limit]], next_key
+
+    @staticmethod
+    def estimated_count(db: Session) -> int:
+        """The planner's row estimate for users, kept current by autovacuum; -1 before the first ANALYZE"""
+        return int(db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass")).scalar())
+
+    @staticmethod
+    def changes_since(fields: list, db: Session, horizon, after=None, limit: int = 100):
+        """
+        Projected users changed after the (updated_at, unique_id) keyset `after`
+        and no later than `horizon`, oldest first. Returns limit + 1 rows at most
+        so callers can tell whether there is more.
+        """
+        for field in ('updated_at', 'unique_id'):
+            if field not in fields:
+                fields = fields + [field]
+        query = db.query(*(USER_FIELDS[field] for field in fields)).filter(UserDB.updated_at <= horizon)
+        if after is not None:
+            query = query.filter(tuple_(UserDB.updated_at, UserDB.unique_id) > tuple_(*after))
+        rows = query.order_by(UserDB.updated_at, UserDB.unique_id).limit(limit + 1).all()
+        return [_project(fields, row) for row in rows]
+
+    @staticmethod
+    def deleted_between(db: Session, start, end) -> list:
+        query = db.query(UserDeletionDB.unique_id).filter(UserDeletionDB.deleted_at <= end)
+        if start is not None:
+            query = query.filter(UserDeletionDB.deleted_at > start)
+        return [row.unique_id for row in query.order_by(UserDeletionDB.deleted_at)]
 
     @classmethod
     def get_all(cls, db: Session):
@@ -157,7 +311,60 @@ class User:
             users.append(user)
         return users
 
+def _load_profile(unique_id: str, db: Session):
+    user = User.get_by_id(unique_id, db)
+    if user is None:
+        return None
+    # JSON-safe, so the entry can live in a shared backend as well
+    return {
+        'user': user.to_dict(),
+        'version': user.version,
+        'updated_at': user.updated_at.isoformat() if user.updated_at else None
+    }
+
+def _profile_cache_backend():
+    if PROFILE_CACHE_REDIS_URL:
+        return RedisCache(PROFILE_CACHE_REDIS_URL, ttl=PROFILE_CACHE_TTL, prefix='profile:')
+    return MemoryCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+# unique_id -> {'user': to_dict(), 'version', 'updated_at'}; get with await profile_cache.get(unique_id, db).
+# ORM changes to a user evict it in every worker on commit; bulk statements must
+# call invalidations.publish(db, 'profile', unique_id) themselves
+profile_cache = ReadThroughCache(_load_profile, _profile_cache_backend())
+invalidations.subscribe(
+    'profile',
+    profile_cache.invalidate,
+    # after missed events only a per-worker cache needs emptying; a shared one was evicted by the writer
+    profile_cache.clear if isinstance(profile_cache.backend, MemoryCache) else lambda: None
+)
+
+# Columns the leaderboard shows, a change to any of them reorders or renames an entry
+_LEADERBOARD_COLUMNS = ('credits', 'first_name', 'last_name')
+
+def leaderboard_event_key(unique_id: str, credits=None) -> str:
+    """
+    Key of a 'leaderboard' event: the user and their credits after the change,
+    None for a deleted user. Each worker compares it with its cached cutoff
+    (see evict_leaderboard in controllers/credit_controller.py).
+    """
+    return f"{'' if credits is None else int(credits)}|{unique_id}"
+
+def _user_invalidations(db_user: UserDB, op: str):
+    yield ('profile', db_user.unique_id)
+    if op != 'update' or any(
+        inspect(db_user).attrs[column].history.has_changes() for column in _LEADERBOARD_COLUMNS
+    ):
+        credits = None if op == 'delete' else (db_user.credits or 0)
+        yield ('leaderboard', leaderboard_event_key(db_user.unique_id, credits))
+    # new contacts go into every worker's contact filter (removed ones just linger until its rebuild)
+    if op != 'delete':
+        for column, prefix in (('email', 'email:'), ('phone_number', 'phone:')):
+            value = getattr(db_user, column)
+            if value and (op == 'insert' or inspect(db_user).attrs[column].history.has_changes()):
+                yield ('contact', prefix + value)
+
+invalidations.track(UserDB, _user_invalidations)
+
 def generate_referral_code():
-    code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-    # Note: This should be checked against the database in actual usage
-    return code
\ No newline at end of file
+    # Unique by construction, no need to check the database
+    return referral_code_allocator.allocate()
\ No newline at end of file
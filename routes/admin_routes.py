@@ -6,9 +6,12 @@ from controllers.admin_controller import (
     update_user_points, 
     add_user, 
     remove_user,
-    change_user_role
+    change_user_role,
+    get_cache_stats,
+    get_pool_metrics
 )
-from db import get_db
+from db import get_db, get_admin_db
+from src.core.auth import get_optional_claims
 
 admin_router = APIRouter()
 
@@ -16,8 +19,8 @@ async def verify_admin_token(token: str = Header(None, alias="TOKEN")):
     return auth_middleware(token)
 
 @admin_router.get('/users', dependencies=[Depends(verify_admin_token)])
-async def get_all_users_route(sort: str = Query(default="ascending"), db: Session = Depends(get_db)):
-    users = await get_all_users(db)
+async def get_all_users_route(sort: str = Query(default="ascending"), role: str = Query(default=None), db: Session = Depends(get_admin_db)):
+    users = await get_all_users(db, role)
     if sort == "descending":
         users.sort(key=lambda x: x["credits"], reverse=True)
     else:
@@ -39,8 +42,16 @@ async def remove_user_route(user_id: str, db: Session = Depends(get_db)):
     return await remove_user(user_id, db)
 
 @admin_router.put('/users/role', dependencies=[Depends(verify_admin_token)])
-async def change_role_route(role_data: dict, db: Session = Depends(get_db)):
+async def change_role_route(role_data: dict, db: Session = Depends(get_db), claims: dict = Depends(get_optional_claims)):
     admin_id = role_data.get('admin_id')
     target_user_id = role_data.get('user_id')
     new_role = role_data.get('role')
-    return await change_user_role(admin_id, target_user_id, new_role, db)
\ No newline at end of file
+    return await change_user_role(admin_id, target_user_id, new_role, db, claims)
+
+@admin_router.get('/cache/stats', dependencies=[Depends(verify_admin_token)])
+async def cache_stats_route():
+    return await get_cache_stats()
+
+@admin_router.get('/metrics/pools', dependencies=[Depends(verify_admin_token)])
+async def pool_metrics_route():
+    return await get_pool_metrics()
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from controllers.credit_controller import (
     allocate_points, 
@@ -6,23 +7,25 @@ from controllers.credit_controller import (
     transaction_history, 
     leaderboard
 )
-from db import get_db
+from db import get_critical_db, get_read_db
+from models.schemas import LeaderboardResponse, TransactionHistoryResponse
+from src.core.auth import get_optional_claims
 
 credit_router = APIRouter()
 
 # Route to allocate points to a user
 @credit_router.post('/points/allocate')
-async def allocate_points_route(points_data: dict, db: Session = Depends(get_db)):
-    return await allocate_points(points_data, db)
+async def allocate_points_route(points_data: dict, db: Session = Depends(get_critical_db), claims: dict = Depends(get_optional_claims)):
+    return await allocate_points(points_data, db, claims)
 
 # Route to redeem points from a user
 @credit_router.post('/points/redeem')
-async def redeem_points_route(redeem_data: dict, db: Session = Depends(get_db)):
+async def redeem_points_route(redeem_data: dict, db: Session = Depends(get_critical_db)):
     return await redeem_points(redeem_data, db)
 
 # Route to get transaction history of a user (POST - backward compatibility)
-@credit_router.post('/transactions/history')
-async def transaction_history_route_post(history_data: dict, db: Session = Depends(get_db)):
+@credit_router.post('/transactions/history', response_model=TransactionHistoryResponse)
+async def transaction_history_route_post(history_data: dict, db: Session = Depends(get_read_db)):
     user_id = history_data.get('user_id')
     if not user_id:
         from fastapi import HTTPException
@@ -30,7 +33,11 @@ async def transaction_history_route_post(history_data: dict, db: Session = Depen
     return await transaction_history(user_id, db)
 
 # Route to get transaction history of a user (GET - RESTful)
-@credit_router.get('/history/{user_id}')
+@credit_router.get(
+    '/history/{user_id}',
+    response_model=TransactionHistoryResponse,
+    responses={200: {"content": {"text/csv": {}}, "description": "JSON page, or a CSV file with format=csv"}}
+)
 async def transaction_history_route_get(
     user_id: str,
     page: int = Query(default=1, ge=1, description="Page number"),
@@ -39,14 +46,16 @@ async def transaction_history_route_get(
     start_date: str = Query(default=None, description="Start date (ISO format)"),
     end_date: str = Query(default=None, description="End date (ISO format)"),
     format: str = Query(default="json", description="Response format (json/csv)"),
-    db: Session = Depends(get_db)
+    fields: str = Query(default=None, description="Comma-separated transaction fields to return, e.g. type,points,timestamp"),
+    db: Session = Depends(get_read_db)
 ):
-    return await transaction_history(user_id, db, page, limit, transaction_type, start_date, end_date, format)
+    return await transaction_history(user_id, db, page, limit, transaction_type, start_date, end_date, format, fields)
 
-@credit_router.get('/leaderboard')
-async def get_leaderboard(limit: int = Query(default=10, le=50), db: Session = Depends(get_db)):
+@credit_router.get('/leaderboard', response_model=LeaderboardResponse, response_model_exclude_none=True)
+async def get_leaderboard(limit: int = Query(default=10, le=50), db: Session = Depends(get_read_db)):
     try:
         return await leaderboard(limit, db)
     except Exception as e:
         print(f"Route Error: {str(e)}")
-        return {"error": "Server timeout"}
\ No newline at end of file
+        # returned as a response so it skips LeaderboardResponse validation
+        return ORJSONResponse({"error": "Server timeout"})
\ No newline at end of file
@@ -1,20 +1,31 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
 from controllers.data_controller import (
-    get_schedule, 
-    get_items,
-    get_events
+    schedule_file,
+    items_file,
+    events_file,
+    query_schedule
 )
 
 data_router = APIRouter()
 
+# Served from memory; clients revalidate with If-None-Match and get 304 when unchanged
+
 @data_router.get('/schedule')
-async def schedule():
-    return get_schedule()
+async def schedule(request: Request):
+    return schedule_file.response(request)
+
+@data_router.get('/schedule/query')
+async def schedule_query(
+    day: str = Query(default=None, description="Day name, e.g. 'Day 1' (defaults to today)"),
+    at: str = Query(default=None, description="Time, e.g. '14:30' or '2:30 PM' (defaults to now)"),
+    next: int = Query(default=None, ge=1, le=50, description="Number of upcoming events"),
+):
+    return await query_schedule(day, at, next)
 
 @data_router.get('/items')
-async def get_items_route():
-    return get_items()
+async def get_items_route(request: Request):
+    return items_file.response(request)
 
 @data_router.get('/events')
-async def events():
-    return get_events()
\ No newline at end of file
+async def events(request: Request):
+    return events_file.response(request)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from controllers.referral_controller import (
+    referral_tree,
+    referral_levels,
+    top_referrers
+)
+from db import get_read_db
+
+referral_router = APIRouter()
+
+@referral_router.get('/top')
+async def top_referrers_route(limit: int = Query(default=10, ge=1, le=50), db: Session = Depends(get_read_db)):
+    return await top_referrers(limit, db)
+
+@referral_router.get('/{user_id}/tree')
+async def referral_tree_route(
+    user_id: str,
+    depth: int = Query(default=3, ge=1, le=10, description="Levels below the user"),
+    db: Session = Depends(get_read_db)
+):
+    return await referral_tree(user_id, depth, db)
+
+@referral_router.get('/{user_id}/levels')
+async def referral_levels_route(
+    user_id: str,
+    depth: int = Query(default=5, ge=1, le=10, description="Levels below the user"),
+    db: Session = Depends(get_read_db)
+):
+    return await referral_levels(user_id, depth, db)
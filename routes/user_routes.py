@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
 from controllers.user_controller import (
     add_user, 
     update_profile, 
     delete_profile, 
     get_profile,
+    get_users_batch,
+    list_changes,
     list_users
 )
-from db import get_db
+from db import get_db, get_read_db
+from models.schemas import UserBatchResponse, UserChangesResponse, UserListResponse, UserProfileResponse
 
 user_router = APIRouter()
 
@@ -23,14 +26,47 @@ async def update_profile_route(user_data: dict, db: Session = Depends(get_db)):
 async def delete_profile_route(user_data: dict, db: Session = Depends(get_db)):
     return await delete_profile(user_data, db)
 
-@user_router.get('/profile/{unique_id}')
-async def get_profile_route(unique_id: str, db: Session = Depends(get_db)):
-    return await get_profile(unique_id, db)
+@user_router.get('/profile/{unique_id}', response_model=UserProfileResponse, response_model_exclude_unset=True)
+async def get_profile_route(
+    unique_id: str,
+    request: Request,
+    response: Response,
+    fields: str = Query(default=None, description="Comma-separated user fields to return, e.g. credits,balance"),
+    db: Session = Depends(get_read_db),
+    # only connects on a profile cache miss
+    primary: Session = Depends(get_db)
+):
+    return await get_profile(unique_id, db, fields, request, response, primary)
+
+@user_router.get('/changes', response_model=UserChangesResponse, response_model_exclude_unset=True)
+async def list_changes_route(
+    since: str = Query(default=None, description="Cursor from a previous response's `next` (omit for a full sync)"),
+    limit: int = Query(default=100, ge=1, le=500, description="Users per page"),
+    fields: str = Query(default=None, description="Comma-separated user fields to return (default: all but transaction_history)"),
+    db: Session = Depends(get_read_db)
+):
+    return await list_changes(db, since, limit, fields)
+
+@user_router.get('/batch', response_model=UserBatchResponse, response_model_exclude_unset=True)
+async def get_users_batch_route(
+    ids: str = Query(..., description="Comma-separated user ids"),
+    fields: str = Query(default=None, description="Comma-separated user fields to return (default: all but transaction_history)"),
+    db: Session = Depends(get_read_db)
+):
+    return await get_users_batch(ids, db, fields)
+
+# Same as GET /batch for lists too long for a URL: {"ids": [...], "fields": "..."}
+@user_router.post('/batch', response_model=UserBatchResponse, response_model_exclude_unset=True)
+async def post_users_batch_route(batch_data: dict, db: Session = Depends(get_read_db)):
+    return await get_users_batch(batch_data.get('ids'), db, batch_data.get('fields'))
 
-@user_router.get('/list')
+@user_router.get('/list', response_model=UserListResponse, response_model_exclude_unset=True)
 async def list_users_route(
     page: int = Query(default=1, ge=1, description="Page number"),
     limit: int = Query(default=10, ge=1, le=100, description="Items per page"),
-    db: Session = Depends(get_db)
+    fields: str = Query(default=None, description="Comma-separated user fields to return, e.g. unique_id,first_name,credits"),
+    cursor: str = Query(default=None, description="`next` from the previous page; takes precedence over page"),
+    count: str = Query(default="cached", description="Total: cached (exact, refreshed every minute), estimate or none"),
+    db: Session = Depends(get_read_db)
 ):
-    return await list_users(page=page, limit=limit, db=db)
\ No newline at end of file
+    return await list_users(page=page, limit=limit, db=db, fields=fields, cursor=cursor, count=count)
\ No newline at end of file
@@ -13,16 +13,18 @@ from controllers.website_controller import (
     update_user_balance_logic,
     search_users
 )
-from db import get_db
+from db import get_db, get_admin_db
+from src.core.static_files import static_files
 import os
 
 website_router = APIRouter()
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_files.url_for
 
 # do NOT change the routes without manually changing stuff in templates
 
 @website_router.get("/", response_class=HTMLResponse)
-async def route_home(request: Request, query: str = Query(None), db: Session = Depends(get_db)):
+async def route_home(request: Request, query: str = Query(None), db: Session = Depends(get_admin_db)):
     if query:
         return await search_users(request, query, db)
     return await home(request, db)
@@ -36,7 +38,7 @@ async def route_add_user_post(user_data: dict, db: Session = Depends(get_db)):
     return await add_user_logic(user_data, db)
 
 @website_router.get("/user/{user_id}", response_class=HTMLResponse)
-async def route_user_details(request: Request, user_id: str, db: Session = Depends(get_db)):
+async def route_user_details(request: Request, user_id: str, db: Session = Depends(get_admin_db)):
     return await user_details(request, user_id, db)
 
 @website_router.post("/user/points/update")
@@ -71,5 +73,5 @@ async def route_delete_user(
     return await delete_user_logic(user_id, db)
 
 @website_router.get("/user/{user_id}/transactions")
-async def route_user_transactions(user_id: str, db: Session = Depends(get_db)):
+async def route_user_transactions(user_id: str, db: Session = Depends(get_admin_db)):
     return await get_user_transactions_logic(user_id, db)
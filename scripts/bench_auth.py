@@ -0,0 +1,88 @@
+"""
+Benchmark role-gated requests with and without the verified-token cache.
+Drives the ASGI app in-process, so the numbers show the auth overhead alone
+(no network, no database).
+
+Usage:
+    JWT_SECRET=... python scripts/bench_auth.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPBearer
+
+from src.core.auth import require_roles, token_cache
+from src.core.token import create_access_token, verify_access_token
+
+bearer_scheme = HTTPBearer()
+
+app = FastAPI()
+
+
+async def uncached_sales_or_admin(credentials=Depends(bearer_scheme)):
+    claims = verify_access_token(credentials.credentials)
+    if claims["role"] not in ("SALES", "ADMIN"):
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    return claims
+
+
+@app.get("/before")
+async def before(claims: dict = Depends(uncached_sales_or_admin)):
+    return {"user_id": claims["user_id"]}
+
+
+@app.get("/after")
+async def after(claims: dict = Depends(require_roles("SALES", "ADMIN"))):
+    return {"user_id": claims["user_id"]}
+
+
+async def _request(path: str, headers):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def _bench(path: str, headers, n: int) -> float:
+    assert await _request(path, headers) == 200
+    start = time.perf_counter()
+    for _ in range(n):
+        await _request(path, headers)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    token = create_access_token("bench-user", "SALES")
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+
+    token_cache.clear()
+    before_rps = asyncio.run(_bench("/before", headers, n))
+    after_rps = asyncio.run(_bench("/after", headers, n))
+
+    print(f"requests:               {n}")
+    print(f"verify every request:   {before_rps:,.0f} req/s")
+    print(f"verified-token cache:   {after_rps:,.0f} req/s")
+    print(f"speedup:                {after_rps / before_rps:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Measure bytes on the wire and compression CPU for the largest JSON
+responses at several gzip levels and brotli qualities. Payloads are
+synthetic but shaped like the real endpoints (UUID ids, ISO timestamps),
+since random ids are what limits the ratio.
+
+Usage:
+    python scripts/bench_compression.py [users]
+"""
+import gzip
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from src.core.compression import COMPRESSION_BROTLI_QUALITY, COMPRESSION_GZIP_LEVEL
+
+FIRST_NAMES = ["Aarav", "Diya", "Ishaan", "Kavya", "Rohan", "Saanvi", "Vihaan", "Ananya", "Arjun", "Meera"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Mehta", "Joshi", "Rao", "Das"]
+
+
+def _id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _transactions(rng, user_id, count):
+    balance = 0
+    history = []
+    for n in range(count):
+        points = rng.choice([10, 20, 50, 100])
+        history.append({
+            "transaction_id": _id(rng),
+            "type": "ALLOCATE",
+            "points": points,
+            "balance_before": balance,
+            "balance_after": balance + points,
+            "timestamp": f"2025-02-{1 + n % 3:02d}T{9 + n % 9:02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{rng.randrange(10 ** 6):06d}",
+            "action_user": user_id,
+            "status": "SUCCESS",
+            "metadata": {},
+        })
+        balance += points
+    return history
+
+
+def _user(rng, i):
+    unique_id = _id(rng)
+    return {
+        "unique_id": unique_id,
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "email": f"attendee{i}@example.com",
+        "phone_number": f"9{rng.randrange(10 ** 9):09d}",
+        "role": "USER",
+        "credits": rng.randrange(500),
+        "transaction_history": _transactions(rng, _id(rng), rng.randrange(6)),
+        "balance": 0,
+        "referral_code": f"{rng.randrange(36 ** 4):04X}",
+        "referred_by": [],
+    }
+
+
+def payloads(user_count: int):
+    rng = random.Random(42)
+    users = [_user(rng, i) for i in range(user_count)]
+    return {
+        "/admin/users": [
+            {"unique_id": u["unique_id"], "name": f"{u['first_name']} {u['last_name']}", "credits": u["credits"]}
+            for u in users
+        ],
+        "/user/list?limit=100": {"users": users[:100], "total": user_count, "page": 1, "limit": 100, "has_more": True},
+        "/history/{id}?limit=100": {
+            "transaction_history": _transactions(rng, _id(rng), 100),
+            "total": 240, "page": 1, "limit": 100, "has_more": True,
+        },
+        "/leaderboard?limit=50": {
+            "data": [{"id": u["unique_id"], "name": f"{u['first_name']} {u['last_name']}", "credits": u["credits"]}
+                     for u in users[:50]],
+            "count": 50, "cached": True, "cache_age": 12,
+        },
+    }
+
+
+def _time(fn, body, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(body)
+    return len(out), (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    codecs = [(f"gzip-{level}", lambda b, level=level: gzip.compress(b, compresslevel=level)) for level in (1, 5, 6, 9)]
+    if brotli is not None:
+        codecs += [(f"br-{q}", lambda b, q=q: brotli.compress(b, quality=q)) for q in (1, 4, 6, 11)]
+
+    print(f"defaults: gzip-{COMPRESSION_GZIP_LEVEL}, br-{COMPRESSION_BROTLI_QUALITY}")
+    for path, payload in payloads(user_count).items():
+        body = orjson.dumps(payload)
+        print(f"\n{path}  identity {len(body):,} bytes")
+        for name, fn in codecs:
+            size, micros = _time(fn, body, repeat=3 if name == "br-11" else 20)
+            print(f"  {name:8} {size:>10,} bytes  {size / len(body):6.1%}  {micros:9.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure what RequestMetricsMiddleware adds to each request, and how long
+rendering /metrics takes. Requests are driven straight through the ASGI
+app (no HTTP server or client), so the difference between the two runs is
+the middleware alone.
+
+Usage:
+    python scripts/bench_metrics.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+
+from src.core.metrics import RequestMetrics, RequestMetricsMiddleware, render_prometheus
+
+
+def build_app(instrumented: bool, metrics: RequestMetrics):
+    app = FastAPI()
+
+    @app.get("/user/profile/{unique_id}")
+    async def profile(unique_id: str):
+        return {"unique_id": unique_id}
+
+    if instrumented:
+        app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+    return app
+
+
+async def drive(app, count: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for i in range(count):
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/user/profile/{i}",
+            "raw_path": f"/user/profile/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 1234),
+            "server": ("127.0.0.1", 8000),
+        }
+        await app(scope, receive, send)
+    return time.perf_counter() - started
+
+
+async def main(count: int):
+    metrics = RequestMetrics()
+    plain, instrumented = build_app(False, metrics), build_app(True, metrics)
+    # warm up routing and the first histogram
+    await drive(plain, 1000)
+    await drive(instrumented, 1000)
+
+    rounds = {"plain": [], "instrumented": []}
+    for _ in range(5):
+        rounds["plain"].append(await drive(plain, count))
+        rounds["instrumented"].append(await drive(instrumented, count))
+
+    best = {name: min(times) / count * 1e6 for name, times in rounds.items()}
+    print(f"{count} requests per round, best of 5")
+    print(f"  without middleware  {best['plain']:8.2f} us/request")
+    print(f"  with middleware     {best['instrumented']:8.2f} us/request")
+    print(f"  overhead            {best['instrumented'] - best['plain']:8.2f} us/request "
+          f"({(best['instrumented'] / best['plain'] - 1) * 100:.1f}%)")
+
+    # the middleware around an app that does nothing, which isolates its own cost
+    class Route:
+        path = "/user/profile/{unique_id}"
+
+    async def noop(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    bare = {"noop": noop, "wrapped": RequestMetricsMiddleware(noop, metrics=metrics)}
+    for name, app in bare.items():
+        rounds[name] = [await drive(app, count) for _ in range(5)]
+    noop_cost = (min(rounds["wrapped"]) - min(rounds["noop"])) / count * 1e6
+    print(f"  around a no-op app  {noop_cost:8.2f} us/request")
+
+    # a realistic number of series: ~40 routes with a few statuses each
+    for route in range(40):
+        for status in (200, 400, 404, 500):
+            metrics.observe("GET", f"/route/{route}", status, 0.01)
+    started = time.perf_counter()
+    text = render_prometheus(metrics, pools={})
+    elapsed = time.perf_counter() - started
+    print(f"render /metrics      {elapsed * 1e3:8.2f} ms for {text.count(chr(10))} lines")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000))
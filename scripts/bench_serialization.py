@@ -0,0 +1,123 @@
+"""
+Benchmark serializing a 100-row /user/list page: a plain dict run through
+jsonable_encoder and stdlib json (the old path) against the typed
+UserListResponse model with orjson (the current path). Drives the ASGI app
+in-process with canned data, so the numbers show the serialization cost
+alone (no network, no database).
+
+Usage:
+    python scripts/bench_serialization.py [requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from models.schemas import UserListResponse
+
+ROWS = 100
+
+
+def _page():
+    users = []
+    for i in range(ROWS):
+        users.append({
+            "unique_id": f"user-{i:04d}",
+            "first_name": "First",
+            "last_name": f"Last {i}",
+            "email": f"user{i}@example.com",
+            "phone_number": f"98{i:08d}",
+            "role": "USER",
+            "credits": i * 10,
+            "transaction_history": [
+                {
+                    "transaction_id": f"00000000-0000-0000-0000-{i:06d}{n:06d}",
+                    "type": "ALLOCATE",
+                    "points": 10,
+                    "balance_before": n * 10,
+                    "balance_after": (n + 1) * 10,
+                    "timestamp": "2025-01-15T10:30:00.000000",
+                    "action_user": "sales-0001",
+                    "status": "SUCCESS",
+                    "metadata": {},
+                }
+                for n in range(5)
+            ],
+            "balance": 0,
+            "referral_code": f"R{i:04d}",
+            "referred_by": [],
+        })
+    return {"users": users, "total": 5000, "page": 1, "limit": ROWS, "has_more": True}
+
+
+PAGE = _page()
+
+app = FastAPI()
+
+
+@app.get("/before", response_class=JSONResponse)
+async def before():
+    return PAGE
+
+
+@app.get("/after", response_model=UserListResponse, response_class=ORJSONResponse)
+async def after():
+    return PAGE
+
+
+async def _request(path: str):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "", "headers": [],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    status = []
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+        elif message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status[0], b"".join(body)
+
+
+async def _bench(path: str, n: int) -> float:
+    status, _ = await _request(path)
+    assert status == 200
+    start = time.perf_counter()
+    for _ in range(n):
+        await _request(path)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    import json
+    _, before_body = asyncio.run(_request("/before"))
+    _, after_body = asyncio.run(_request("/after"))
+    assert json.loads(before_body) == json.loads(after_body), "typed model changed the response"
+
+    before_rps = asyncio.run(_bench("/before", n))
+    after_rps = asyncio.run(_bench("/after", n))
+
+    print(f"{ROWS}-row page, {len(after_body)} bytes")
+    print(f"jsonable_encoder + json:   {before_rps:8.0f} req/s  ({1e6 / before_rps:7.1f} us/req)")
+    print(f"response_model + orjson:   {after_rps:8.0f} req/s  ({1e6 / after_rps:7.1f} us/req)")
+    print(f"speedup: {after_rps / before_rps:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
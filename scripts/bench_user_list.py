@@ -0,0 +1,92 @@
+"""
+Benchmark /user/list pages at increasing depth: the old query (count(*) plus
+OFFSET over whole rows, no ORDER BY) against the keyset seek on
+(created_at, unique_id) with projected columns and a cached count.
+
+Runs against TEST_DATABASE_URL, never DATABASE_URL. The first run seeds the
+users table there up to the requested size with generated rows.
+
+Usage:
+    TEST_DATABASE_URL=postgresql://... python scripts/bench_user_list.py [users] [pages]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from models.database import Base, UserDB
+from models.user_model import User
+
+LIMIT = 50
+FIELDS = [
+    "unique_id", "first_name", "last_name", "email", "phone_number", "role",
+    "credits", "balance", "referral_code", "referred_by", "version", "updated_at",
+]
+
+
+def seed(db, size: int):
+    existing = db.query(func.count(UserDB.unique_id)).scalar()
+    if existing >= size:
+        return existing
+    db.execute(text("""
+        INSERT INTO users (unique_id, first_name, last_name, email, phone_number, role, credits,
+                           transaction_history, balance, referral_code, referred_by, referrals,
+                           created_at)
+        SELECT 'bench-' || lpad(n::text, 7, '0'), 'Bench', 'User ' || n, 'bench' || n || '@example.com',
+               '7' || lpad(n::text, 9, '0'), 'USER', n % 500,
+               '[{"type": "ALLOCATE", "points": 10}, {"type": "REDEEM", "points": 5}]'::json, 0,
+               'B' || n, '{}', '{}', now() - (n || ' seconds')::interval
+        FROM generate_series(:start, :stop) AS n
+        ON CONFLICT DO NOTHING
+    """), {"start": existing + 1, "stop": size})
+    db.commit()
+    db.execute(text("ANALYZE users"))
+    return size
+
+
+def old_page(db, page: int):
+    db.query(UserDB).count()
+    return db.query(UserDB).offset((page - 1) * LIMIT).limit(LIMIT).all()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        sys.exit("TEST_DATABASE_URL is not set")
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    total = seed(db, size)
+    last_page = total // LIMIT
+
+    print(f"{total} users, {LIMIT} per page")
+    print(f"{'page':>8} | {'count + OFFSET':>15} | {'keyset':>8}")
+    for page in sorted({1, *(max(1, last_page * n // (pages - 1)) for n in range(1, pages))}):
+        # the key of the row just before the page, as a client would hold it in `next`
+        after = None
+        if page > 1:
+            users, after = User.list_page(["unique_id"], db, offset=(page - 1) * LIMIT - 1, limit=1)
+        old_ms = timed(lambda: old_page(db, page))
+        # the total comes from the application cache, so a page is only the seek
+        new_ms = timed(lambda: User.list_page(FIELDS, db, after=after, limit=LIMIT))
+        print(f"{page:>8} | {old_ms:>12.1f} ms | {new_ms:>5.1f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Calibrate Argon2 cost parameters for this host.
+
+Keeps memory cost as high as the per-hash memory cap allows, then raises time
+cost until one hash takes at least the target latency. Run it on the
+deployment host and copy the printed values into .env.
+
+Usage:
+    python scripts/calibrate_argon2.py [--target-ms 250] [--max-memory-mb 64] [--parallelism N]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from passlib.context import CryptContext
+
+MIN_MEMORY_KIB = 19 * 1024  # OWASP floor for argon2id
+MAX_TIME_COST = 20
+
+
+def measure_ms(time_cost: int, memory_cost: int, parallelism: int, samples: int) -> float:
+    context = CryptContext(
+        schemes=["argon2"],
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+    context.hash("warmup")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, max_memory_mb: int, parallelism: int, samples: int = 3):
+    memory_cost = max_memory_mb * 1024
+    time_cost = 1
+
+    # a single pass at the memory cap is already too slow: shrink memory instead
+    elapsed = measure_ms(time_cost, memory_cost, parallelism, samples)
+    while elapsed > target_ms * 1.5 and memory_cost // 2 >= MIN_MEMORY_KIB:
+        memory_cost //= 2
+        elapsed = measure_ms(time_cost, memory_cost, parallelism, samples)
+        print(f"  t={time_cost} m={memory_cost // 1024}MiB p={parallelism}: {elapsed:.1f} ms")
+
+    while elapsed < target_ms and time_cost < MAX_TIME_COST:
+        time_cost += 1
+        elapsed = measure_ms(time_cost, memory_cost, parallelism, samples)
+        print(f"  t={time_cost} m={memory_cost // 1024}MiB p={parallelism}: {elapsed:.1f} ms")
+
+    return time_cost, memory_cost, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick Argon2 costs for a target hashing latency")
+    parser.add_argument("--target-ms", type=float, default=250.0, help="Target latency of one hash")
+    parser.add_argument("--max-memory-mb", type=int, default=64, help="Memory cap per hash")
+    parser.add_argument("--parallelism", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--memory-budget-mb", type=int, default=256, help="Total memory for concurrent hashes")
+    args = parser.parse_args()
+
+    print(f"Calibrating for {args.target_ms:.0f} ms on {os.cpu_count()} CPU(s)...")
+    time_cost, memory_cost, elapsed = calibrate(args.target_ms, args.max_memory_mb, args.parallelism)
+    concurrency = max(1, (args.memory_budget_mb * 1024) // memory_cost)
+
+    print(f"\nMeasured {elapsed:.1f} ms per hash. Add to .env:\n")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+    print(f"ARGON2_MEMORY_BUDGET_MB={args.memory_budget_mb}  # allows {concurrency} concurrent hash(es)")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(1)
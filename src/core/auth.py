@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from dotenv import load_dotenv
+
+from src.core.token import CredentialsException, verify_access_token
+
+load_dotenv()
+
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", 60))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+class VerifiedTokenCache:
+    """
+    LRU cache of access tokens that already passed signature verification.
+    An entry lives for `ttl` seconds but never past the token's own `exp`,
+    so a cached token cannot outlive its expiry. Failed verifications are
+    never cached.
+    """
+
+    def __init__(self, ttl: int = TOKEN_CACHE_TTL_SECONDS, maxsize: int = TOKEN_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(token)
+                    return claims
+                del self._entries[token]
+
+        claims = verify_access_token(token)
+        expires_at = now + self.ttl
+        if claims.get("exp") is not None:
+            expires_at = min(expires_at, claims["exp"])
+
+        with self._lock:
+            self._entries[token] = (claims, expires_at)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = VerifiedTokenCache()
+
+
+async def get_optional_claims(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> Optional[Dict[str, Any]]:
+    """Claims of the bearer token if one was sent, otherwise None."""
+    if credentials is None:
+        return None
+    return token_cache.verify(credentials.credentials)
+
+
+async def get_current_claims(
+    claims: Optional[Dict[str, Any]] = Depends(get_optional_claims),
+) -> Dict[str, Any]:
+    """Claims of the bearer token, rejecting the request if none was sent."""
+    if claims is None:
+        raise CredentialsException()
+    return claims
+
+
+def require_roles(*roles):
+    """Dependency factory allowing only tokens whose role claim is one of `roles`."""
+    allowed = {role.value if hasattr(role, "value") else role for role in roles}
+
+    async def dependency(claims: Dict[str, Any] = Depends(get_current_claims)) -> Dict[str, Any]:
+        if claims["role"] not in allowed:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Unauthorized")
+        return claims
+
+    return dependency
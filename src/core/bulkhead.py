@@ -0,0 +1,52 @@
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+class PoolExhausted(HTTPException):
+    """
+    A bulkhead had no free connection within its checkout timeout. An
+    HTTPException, so controllers that re-raise those turn it into a 503
+    instead of wrapping it in their own 400/500.
+    """
+
+    def __init__(self, bulkhead: str):
+        super().__init__(
+            status_code=503,
+            detail=f"Too many concurrent {bulkhead} requests, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+        self.bulkhead = bulkhead
+
+
+class BulkheadPool(QueuePool):
+    """
+    QueuePool for one class of routes. Each class gets its own engine and
+    pool, so a burst in one (say admin exports) waits on, and times out
+    against, its own connections rather than everyone's.
+    """
+
+    bulkhead = "default"
+    rejected = 0
+    metrics = None  # PoolMetrics, when the engine is instrumented
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.rejected += 1
+            raise PoolExhausted(self.bulkhead)
+        finally:
+            # no pool event fires before a checkout starts waiting, so time it here
+            if self.metrics is not None:
+                self.metrics.checkout_wait.observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool, which must keep its name and metrics
+        pool = super().recreate()
+        pool.bulkhead = self.bulkhead
+        pool.metrics = self.metrics
+        return pool
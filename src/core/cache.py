@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Marks "not in the cache" so a cached None stays distinguishable
+MISSING = object()
+
+
+class MemoryCache:
+    """
+    Per-process LRU with a time-to-live. Expired entries are dropped when
+    they are read; the least recently used entries go past `maxsize`.
+
+    Every backend has the same interface: get (MISSING when absent),
+    set(key, value, ttl=None) where None means the backend's default TTL,
+    delete and clear.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    """
+    Cache shared by every worker through a Redis-compatible server. Values
+    are stored as JSON, so they must be JSON-serializable. Errors count as
+    misses: an outage sends reads to the database instead of failing them.
+    After a failure the server is left alone for a backoff that doubles up
+    to MAX_BACKOFF, and the outage is logged once rather than per call.
+
+    The client is blocking; async callers go through the threadpool (see
+    ReadThroughCache).
+    """
+
+    MIN_BACKOFF = 1.0
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, url: str = None, ttl: float = 60, prefix: str = "cache:", client=None,
+                 clock: Callable[[], float] = time.monotonic):
+        if client is None:
+            import redis  # optional dependency, only needed for a shared backend
+
+            client = redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.clock = clock
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def _call(self, method: Callable, *args, default=None, **kwargs):
+        with self._lock:
+            if self._backoff and self.clock() < self._retry_at:
+                return default
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                if not self._backoff:
+                    logger.warning("Cache backend unreachable, treating reads as misses: %s", e)
+                self._backoff = min(self.MAX_BACKOFF, max(self.MIN_BACKOFF, self._backoff * 2))
+                self._retry_at = self.clock() + self._backoff
+            return default
+        with self._lock:
+            if self._backoff:
+                logger.warning("Cache backend reachable again")
+                self._backoff = 0.0
+        return result
+
+    def get(self, key: str):
+        raw = self._call(self.client.get, self.prefix + key)
+        return MISSING if raw is None else orjson.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        self._call(self.client.set, self.prefix + key, orjson.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def delete(self, key: str):
+        self._call(self.client.delete, self.prefix + key)
+
+    def clear(self):
+        self._call(self._clear)
+
+    def _clear(self):
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+class ReadThroughCache:
+    """
+    Read-through cache in front of `loader(key, *args)`, for async callers.
+    The loader runs in the threadpool, and concurrent misses for one key in a
+    worker await that single load (single-flight). Every invalidation bumps a
+    per-key generation, and a load that overlapped an invalidation is returned
+    to its callers but not stored, so a write can never be shadowed by the
+    value read just before it. Loader results of None are not cached.
+
+    Backends other than MemoryCache block on the network, so their calls run
+    in the threadpool too. An invalidation on the event loop deletes in the
+    background, and the key reads as a miss until the delete is done.
+    """
+
+    def __init__(self, loader: Callable, backend=None):
+        self.loader = loader
+        self.backend = backend if backend is not None else MemoryCache()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generations: Dict[str, int] = {}
+        self._remote = not isinstance(self.backend, MemoryCache)
+        self._deleting: Dict[str, int] = {}  # key -> background deletes not finished yet
+
+    async def _backend_call(self, method: Callable, *args):
+        if self._remote:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def get(self, key: str, *args):
+        with self._lock:
+            deleting = key in self._deleting
+        value = MISSING if deleting else await self._backend_call(self.backend.get, key)
+        if value is not MISSING:
+            self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+            load = self._inflight.get(key)
+            if load is None:
+                load = asyncio.ensure_future(self._load(key, self._generations.get(key, 0), args))
+                self._inflight[key] = load
+            else:
+                self.coalesced += 1
+        # shielded, so a caller that goes away does not cancel the load the others await
+        return await asyncio.shield(load)
+
+    async def _load(self, key: str, generation: int, args: tuple):
+        try:
+            # off the event loop, which keeps serving the requests that will await this load
+            value = await run_in_threadpool(self.loader, key, *args)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is asyncio.current_task():
+                    del self._inflight[key]
+        with self._lock:
+            current = self._generations.get(key, 0) == generation
+        if value is not None and current:
+            await self._backend_call(self.backend.set, key, value)
+        return value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self.invalidations += 1
+            self._generations[key] = self._generations.get(key, 0) + 1
+            # a load already under way no longer matches this generation and will not be stored
+            self._inflight.pop(key, None)
+        loop = _running_loop() if self._remote else None
+        if loop is not None:
+            with self._lock:
+                self._deleting[key] = self._deleting.get(key, 0) + 1
+            loop.run_in_executor(None, self._delete, key)
+        else:
+            self.backend.delete(key)
+
+    def _delete(self, key: str):
+        try:
+            self.backend.delete(key)
+        finally:
+            with self._lock:
+                remaining = self._deleting[key] - 1
+                if remaining:
+                    self._deleting[key] = remaining
+                else:
+                    del self._deleting[key]
+
+    def clear(self):
+        with self._lock:
+            self._generations.clear()
+            self._inflight.clear()
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "backend": type(self.backend).__name__,
+        }
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
@@ -0,0 +1,156 @@
+import os
+import zlib
+from typing import Optional
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+
+from src.core.http_cache import accepts_encoding
+
+try:
+    import brotli  # optional, preferred over gzip when the client accepts it
+except ImportError:
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() != "false"
+# Bodies below this fit in a packet or two and are not worth the CPU
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+# Levels past these buy a few percent fewer bytes for several times the CPU (see scripts/bench_compression.py)
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 5))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4))
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/msgpack",
+    "image/svg+xml",
+)
+
+# Streams whose chunks must reach the client as soon as they are sent
+UNBUFFERED_TYPES = ("text/event-stream",)
+
+
+def skip_compression(endpoint):
+    """Route decorator: never compress this endpoint's responses (e.g. long-lived streams)."""
+    endpoint.skip_compression = True
+    return endpoint
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    if brotli is not None and accepts_encoding(accept_encoding, "br"):
+        return "br"
+    if accepts_encoding(accept_encoding, "gzip"):
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    """Incremental gzip or brotli encoder, flushed per chunk so streamed bodies are not held back."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies with brotli (when installed)
+    or gzip, whichever the client prefers. Skipped for bodies under
+    `minimum_size`, non-text content types, responses that already carry a
+    Content-Encoding (precompressed static and data files), server-sent
+    events, and endpoints marked with `skip_compression`.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE, gzip_level: int = COMPRESSION_GZIP_LEVEL,
+                 brotli_quality: int = COMPRESSION_BROTLI_QUALITY, enabled: bool = COMPRESSION_ENABLED):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                # held back until the first body chunk shows how large the response is
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            if compressor is not None:
+                more_body = message.get("more_body", False)
+                chunk = compressor.compress(message.get("body", b""), final=not more_body)
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=start_message["headers"])
+            if not self._compressible(scope, start_message["status"], headers):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressor = _Compressor(encoding, self.gzip_level, self.brotli_quality)
+            compressed = compressor.compress(body, final=not more_body)
+            if not more_body and len(compressed) >= len(body):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            headers["Content-Encoding"] = encoding
+            if "etag" in headers and not headers["etag"].startswith("W/"):
+                # the compressed bytes are a different representation
+                headers["ETag"] = "W/" + headers["etag"]
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, scope, status: int, headers: MutableHeaders) -> bool:
+        if status < 200 or status in (204, 304) or "content-encoding" in headers:
+            return False
+        endpoint = scope.get("endpoint")
+        if getattr(endpoint, "skip_compression", False):
+            return False
+        content_type = headers.get("content-type", "").lower()
+        if content_type.startswith(UNBUFFERED_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
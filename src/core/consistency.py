@@ -0,0 +1,49 @@
+import os
+import time
+from dotenv import load_dotenv
+from starlette.datastructures import MutableHeaders
+
+load_dotenv()
+
+# After a successful write, the client's reads go to the primary for this many
+# seconds so it sees its own change despite replica lag (0 turns this off)
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+PRIMARY_COOKIE = "read_primary_until"
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+
+def reads_from_primary(cookies) -> bool:
+    """Whether a request carrying these cookies is still inside its read-your-writes window."""
+    try:
+        return int(cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReadYourWritesMiddleware:
+    """
+    Marks clients that just wrote: a non-safe request answered with a status
+    below 400 gets a cookie holding the end of its read-your-writes window,
+    which get_read_db checks before routing the client's reads to a replica.
+    """
+
+    def __init__(self, app, window: int = READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or self.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                until = int(time.time()) + self.window
+                MutableHeaders(scope=message).append(
+                    "set-cookie",
+                    f"{PRIMARY_COOKIE}={until}; Max-Age={self.window}; Path=/; HttpOnly; SameSite=Lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
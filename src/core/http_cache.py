@@ -0,0 +1,114 @@
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli  # optional, adds a br variant next to gzip
+except ImportError:
+    brotli = None
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    candidates = {tag[2:] if tag.startswith("W/") else tag for tag in candidates}
+    return any(etag in candidates for etag in etags)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(headers, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Conditional GET check. If-None-Match wins over If-Modified-Since when both
+    are sent; the date comparison is at the one-second resolution of HTTP dates.
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag[2:] if etag.startswith("W/") else etag)
+    if_modified_since = headers.get("if-modified-since")
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() not in (encoding, "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+class CachedPayload:
+    """
+    A response body serialized once, with its compressed variants (gzip, and
+    brotli when installed) and strong ETags computed up front, so serving it
+    is a dict lookup and a socket write.
+    """
+    __slots__ = ("body", "media_type", "etag", "encoded")
+
+    def __init__(self, body: bytes, media_type: str, compress: bool = True):
+        self.body = body
+        self.media_type = media_type
+        self.etag = make_etag(body)
+        # each content-coding is a different representation and gets its own strong ETag,
+        # listed in order of preference
+        self.encoded: Dict[str, tuple] = {}
+        if not compress:
+            return
+        if brotli is not None:
+            self._add_encoding("br", brotli.compress(body, quality=11))
+        self._add_encoding("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+
+    def _add_encoding(self, name: str, compressed: bytes):
+        if len(compressed) < len(self.body):
+            self.encoded[name] = (compressed, self.etag[:-1] + f'-{name}"')
+
+    def all_etags(self):
+        return (self.etag,) + tuple(etag for _, etag in self.encoded.values())
+
+    def response(self, request: Request, cache_control: str = "no-cache", status_code: int = 200) -> Response:
+        """Full response, or a bodiless 304 when the client's ETag is still current."""
+        body, etag, encoding = self.body, self.etag, None
+        accept_encoding = request.headers.get("accept-encoding")
+        for name, (encoded_body, encoded_etag) in self.encoded.items():
+            if accepts_encoding(accept_encoding, name):
+                body, etag, encoding = encoded_body, encoded_etag, name
+                break
+
+        headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), *self.all_etags()):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=body, status_code=status_code, media_type=self.media_type, headers=headers)
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import uuid
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from sqlalchemy import event, func, select
+
+CHANNEL = "cache_invalidation"
+# NOTIFY payloads must stay under 8000 bytes
+PAYLOAD_LIMIT = 7500
+# session.info key holding the (kind, key) events of the open transaction
+PENDING = "pending_invalidations"
+
+
+class InvalidationBus:
+    """
+    Evicts cached entries in every worker after a database commit.
+
+    Models `track` the ORM classes whose changes make cache entries stale and
+    caches `subscribe` an evict(key) and a reset() per kind of event. Changes
+    collected during a transaction are sent with pg_notify just before it
+    commits, so Postgres delivers them only if the commit succeeds, and are
+    applied to this worker's caches right after it. Every worker runs
+    `listen` to apply the events the other workers publish; after a
+    (re)connect the caches are reset, since events may have been missed.
+    """
+
+    def __init__(self, channel: str = CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex[:12]
+        self.published = 0
+        self.received = 0
+        self._handlers: Dict[str, List[Tuple[Callable, Callable]]] = {}
+        self._tracked: List[Tuple[type, Callable]] = []
+
+    def subscribe(self, kind: str, evict: Callable[[str], None], reset: Callable[[], None]):
+        handlers = self._handlers.setdefault(kind, [])
+        # subscribing again (say, from a restarted lifespan) is a no-op
+        if (evict, reset) not in handlers:
+            handlers.append((evict, reset))
+
+    def track(self, model: type, events: Callable[[object, str], Iterable[Tuple[str, str]]]):
+        """`events(instance, op)` with op "insert", "update" or "delete" yields (kind, key) pairs"""
+        self._tracked.append((model, events))
+
+    def publish(self, session, kind: str, key: str):
+        """
+        Queue an event for changes the ORM cannot see, such as bulk UPDATE and
+        DELETE statements. Call it inside the transaction that made the change.
+        """
+        session.info.setdefault(PENDING, set()).add((kind, key))
+
+    def install(self, target):
+        """Hook a Session class or sessionmaker"""
+        event.listen(target, "after_flush", self._after_flush)
+        event.listen(target, "before_commit", self._before_commit)
+        event.listen(target, "after_commit", self._after_commit)
+        event.listen(target, "after_transaction_end", self._after_transaction_end)
+
+    def dispatch(self, kind: str, key: str):
+        for evict, _ in self._handlers.get(kind, ()):
+            try:
+                evict(key)
+            except Exception as e:
+                print(f"Cache invalidation failed for {kind} {key}: {str(e)}")
+
+    def reset(self):
+        for handlers in self._handlers.values():
+            for _, reset in handlers:
+                try:
+                    reset()
+                except Exception as e:
+                    print(f"Cache reset failed: {str(e)}")
+
+    def _after_flush(self, session, flush_context):
+        if not self._tracked:
+            return
+        pending = session.info.setdefault(PENDING, set())
+        for instances, op in ((session.new, "insert"), (session.dirty, "update"), (session.deleted, "delete")):
+            for instance in instances:
+                if op == "update" and not session.is_modified(instance, include_collections=False):
+                    continue
+                for model, events in self._tracked:
+                    if isinstance(instance, model):
+                        pending.update(events(instance, op))
+
+    def _before_commit(self, session):
+        # flush now so the notification covers everything this commit writes
+        session.flush()
+        pending = session.info.get(PENDING)
+        if not pending or session.get_bind().dialect.name != "postgresql":
+            return
+        connection = session.connection()
+        for payload in self.encode(pending):
+            connection.execute(select(func.pg_notify(self.channel, payload)))
+            self.published += 1
+
+    def _after_commit(self, session):
+        for kind, key in session.info.pop(PENDING, ()):
+            self.dispatch(kind, key)
+
+    def _after_transaction_end(self, session, transaction):
+        # a rollback or close drops the events of the outermost transaction
+        if transaction.parent is None:
+            session.info.pop(PENDING, None)
+
+    def encode(self, events: Iterable[Tuple[str, str]]) -> List[str]:
+        """Compact JSON payloads of at most PAYLOAD_LIMIT bytes each"""
+        payloads, batch, size = [], [], 0
+        for kind, key in sorted(events):
+            item = [kind, key]
+            item_size = len(json.dumps(item).encode("utf-8")) + 1
+            if batch and size + item_size > PAYLOAD_LIMIT:
+                payloads.append(self._payload(batch))
+                batch, size = [], 0
+            batch.append(item)
+            size += item_size
+        if batch:
+            payloads.append(self._payload(batch))
+        return payloads
+
+    def _payload(self, batch: list) -> str:
+        return json.dumps({"o": self.origin, "e": batch}, separators=(",", ":"))
+
+    def receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            return
+        # this worker applied its own events when it committed
+        if message.get("o") == self.origin:
+            return
+        self.received += 1
+        for kind, key in message.get("e", ()):
+            self.dispatch(kind, key)
+
+    async def listen(self, connect: Callable, retry_seconds: float = 5, keepalive_seconds: float = 30):
+        """
+        Background task: LISTEN on a dedicated connection from `connect()` (a
+        psycopg2 connection outside the pool) and apply incoming events. Runs
+        until cancelled, reconnecting after errors.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            conn = None
+            try:
+                conn = connect()
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.channel}")
+                self.reset()
+
+                ready = asyncio.Event()
+                loop.add_reader(conn.fileno(), ready.set)
+                try:
+                    while True:
+                        try:
+                            await asyncio.wait_for(ready.wait(), timeout=keepalive_seconds)
+                        except asyncio.TimeoutError:
+                            # a silent channel and a dead connection look the same
+                            with conn.cursor() as cursor:
+                                cursor.execute("SELECT 1")
+                        ready.clear()
+                        conn.poll()
+                        while conn.notifies:
+                            self.receive(conn.notifies.pop(0).payload)
+                finally:
+                    loop.remove_reader(conn.fileno())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Invalidation listener error: {str(e)}")
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            await asyncio.sleep(retry_seconds)
+
+    def stats(self) -> dict:
+        return {"origin": self.origin, "published": self.published, "received": self.received}
+
+
+# Shared by the application: db.py installs it on the sessionmakers that write, models register what they cache
+invalidations = InvalidationBus()
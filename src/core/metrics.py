@@ -0,0 +1,337 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Sequence
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+
+from src.core.query_counter import DEBUG, track_queries
+
+# Seconds; checkouts normally take microseconds, anything past 10ms means waiting for a connection
+CHECKOUT_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Seconds, for whole requests
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# SQL queries per request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# label for requests no route matched, so scanners probing random paths add one series, not thousands
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds, as Prometheus exposes them."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative, running = {}, 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            running += bucket_count
+            cumulative["+Inf" if bound == float("inf") else str(bound)] = running
+        return {"buckets": cumulative, "sum": round(total, 6), "count": count}
+
+
+class PoolMetrics:
+    """
+    Gauges and counters for one engine's connection pool, fed by pool and
+    engine events. Checkout wait is timed by the pool itself (see
+    BulkheadPool), since no event fires before a checkout starts waiting.
+    """
+
+    COUNTERS = ("connects", "disconnects", "checkouts", "checkins", "invalidations", "pre_ping_failures")
+
+    def __init__(self, name: str, engine, size: int, max_overflow: int, timeout: float):
+        self.name = name
+        self.engine = engine
+        # the configuration the pool was created with, which SQLAlchemy only keeps in private attributes
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.checkout_wait = Histogram(CHECKOUT_WAIT_BUCKETS)
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        # id(connection record) -> time.monotonic() when its DBAPI connection was opened
+        self._opened_at: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def attach(cls, engine, name: str, size: int, max_overflow: int, timeout: float) -> "PoolMetrics":
+        metrics = cls(name, engine, size, max_overflow, timeout)
+        event.listen(engine, "connect", metrics._on_connect)
+        event.listen(engine, "close", metrics._on_close)
+        event.listen(engine, "close_detached", metrics._on_close_detached)
+        event.listen(engine, "checkout", metrics._on_checkout)
+        event.listen(engine, "checkin", metrics._on_checkin)
+        event.listen(engine, "invalidate", metrics._on_invalidate)
+        event.listen(engine, "handle_error", metrics._on_error)
+        engine.pool.metrics = metrics
+        POOL_METRICS[name] = metrics
+        return metrics
+
+    def _count(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _on_connect(self, dbapi_connection, record):
+        self._count("connects")
+        with self._lock:
+            self._opened_at[id(record)] = time.monotonic()
+
+    def _on_close(self, dbapi_connection, record):
+        self._count("disconnects")
+        with self._lock:
+            self._opened_at.pop(id(record), None)
+
+    def _on_close_detached(self, dbapi_connection):
+        self._count("disconnects")
+
+    def _on_checkout(self, dbapi_connection, record, proxy):
+        self._count("checkouts")
+
+    def _on_checkin(self, dbapi_connection, record):
+        self._count("checkins")
+
+    def _on_invalidate(self, dbapi_connection, record, exception):
+        self._count("invalidations")
+
+    def _on_error(self, context):
+        if getattr(context, "is_pre_ping", False):
+            self._count("pre_ping_failures")
+
+    def snapshot(self) -> dict:
+        pool = self.engine.pool
+        now = time.monotonic()
+        with self._lock:
+            ages = [now - opened for opened in self._opened_at.values()]
+            counters = dict(self.counters)
+        return {
+            "size": self.size,
+            "max_overflow": self.max_overflow,
+            "capacity": self.capacity,
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow_in_use": max(pool.overflow(), 0),
+            "timeout": self.timeout,
+            "rejected": getattr(pool, "rejected", 0),
+            **counters,
+            "connection_age": {
+                "open": len(ages),
+                "max": round(max(ages), 3) if ages else None,
+                "mean": round(sum(ages) / len(ages), 3) if ages else None,
+            },
+            "checkout_wait_seconds": self.checkout_wait.snapshot(),
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Connections the pool can hand out at once; a negative max_overflow means no limit on overflow."""
+        return self.size + max(self.max_overflow, 0)
+
+    def saturated(self) -> bool:
+        return self.engine.pool.checkedout() >= self.capacity
+
+
+# name -> PoolMetrics, filled by PoolMetrics.attach
+POOL_METRICS: Dict[str, PoolMetrics] = {}
+
+
+def pool_snapshot() -> dict:
+    return {name: metrics.snapshot() for name, metrics in POOL_METRICS.items()}
+
+
+class RequestMetrics:
+    """
+    Request counts by status, latency histograms and in-flight gauges, keyed
+    by method and route template (/user/{user_id}, never the raw path).
+    """
+
+    def __init__(self, buckets: Sequence[float] = REQUEST_BUCKETS):
+        self.buckets = buckets
+        self.latency: Dict[tuple, Histogram] = {}
+        self.responses: Dict[tuple, int] = defaultdict(int)
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self.queries: Dict[tuple, Histogram] = {}
+        self.db_time: Dict[tuple, Histogram] = {}
+        # requests that ran one statement N_PLUS_ONE_THRESHOLD or more times
+        self.n_plus_one: Dict[tuple, int] = defaultdict(int)
+
+    @staticmethod
+    def _histogram(histograms: dict, key: tuple, buckets: Sequence[float]) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    def observe(self, method: str, route: str, status: int, seconds: float, queries=None):
+        key = (method, route)
+        self._histogram(self.latency, key, self.buckets).observe(seconds)
+        self.responses[(method, route, status)] += 1
+        if queries is not None:
+            self._histogram(self.queries, key, QUERY_COUNT_BUCKETS).observe(queries.count)
+            self._histogram(self.db_time, key, self.buckets).observe(queries.seconds)
+            if queries.repeated():
+                self.n_plus_one[key] += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Times every HTTP request, counts its SQL queries, and records both under
+    the route template the router matched. The router sets scope["route"] on
+    the scope this middleware passed down, so it is there once the app
+    returns. With `debug_headers`, responses also carry X-DB-Query-Count and
+    X-DB-Query-Time (ms) for the queries run before the response started.
+    """
+
+    def __init__(self, app, metrics: "RequestMetrics" = None, debug_headers: bool = DEBUG):
+        self.app = app
+        self.metrics = metrics or request_metrics
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500  # unless the app gets as far as starting a response
+        debug_headers = self.debug_headers
+
+        with track_queries() as queries:
+            async def send_with_status(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if debug_headers:
+                        headers = MutableHeaders(scope=message)
+                        headers["X-DB-Query-Count"] = str(queries.count)
+                        headers["X-DB-Query-Time"] = f"{queries.seconds * 1000:.2f}"
+                await send(message)
+
+            in_flight = self.metrics.in_flight
+            in_flight[method] += 1
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                in_flight[method] -= 1
+                route = _route_label(scope)
+                self.metrics.observe(method, route, status, time.perf_counter() - started, queries)
+                if debug_headers:
+                    for statement, count in queries.repeated().items():
+                        print(f"Possible N+1 in {method} {route}: {count}x {statement}")
+
+
+def _route_label(scope) -> str:
+    route = getattr(scope.get("route"), "path", None)
+    if route:
+        return route
+    # a matched Mount (say /static) sets no route, it only extends root_path by its prefix
+    if "app_root_path" in scope:
+        mount = scope.get("root_path", "")[len(scope["app_root_path"]):]
+        if mount:
+            return mount
+    return UNMATCHED_ROUTE
+
+
+request_metrics = RequestMetrics()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, histogram: Histogram, **labels) -> list:
+    snapshot = histogram.snapshot()
+    lines = [f"{name}_bucket{_labels(**labels, le=le)} {count}" for le, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+
+def render_prometheus(requests: RequestMetrics = None, pools: Dict[str, PoolMetrics] = None) -> str:
+    """Request and pool metrics in the Prometheus text exposition format (version 0.0.4)."""
+    requests = requests or request_metrics
+    pools = POOL_METRICS if pools is None else pools
+    lines = [
+        "# HELP http_requests_total HTTP responses by method, route template and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(requests.responses.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Time to handle a request, by method and route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(requests.latency.items()):
+        lines += _histogram_lines("http_request_duration_seconds", histogram, method=method, route=route)
+
+    lines += [
+        "# HELP http_request_db_queries SQL queries run per request, by method and route template.",
+        "# TYPE http_request_db_queries histogram",
+    ]
+    for (method, route), histogram in sorted(requests.queries.items()):
+        lines += _histogram_lines("http_request_db_queries", histogram, method=method, route=route)
+
+    lines += [
+        "# HELP http_request_db_seconds Time spent in SQL queries per request, by method and route template.",
+        "# TYPE http_request_db_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(requests.db_time.items()):
+        lines += _histogram_lines("http_request_db_seconds", histogram, method=method, route=route)
+
+    lines += [
+        "# HELP http_requests_n_plus_one_total Requests that ran the same statement N_PLUS_ONE_THRESHOLD or more times.",
+        "# TYPE http_requests_n_plus_one_total counter",
+    ]
+    for (method, route), count in sorted(requests.n_plus_one.items()):
+        lines.append(f"http_requests_n_plus_one_total{_labels(method=method, route=route)} {count}")
+
+    lines += [
+        "# HELP http_requests_in_flight Requests being handled right now, by method.",
+        "# TYPE http_requests_in_flight gauge",
+    ]
+    for method, count in sorted(requests.in_flight.items()):
+        lines.append(f"http_requests_in_flight{_labels(method=method)} {count}")
+
+    snapshots = {name: metrics.snapshot() for name, metrics in pools.items()}
+    for key, kind, description in (
+        ("checked_out", "gauge", "Connections checked out of the pool."),
+        ("idle", "gauge", "Connections idle in the pool."),
+        ("overflow_in_use", "gauge", "Connections open beyond pool_size."),
+        ("capacity", "gauge", "pool_size plus max_overflow."),
+        ("rejected", "counter", "Checkouts that timed out and were answered with a 503."),
+        ("pre_ping_failures", "counter", "Connections found dead by pool_pre_ping."),
+        ("invalidations", "counter", "Connections invalidated."),
+        ("connects", "counter", "Connections opened."),
+    ):
+        name = f"db_pool_{key}_total" if kind == "counter" else f"db_pool_{key}"
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        lines += [f"{name}{_labels(pool=pool)} {snapshot[key]}" for pool, snapshot in snapshots.items()]
+
+    lines += [
+        "# HELP db_pool_checkout_wait_seconds Time to check a connection out of the pool.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    for pool, metrics in pools.items():
+        lines += _histogram_lines("db_pool_checkout_wait_seconds", metrics.checkout_wait, pool=pool)
+    return "\n".join(lines) + "\n"
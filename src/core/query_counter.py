@@ -0,0 +1,91 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+# With DEBUG=true every response carries its query count and database time as headers
+DEBUG = os.getenv("DEBUG", "false").lower() == "true"
+# The same statement this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+
+class QueryStats:
+    """Queries run and time spent in the database while one request (or block) was tracked."""
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}
+
+    def repeated(self, threshold: int = N_PLUS_ONE_THRESHOLD) -> dict:
+        """Statements run at least `threshold` times, usually one query per row of an earlier result."""
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+
+_current: ContextVar = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        # executes on one connection never nest, and a failed one is simply overwritten
+        conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.pop("query_started", None)
+    if started is not None:
+        stats.seconds += time.perf_counter() - started
+    stats.count += 1
+    stats.statements[statement] = stats.statements.get(statement, 0) + 1
+
+
+def install(engine):
+    """Count the queries `engine` runs for whichever request is being tracked."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def track_queries():
+    """
+    Collect the queries run inside the block, on any installed engine, into a
+    QueryStats. Nested blocks also count toward the enclosing one, so a test
+    tracking a request sees the queries the middleware tracked for it.
+    """
+    parent = _current.get()
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+        if parent is not None:
+            parent.count += stats.count
+            parent.seconds += stats.seconds
+            for statement, count in stats.statements.items():
+                parent.statements[statement] = parent.statements.get(statement, 0) + count
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    Fail if the block runs more than `limit` queries, for tests that pin an
+    endpoint's query budget:
+
+        with assert_max_queries(4):
+            client.post("/points/allocate", json=...)
+    """
+    with track_queries() as stats:
+        yield stats
+    if stats.count > limit:
+        statements = "\n".join(f"  {count}x {statement}" for statement, count in stats.statements.items())
+        raise AssertionError(f"{stats.count} queries run, at most {limit} expected:\n{statements}")
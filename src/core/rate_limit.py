@@ -0,0 +1,310 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL")
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+
+# Routes with a per-phone limit reject larger bodies with 413, since the phone could not be read
+MAX_INSPECTED_BODY = 16 * 1024
+
+
+class RateLimitRule:
+    """A token bucket of `capacity` tokens refilled over `period` seconds, keyed by `scope`."""
+    __slots__ = ("scope", "capacity", "period", "refill_rate")
+
+    def __init__(self, scope: str, capacity: int, period: float):
+        if scope not in ("ip", "phone", "route"):
+            raise ValueError(f"Unknown rate limit scope: {scope}")
+        self.scope = scope
+        self.capacity = capacity
+        self.period = period
+        self.refill_rate = capacity / period
+
+
+# Rules are checked in order, so a single abusive client runs out of its own
+# tokens before it can drain the route-wide budget.
+RATE_LIMITS: Dict[str, List[RateLimitRule]] = {
+    "/phone/auth": [
+        RateLimitRule("ip", 10, 600),
+        RateLimitRule("phone", 3, 600),
+        RateLimitRule("route", 300, 60),
+    ],
+    "/phone/verify_code": [
+        RateLimitRule("ip", 20, 600),
+        RateLimitRule("phone", 10, 600),
+        RateLimitRule("route", 600, 60),
+    ],
+    "/user/by_email": [
+        RateLimitRule("ip", 60, 60),
+        RateLimitRule("route", 1200, 60),
+    ],
+    "/user/by_phone": [
+        RateLimitRule("ip", 60, 60),
+        RateLimitRule("route", 1200, 60),
+    ],
+}
+
+
+class MemoryBucketStore:
+    """
+    Per-process token buckets. Every decision is a dict lookup plus a little
+    arithmetic; the least recently used buckets are evicted past `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, rule: RateLimitRule, cost: int = 1) -> Tuple[bool, float]:
+        """Take `cost` tokens from the bucket. Returns (allowed, retry_after_seconds)."""
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(rule.capacity), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                tokens = bucket[0] + (now - bucket[1]) * rule.refill_rate
+                bucket[0] = min(float(rule.capacity), tokens)
+                bucket[1] = now
+
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0.0
+            return False, (cost - bucket[0]) / rule.refill_rate
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill and consume in one round-trip so workers never race on a bucket
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every worker through a Redis-compatible server,
+    using the asyncio client so a slow server never blocks the event loop.
+    Falls back to a per-process store if the server cannot be reached, so an
+    outage degrades to per-worker limits instead of failing requests. After a
+    failure the server is left alone for a backoff that doubles up to
+    MAX_BACKOFF, and the outage is logged once rather than per request.
+    """
+
+    MIN_BACKOFF = 1.0
+    MAX_BACKOFF = 60.0
+
+    def __init__(self, url: str = None, prefix: str = "ratelimit:", fallback: Optional[MemoryBucketStore] = None,
+                 client=None, clock: Callable[[], float] = time.monotonic):
+        if client is None:
+            import redis.asyncio  # optional dependency, only needed for a shared backend
+            client = redis.asyncio.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05)
+        self.client = client
+        self.prefix = prefix
+        self.fallback = fallback or MemoryBucketStore()
+        self.clock = clock
+        self._script = self.client.register_script(_REDIS_TOKEN_BUCKET)
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+    async def consume(self, key: str, rule: RateLimitRule, cost: int = 1) -> Tuple[bool, float]:
+        if self._backoff and self.clock() < self._retry_at:
+            return self.fallback.consume(key, rule, cost)
+        try:
+            allowed, tokens = await self._script(
+                keys=[self.prefix + key],
+                args=[rule.capacity, rule.refill_rate, time.time(), cost],
+            )
+        except Exception as e:
+            if not self._backoff:
+                logger.warning("Rate limit backend unreachable, using per-worker buckets: %s", e)
+            self._backoff = min(self.MAX_BACKOFF, max(self.MIN_BACKOFF, self._backoff * 2))
+            self._retry_at = self.clock() + self._backoff
+            return self.fallback.consume(key, rule, cost)
+        if self._backoff:
+            logger.warning("Rate limit backend reachable again")
+            self._backoff = 0.0
+        if int(allowed):
+            return True, 0.0
+        return False, (cost - float(tokens)) / rule.refill_rate
+
+    def reset(self):
+        self.fallback.reset()
+
+
+def create_bucket_store():
+    if RATE_LIMIT_REDIS_URL:
+        return RedisBucketStore(RATE_LIMIT_REDIS_URL)
+    return MemoryBucketStore()
+
+
+def normalize_phone(phone) -> Optional[str]:
+    if phone is None:
+        return None
+    digits = "".join(ch for ch in str(phone) if ch.isdigit())
+    return digits or None
+
+
+def _extract_phone(body: bytes) -> Optional[str]:
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return normalize_phone(data.get("phone_number") or data.get("phone"))
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing the token buckets in RATE_LIMITS. Requests are
+    rejected with 429 before they reach a route handler, so throttled clients
+    never cost a database connection or an SMS.
+    """
+
+    def __init__(self, app, rules: Dict[str, List[RateLimitRule]] = None, store=None,
+                 enabled: bool = RATE_LIMIT_ENABLED, trust_proxy: bool = RATE_LIMIT_TRUST_PROXY):
+        self.app = app
+        self.rules = RATE_LIMITS if rules is None else rules
+        self.store = store or create_bucket_store()
+        # RedisBucketStore.consume is a coroutine, MemoryBucketStore.consume a plain call
+        self._store_is_async = asyncio.iscoroutinefunction(self.store.consume)
+        self.enabled = enabled
+        self.trust_proxy = trust_proxy
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        rules = self.rules.get(path)
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        phone = None
+        if any(rule.scope == "phone" for rule in rules):
+            try:
+                body, receive = await self._buffer_body(receive)
+            except _BodyTooLarge:
+                # otherwise padding the body past the limit would skip the per-phone bucket
+                await self._reject(send, status=413, detail="Request body too large")
+                return
+            if body is not None:
+                phone = _extract_phone(body)
+
+        ip = self._client_ip(scope)
+        for rule in rules:
+            if rule.scope == "ip":
+                key = f"{path}|ip|{ip}"
+            elif rule.scope == "phone":
+                if phone is None:
+                    continue
+                key = f"{path}|phone|{phone}"
+            else:
+                key = f"{path}|route"
+
+            if self._store_is_async:
+                allowed, retry_after = await self.store.consume(key, rule)
+            else:
+                allowed, retry_after = self.store.consume(key, rule)
+            if not allowed:
+                await self._reject(send, retry_after=retry_after)
+                return
+
+        await self.app(scope, receive, send)
+
+    def _client_ip(self, scope) -> str:
+        if self.trust_proxy:
+            for name, value in scope.get("headers", []):
+                if name == b"x-forwarded-for":
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _buffer_body(self, receive):
+        """Read the request body so it can be inspected, then replay it downstream."""
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # client went away, hand the message on untouched
+                return None, _replay([message], receive)
+            chunks.append(message)
+            size += len(message.get("body", b""))
+            more_body = message.get("more_body", False)
+            if size > MAX_INSPECTED_BODY:
+                raise _BodyTooLarge()
+        body = b"".join(chunk.get("body", b"") for chunk in chunks)
+        return body, _replay(chunks, receive)
+
+    async def _reject(self, send, retry_after: float = None, status: int = 429,
+                      detail: str = "Too many requests, please try again later"):
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class _BodyTooLarge(Exception):
+    """The body of a request with a per-phone limit is over MAX_INSPECTED_BODY."""
+
+
+def _replay(messages, receive):
+    pending = list(messages)
+
+    async def replay_receive():
+        if pending:
+            return pending.pop(0)
+        return await receive()
+
+    return replay_receive
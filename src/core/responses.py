@@ -0,0 +1,76 @@
+from contextvars import ContextVar
+from typing import Any, Optional
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+
+try:
+    import msgpack  # optional, without it every client gets JSON
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+# Set per request by NegotiationMiddleware, read when the response body is rendered
+_wants_msgpack: ContextVar[bool] = ContextVar("wants_msgpack", default=False)
+
+
+def _accept_quality(accept: str, media_types, wildcards=()) -> float:
+    best = 0.0
+    for part in accept.lower().split(","):
+        media_range, *params = [item.strip() for item in part.split(";")]
+        if media_range not in media_types and media_range not in wildcards:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        best = max(best, quality)
+    return best
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """True when the client asks for MessagePack at least as strongly as JSON. */* alone means JSON."""
+    if msgpack is None or not accept:
+        return False
+    msgpack_quality = _accept_quality(accept, MSGPACK_MEDIA_TYPES)
+    if msgpack_quality <= 0:
+        return False
+    return msgpack_quality >= _accept_quality(accept, ("application/json",), ("*/*", "application/*"))
+
+
+class NegotiatedResponse(ORJSONResponse):
+    """
+    Default response class: orjson, or MessagePack when the request's Accept
+    header prefers it. Handlers return the same dicts either way.
+    """
+
+    def __init__(self, content: Any, *args, **kwargs):
+        super().__init__(content, *args, **kwargs)
+        self.headers.add_vary_header("Accept")
+
+    def render(self, content: Any) -> bytes:
+        if _wants_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return msgpack.packb(content)
+        return super().render(content)
+
+
+class NegotiationMiddleware:
+    """Records whether the client wants MessagePack for NegotiatedResponse to pick up."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _wants_msgpack.set(wants_msgpack(Headers(scope=scope).get("accept")))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _wants_msgpack.reset(token)
@@ -1,6 +1,36 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", default="argon2")
+load_dotenv()
+
+#Argon2 cost parameters, pick them per host with scripts/calibrate_argon2.py
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+
+#Every running hash holds ARGON2_MEMORY_COST KiB, so the number of hashes allowed
+#at once is derived from a memory budget unless it is set explicitly
+ARGON2_MEMORY_BUDGET_MB = int(os.getenv("ARGON2_MEMORY_BUDGET_MB", 256))
+ARGON2_MAX_CONCURRENCY = int(
+    os.getenv("ARGON2_MAX_CONCURRENCY")
+    or max(1, (ARGON2_MEMORY_BUDGET_MB * 1024) // ARGON2_MEMORY_COST)
+)
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    default="argon2",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+#argon2-cffi releases the GIL, so a small thread pool runs hashes in parallel while
+#its size caps how much memory Argon2 can hold; extra calls wait in the queue
+_hash_executor = ThreadPoolExecutor(max_workers=ARGON2_MAX_CONCURRENCY, thread_name_prefix="argon2")
 
 #Comparing passwd entered with the hashed passwd retrieved from the db
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -8,4 +38,17 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 #Hashing a passwd enterd by user
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context.hash(password)
+
+#True when a stored hash was made with older cost parameters and should be replaced
+def password_needs_rehash(hashed_password: str) -> bool:
+    return pwd_context.needs_update(hashed_password)
+
+#Async versions for request handlers, run on the bounded pool so the event loop never blocks
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
@@ -0,0 +1,77 @@
+import mimetypes
+import os
+from typing import Dict, Optional
+from starlette.requests import Request
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from src.core.http_cache import CachedPayload
+
+# Files above this size are streamed from disk instead of being kept in memory
+MAX_IN_MEMORY_BYTES = 1024 * 1024
+
+# Formats that are already compressed gain nothing from gzip/brotli
+PRECOMPRESSED_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp", "font/woff2", "application/zip")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=300"
+
+
+class InMemoryStaticFiles(StaticFiles):
+    """
+    StaticFiles that loads small files into memory at startup with their
+    gzip/brotli variants and ETags precomputed. Requests are answered without
+    a stat() or open(). Files are fingerprinted by content hash: a URL built
+    with `url_for` carries `?v=<hash>` and is cached as immutable, so a deploy
+    that changes the file changes the URL.
+    """
+
+    def __init__(self, directory: str, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.files: Dict[str, CachedPayload] = {}
+        self.fingerprints: Dict[str, str] = {}
+        self._load(directory)
+
+    def _load(self, directory: str):
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                full_path = os.path.join(root, filename)
+                if os.path.getsize(full_path) > MAX_IN_MEMORY_BYTES:
+                    continue
+                relative = os.path.relpath(full_path, directory).replace(os.sep, "/")
+                media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += "; charset=utf-8"
+                with open(full_path, "rb") as f:
+                    body = f.read()
+                payload = CachedPayload(body, media_type, compress=not media_type.startswith(PRECOMPRESSED_TYPES))
+                self.files[relative] = payload
+                self.fingerprints[relative] = payload.etag.strip('"')[:12]
+
+    def lookup(self, path: str) -> Optional[CachedPayload]:
+        return self.files.get(path.lstrip("/"))
+
+    def url_for(self, path: str, prefix: str = "/static") -> str:
+        """Fingerprinted URL for templates, e.g. /static/css/styles.css?v=1a2b3c4d5e6f."""
+        path = path.lstrip("/")
+        fingerprint = self.fingerprints.get(path)
+        url = f"{prefix}/{path}"
+        return f"{url}?v={fingerprint}" if fingerprint else url
+
+    def serve(self, request: Request, path: str, cache_control: str = DEFAULT_CACHE_CONTROL):
+        payload = self.lookup(path)
+        if payload is None:
+            return None
+        if request.query_params.get("v") == self.fingerprints.get(path.lstrip("/")):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        return payload.response(request, cache_control=cache_control)
+
+    async def get_response(self, path: str, scope: Scope):
+        if scope["method"] in ("GET", "HEAD"):
+            response = self.serve(Request(scope), path.replace(os.sep, "/"))
+            if response is not None:
+                return response
+        return await super().get_response(path, scope)
+
+
+static_files = InMemoryStaticFiles(directory="static")
@@ -87,7 +87,7 @@ def verify_access_token(token: str) -> Dict[str, Any]:
     if user_id is None or role is None:
         raise CredentialsException()
         
-    return {"user_id": user_id, "role": role}
+    return {"user_id": user_id, "role": role, "exp": payload.get("exp")}
 
 def verify_refresh_token(token: str) -> str:
     payload = _decode_token(token)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from src.core import auth
+from src.core.auth import VerifiedTokenCache, get_optional_claims, require_roles
+from src.core.token import create_access_token, CredentialsException
+
+TEST_USER_ID = "test-user-uuid-123"
+
+
+def test_cache_returns_claims_without_reverifying(monkeypatch):
+    """A cached token skips verify_access_token entirely."""
+    cache = VerifiedTokenCache(ttl=60)
+    token = create_access_token(user_id=TEST_USER_ID, role="SALES")
+
+    calls = []
+    real_verify = auth.verify_access_token
+
+    def counting_verify(t):
+        calls.append(t)
+        return real_verify(t)
+
+    monkeypatch.setattr(auth, "verify_access_token", counting_verify)
+
+    first = cache.verify(token)
+    second = cache.verify(token)
+    assert first["user_id"] == TEST_USER_ID
+    assert second["role"] == "SALES"
+    assert len(calls) == 1
+
+
+def test_cache_entry_never_outlives_token_expiry(monkeypatch):
+    cache = VerifiedTokenCache(ttl=3600)
+    token = create_access_token(user_id=TEST_USER_ID, role="USER")
+    claims = cache.verify(token)
+
+    # jump past the token's exp: the entry must be dropped and re-verified
+    monkeypatch.setattr(auth.time, "time", lambda: claims["exp"] + 1)
+    monkeypatch.setattr(auth, "verify_access_token", lambda t: (_ for _ in ()).throw(CredentialsException()))
+    with pytest.raises(CredentialsException):
+        cache.verify(token)
+
+
+def test_invalid_tokens_are_not_cached():
+    cache = VerifiedTokenCache()
+    with pytest.raises(CredentialsException):
+        cache.verify("not-a-token")
+    assert len(cache._entries) == 0
+
+
+def test_cache_is_bounded():
+    cache = VerifiedTokenCache(maxsize=2)
+    for i in range(3):
+        cache.verify(create_access_token(user_id=f"user-{i}", role="USER"))
+    assert len(cache._entries) == 2
+
+
+def test_require_roles_rejects_other_roles():
+    token = create_access_token(user_id=TEST_USER_ID, role="USER")
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    claims = asyncio.run(get_optional_claims(credentials))
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(require_roles("SALES", "ADMIN")(claims))
+    assert exc_info.value.status_code == 403
+
+    assert asyncio.run(require_roles("USER")(claims))["user_id"] == TEST_USER_ID
+
+
+def test_missing_credentials_give_no_claims():
+    assert asyncio.run(get_optional_claims(None)) is None
@@ -0,0 +1,60 @@
+from src.core.bloom import BloomFilter
+from models.contact_filter import ContactFilter
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"user{i}@example.com" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert len(bloom) == 1000
+
+
+def test_bloom_false_positive_rate_is_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"present-{i}")
+
+    false_positives = sum(f"absent-{i}" in bloom for i in range(10000))
+    assert false_positives < 300  # 1% target, generous margin
+
+
+def test_contact_filter_says_maybe_until_built():
+    contacts = ContactFilter(capacity=100)
+    assert contacts.might_have_email("nobody@example.com") is True
+    assert contacts.might_have_phone("0000000000") is True
+
+
+def test_contact_filter_normalizes_lookups():
+    contacts = ContactFilter(capacity=100)
+    contacts.build([("John.Doe@Example.com", "+91 77777 77777"), (None, "1234567890")], total=2)
+
+    assert contacts.might_have_email("  john.doe@example.com ") is True
+    assert contacts.might_have_phone("917777777777") is True
+    assert contacts.might_have_phone("123-456-7890") is True
+    assert contacts.might_have_email("someone.else@example.com") is False
+    assert contacts.might_have_phone("5555555555") is False
+
+
+def test_contact_filter_add_after_build():
+    contacts = ContactFilter(capacity=100)
+    contacts.build([], total=0)
+    assert contacts.might_have_email("new@example.com") is False
+
+    contacts.add("new@example.com", "9999999999")
+    assert contacts.might_have_email("new@example.com") is True
+    assert contacts.might_have_phone("9999999999") is True
+
+
+def test_contact_filter_stale_entries_trigger_rebuild():
+    contacts = ContactFilter(capacity=100)
+    contacts.build([(f"user{i}@example.com", None) for i in range(100)], total=100)
+    assert contacts.needs_rebuild is False
+
+    contacts.note_removed(10)
+    assert contacts.needs_rebuild is True
+
+    contacts.build([], total=0)
+    assert contacts.needs_rebuild is False
@@ -0,0 +1,54 @@
+import sqlite3
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.core.bulkhead import BulkheadPool, PoolExhausted
+
+
+def make_pool(bulkhead="admin"):
+    pool = BulkheadPool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.05)
+    pool.bulkhead = bulkhead
+    return pool
+
+
+def test_exhausted_pool_fails_fast_with_503():
+    pool = make_pool()
+    held = pool.connect()
+    with pytest.raises(PoolExhausted) as error:
+        pool.connect()
+    assert (error.value.status_code, error.value.bulkhead) == (503, "admin")
+    assert pool.rejected == 1
+
+    held.close()
+    pool.connect().close()
+    assert pool.recreate().bulkhead == "admin"
+
+
+def test_pools_are_independent():
+    admin, critical = make_pool("admin"), make_pool("critical")
+    held = admin.connect()
+    critical.connect().close()
+    held.close()
+
+
+def test_controllers_reraising_http_errors_return_503():
+    pool = make_pool()
+    app = FastAPI()
+
+    @app.get("/report")
+    async def report():
+        # the usual controller shape
+        try:
+            pool.connect()
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    held = pool.connect()
+    response = TestClient(app).get("/report")
+    held.close()
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
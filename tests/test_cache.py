@@ -0,0 +1,198 @@
+import asyncio
+import threading
+
+from src.core.cache import MISSING, MemoryCache, ReadThroughCache, RedisCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_cache_expires_and_evicts_lru():
+    clock = FakeClock()
+    cache = MemoryCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is MISSING
+    assert cache.get("c") == 3
+
+    clock.now = 10
+    assert cache.get("a") is MISSING
+
+
+class FakeRedis:
+    """The slice of the redis-py client RedisCache uses, with expiry on a fake clock"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.data = {}
+
+    def get(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= self.clock():
+            del self.data[key]
+            return None
+        return value
+
+    def set(self, key, value, px):
+        self.data[key] = (value, self.clock() + px / 1000)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if key.startswith(match.rstrip("*"))]
+
+
+def test_per_key_ttl_overrides_the_default():
+    clock = FakeClock()
+    for cache in (MemoryCache(ttl=10, clock=clock), RedisCache(ttl=10, client=FakeRedis(clock))):
+        clock.now = 0
+        cache.set("short", 1, ttl=2)
+        cache.set("long", {"rankings": [1, 2]})
+        clock.now = 5
+        assert cache.get("short") is MISSING
+        assert cache.get("long") == {"rankings": [1, 2]}
+        clock.now = 10
+        assert cache.get("long") is MISSING
+
+
+def test_redis_cache_round_trips_json_and_clears_its_prefix():
+    client = FakeRedis(FakeClock())
+    client.data["other:key"] = (b"1", None)
+    cache = RedisCache(ttl=10, prefix="app:", client=client)
+    cache.set("a", {"n": 1})
+    assert client.data["app:a"][0] == b'{"n":1}'
+    cache.delete("a")
+    assert cache.get("a") is MISSING
+    cache.set("b", [1])
+    cache.clear()
+    assert list(client.data) == ["other:key"]
+
+
+def test_read_through_counts_hits_and_misses():
+    loads = []
+
+    def loader(key, db):
+        loads.append(key)
+        return {"id": key} if key != "missing" else None
+
+    async def scenario():
+        cache = ReadThroughCache(loader, MemoryCache())
+        assert await cache.get("u1", None) == {"id": "u1"}
+        assert await cache.get("u1", None) == {"id": "u1"}
+        assert await cache.get("missing", None) is None
+        assert await cache.get("missing", None) is None  # not-found results are not cached
+
+        cache.invalidate("u1")
+        await cache.get("u1", None)
+        return cache.stats()
+
+    stats = asyncio.run(scenario())
+    assert loads == ["u1", "missing", "missing", "u1"]
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 4, 1)
+
+
+def test_concurrent_misses_share_one_load():
+    release = threading.Event()
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        release.wait(5)
+        return {"id": key}
+
+    async def scenario():
+        cache = ReadThroughCache(loader, MemoryCache())
+        requests = [asyncio.create_task(cache.get("u1")) for _ in range(5)]
+        # the loader blocks a pool thread, not the loop, so the other requests get to join it
+        while cache.coalesced < 4:
+            await asyncio.sleep(0.001)
+        requests[0].cancel()  # a client going away does not cancel the shared load
+        release.set()
+        return await asyncio.gather(*requests[1:])
+
+    assert asyncio.run(asyncio.wait_for(scenario(), 5)) == [{"id": "u1"}] * 4
+    assert loads == ["u1"]
+
+
+def test_invalidation_during_a_load_keeps_the_stale_value_out():
+    cache = None
+    versions = iter([1, 2])
+
+    def loader(key):
+        value = {"version": next(versions)}
+        if value["version"] == 1:
+            cache.invalidate(key)  # a write commits while the old row is being read
+        return value
+
+    async def scenario():
+        return [await cache.get("u1") for _ in range(3)]
+
+    cache = ReadThroughCache(loader, MemoryCache())
+    assert asyncio.run(scenario()) == [{"version": 1}, {"version": 2}, {"version": 2}]
+
+
+class FailingRedis:
+    def __init__(self):
+        self.calls = 0
+
+    def get(self, key):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+
+def test_redis_cache_backs_off_after_a_failure(caplog):
+    clock = FakeClock()
+    client = FailingRedis()
+    cache = RedisCache(ttl=10, client=client, clock=clock)
+
+    with caplog.at_level("WARNING", logger="src.core.cache"):
+        assert [cache.get("a") for _ in range(3)] == [MISSING] * 3
+        assert client.calls == 1
+        clock.now += cache.MIN_BACKOFF
+        assert cache.get("a") is MISSING
+    assert client.calls == 2
+    assert len(caplog.records) == 1
+
+
+def test_read_through_keeps_remote_backends_off_the_event_loop():
+    class ThreadRecordingRedis(FakeRedis):
+        def __init__(self, clock):
+            super().__init__(clock)
+            self.threads = []
+
+        def get(self, key):
+            self.threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value, px):
+            self.threads.append(threading.get_ident())
+            super().set(key, value, px)
+
+        def delete(self, key):
+            self.threads.append(threading.get_ident())
+            super().delete(key)
+
+    client = ThreadRecordingRedis(FakeClock())
+    versions = iter([1, 2])
+
+    async def scenario():
+        cache = ReadThroughCache(lambda key: {"version": next(versions)}, RedisCache(ttl=10, client=client))
+        first = await cache.get("u1")
+        cache.invalidate("u1")
+        # the delete may still be running; the key reads as a miss rather than the old value
+        second = await cache.get("u1")
+        while cache._deleting:
+            await asyncio.sleep(0.001)
+        return threading.get_ident(), [first, second]
+
+    loop_thread, values = asyncio.run(scenario())
+    assert values == [{"version": 1}, {"version": 2}]
+    assert client.threads and loop_thread not in client.threads
@@ -0,0 +1,81 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.core import compression
+from src.core.compression import CompressionMiddleware, negotiate_encoding, skip_compression
+
+BIG = [{"id": i, "name": "attendee"} for i in range(200)]
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+
+@app.get("/big")
+async def big():
+    return BIG
+
+
+@app.get("/small")
+async def small():
+    return {"ok": True}
+
+
+@app.get("/opted-out")
+@skip_compression
+async def opted_out():
+    return BIG
+
+
+@app.get("/precompressed")
+async def precompressed():
+    return Response(gzip.compress(b"x" * 2000), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+
+@app.get("/stream")
+async def stream():
+    async def chunks():
+        for i in range(5):
+            yield ("line %d " % i + "y" * 400 + "\n").encode()
+    return StreamingResponse(chunks(), media_type="text/csv")
+
+
+client = TestClient(app)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip, br") == ("br" if compression.brotli else "gzip")
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding(None) is None
+
+
+def test_large_json_is_compressed():
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == BIG
+
+
+def test_small_and_unaccepted_bodies_are_left_alone():
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    plain = client.get("/big", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+
+def test_opt_out_and_existing_encoding_are_respected():
+    assert "content-encoding" not in client.get("/opted-out", headers={"Accept-Encoding": "gzip"}).headers
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"x" * 2000
+
+
+def test_streamed_body_is_compressed_incrementally():
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count("\n") == 5
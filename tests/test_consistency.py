@@ -0,0 +1,37 @@
+import time
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from src.core.consistency import PRIMARY_COOKIE, ReadYourWritesMiddleware, reads_from_primary
+
+app = FastAPI()
+app.add_middleware(ReadYourWritesMiddleware, window=5)
+
+
+@app.get("/read")
+async def read():
+    return {"ok": True}
+
+
+@app.post("/write")
+async def write(fail: bool = False):
+    if fail:
+        raise HTTPException(status_code=400, detail="rejected")
+    return {"ok": True}
+
+
+def test_successful_writes_pin_the_client_to_the_primary():
+    client = TestClient(app)
+    assert PRIMARY_COOKIE not in client.get("/read").cookies
+    assert PRIMARY_COOKIE not in client.post("/write?fail=true").cookies
+
+    until = int(client.post("/write").cookies[PRIMARY_COOKIE])
+    assert 0 < until - time.time() <= 5
+    assert reads_from_primary({PRIMARY_COOKIE: str(until)})
+
+
+def test_expired_or_garbled_cookies_read_from_the_replica():
+    assert not reads_from_primary({})
+    assert not reads_from_primary({PRIMARY_COOKIE: str(int(time.time()) - 1)})
+    assert not reads_from_primary({PRIMARY_COOKIE: "soon"})
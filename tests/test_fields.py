@@ -0,0 +1,103 @@
+import pytest
+
+from models.schemas import UserProfileResponse
+from models.user_model import TRANSACTION_FIELDS, USER_FIELDS, _project, parse_fields
+
+
+def test_parse_fields_keeps_order_and_drops_duplicates():
+    assert parse_fields("credits, balance,credits", USER_FIELDS) == ["credits", "balance"]
+    assert parse_fields("type,points", TRANSACTION_FIELDS) == ["type", "points"]
+
+
+def test_parse_fields_rejects_unknown_or_empty():
+    with pytest.raises(ValueError):
+        parse_fields("credits,password", USER_FIELDS)
+    with pytest.raises(ValueError):
+        parse_fields(" , ", USER_FIELDS)
+
+
+def test_projected_row_uses_to_dict_defaults():
+    fields = ["role", "balance", "referred_by", "transaction_history"]
+    assert _project(fields, ("LEGACY", None, None, None)) == {
+        "role": "USER", "balance": 0, "referred_by": [], "transaction_history": []
+    }
+
+
+def test_sparse_user_serializes_only_requested_fields():
+    body = {"user": {"credits": 20, "email": None}}
+    dumped = UserProfileResponse.model_validate(body).model_dump(mode="json", exclude_unset=True)
+    assert dumped == body
+
+
+def test_batch_keeps_request_order_and_reports_missing(monkeypatch):
+    import asyncio
+    from fastapi import HTTPException
+    from controllers import user_controller
+    from models.user_model import User
+
+    calls = []
+
+    def fake_get_fields_by_ids(unique_ids, fields, db):
+        calls.append((unique_ids, fields))
+        return {uid: {"unique_id": uid, "credits": 1} for uid in unique_ids if uid != "b"}
+
+    monkeypatch.setattr(User, "get_fields_by_ids", staticmethod(fake_get_fields_by_ids))
+    result = asyncio.run(user_controller.get_users_batch("c, a,b,c", None, "credits"))
+    assert [user["unique_id"] for user in result["users"]] == ["c", "a"]
+    assert result["missing"] == ["b"]
+    assert calls == [(["c", "a", "b"], ["credits"])]
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(user_controller.get_users_batch(["x"] * 0, None))
+    assert error.value.status_code == 400
+
+
+def test_cursor_round_trip():
+    from datetime import datetime, timezone
+    from fastapi import HTTPException
+    from controllers.user_controller import decode_cursor, encode_cursor
+
+    updated_at = datetime(2025, 2, 20, 10, 30, 15, 123456, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(updated_at, "u|1")) == (updated_at, "u|1")
+    with pytest.raises(HTTPException):
+        decode_cursor("not-a-cursor")
+
+
+def test_list_users_continues_from_the_cursor(monkeypatch):
+    import asyncio
+    from datetime import datetime, timezone
+    from controllers import user_controller
+    from models.user_model import User
+
+    created_at = datetime(2025, 2, 20, tzinfo=timezone.utc)
+    calls = []
+
+    def fake_list_page(fields, db, after=None, offset=0, limit=10):
+        calls.append((after, offset, limit))
+        return [{"unique_id": "u2"}], (created_at, "u2") if after is None else None
+
+    monkeypatch.setattr(User, "list_page", staticmethod(fake_list_page))
+    first = asyncio.run(user_controller.list_users(limit=1, db=object(), fields="unique_id", count="none"))
+    assert "total" not in first
+    assert first["has_more"] is True
+
+    last = asyncio.run(user_controller.list_users(page=7, limit=1, db=object(), fields="unique_id",
+                                                  cursor=first["next"], count="none"))
+    assert calls == [(None, 0, 1), ((created_at, "u2"), 0, 1)]
+    assert (last["has_more"], last["next"]) == (False, None)
+
+
+def test_list_users_defaults_to_whole_profiles(monkeypatch):
+    import asyncio
+    from controllers import user_controller
+    from models.user_model import User
+
+    selected = []
+
+    def fake_list_page(fields, db, after=None, offset=0, limit=10):
+        selected.extend(fields)
+        return [], None
+
+    monkeypatch.setattr(User, "list_page", staticmethod(fake_list_page))
+    asyncio.run(user_controller.list_users(db=object(), count="none"))
+    assert selected == list(User(first_name="Ada", last_name="Lovelace", referral_code="AB12").to_dict())
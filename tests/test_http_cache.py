@@ -0,0 +1,90 @@
+import gzip
+import json
+from starlette.requests import Request
+
+from datetime import datetime, timezone
+
+from src.core.http_cache import CachedPayload, accepts_encoding, etag_matches, http_date, is_not_modified
+from controllers.data_controller import DataFile
+
+
+def _request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": b""})
+
+
+def test_etag_matches_lists_wildcards_and_weak_tags():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"a"', '"a"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_is_not_modified_prefers_etag_over_date():
+    modified = datetime(2025, 2, 20, 10, 30, 15, 123456, tzinfo=timezone.utc)
+    assert http_date(modified) == "Thu, 20 Feb 2025 10:30:15 GMT"
+
+    assert is_not_modified({"if-none-match": 'W/"3"'}, 'W/"3"', modified)
+    assert not is_not_modified({"if-none-match": 'W/"2"'}, 'W/"3"', modified)
+    assert not is_not_modified({"if-none-match": 'W/"2"', "if-modified-since": http_date(modified)}, 'W/"3"', modified)
+
+    assert is_not_modified({"if-modified-since": http_date(modified)}, 'W/"3"', modified)
+    assert not is_not_modified({"if-modified-since": "Thu, 20 Feb 2025 10:30:14 GMT"}, 'W/"3"', modified)
+    assert not is_not_modified({"if-modified-since": "yesterday"}, 'W/"3"', modified)
+
+
+def test_accepts_encoding_respects_q_values():
+    assert accepts_encoding("gzip, deflate, br", "gzip")
+    assert accepts_encoding("br;q=1.0, gzip;q=0.5", "gzip")
+    assert not accepts_encoding("gzip;q=0", "gzip")
+    assert not accepts_encoding("identity", "gzip")
+    assert not accepts_encoding(None, "gzip")
+
+
+def test_payload_serves_gzip_and_304():
+    body = json.dumps({"events": ["x" * 50] * 20}).encode()
+    payload = CachedPayload(body, "application/json")
+
+    plain = payload.response(_request())
+    assert plain.status_code == 200
+    assert plain.body == body
+    assert plain.headers["etag"] == payload.etag
+
+    compressed = payload.response(_request({"Accept-Encoding": "gzip"}))
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(compressed.body) == body
+    assert compressed.headers["etag"] != payload.etag
+
+    # either representation's ETag revalidates
+    for etag in (plain.headers["etag"], compressed.headers["etag"]):
+        not_modified = payload.response(_request({"If-None-Match": etag}))
+        assert not_modified.status_code == 304
+        assert not_modified.body == b""
+
+
+def test_small_payload_has_no_gzip_variant():
+    payload = CachedPayload(b"{}", "application/json")
+    assert payload.encoded == {}
+    assert "content-encoding" not in payload.response(_request({"Accept-Encoding": "gzip"})).headers
+
+
+def test_data_file_reload_swaps_payload_and_notifies(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text(json.dumps([{"id": "1"}]))
+    data_file = DataFile(str(path))
+
+    seen = []
+    data_file.on_reload(seen.append)
+    old_etag = data_file.payload.etag
+
+    path.write_text(json.dumps([{"id": "1"}, {"id": "2"}]))
+    data_file.load()
+    assert data_file.data == [{"id": "1"}, {"id": "2"}]
+    assert data_file.payload.etag != old_etag
+    assert seen == [[{"id": "1"}], [{"id": "1"}, {"id": "2"}]]
+
+    # a broken write keeps the last good version
+    path.write_text("[{")
+    data_file.load()
+    assert data_file.data == [{"id": "1"}, {"id": "2"}]
@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+
+import pytest
+from sqlalchemy import Column, Integer, String, create_engine, text
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from src.core.invalidation import PAYLOAD_LIMIT, InvalidationBus
+
+Base = declarative_base()
+
+
+class Item(Base):
+    __tablename__ = "items"
+    id = Column(String, primary_key=True)
+    score = Column(Integer, default=0)
+
+
+def make_bus(channel="cache_invalidation_test"):
+    bus = InvalidationBus(channel)
+    evicted = []
+    bus.subscribe("item", evicted.append, evicted.clear)
+    return bus, evicted
+
+
+def test_payloads_are_chunked_and_own_events_ignored():
+    bus, evicted = make_bus()
+    events = {("item", f"id-{n:05d}") for n in range(2000)}
+    payloads = bus.encode(events)
+    assert len(payloads) > 1
+    assert all(len(payload.encode("utf-8")) <= PAYLOAD_LIMIT + 40 for payload in payloads)
+    assert sum(len(json.loads(payload)["e"]) for payload in payloads) == 2000
+
+    bus.receive(payloads[0])
+    assert evicted == []
+
+    other, other_evicted = make_bus()
+    other.receive(payloads[0])
+    assert other_evicted[0] == "id-00000"
+
+
+def test_orm_changes_are_dispatched_after_commit_only():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    bus, evicted = make_bus()
+    bus.install(Session)
+    bus.track(Item, lambda item, op: [("item", f"{op}:{item.id}")])
+
+    with Session() as db:
+        db.add(Item(id="a"))
+        db.commit()
+        assert evicted == ["insert:a"]
+
+        db.get(Item, "a").score = 5
+        db.flush()
+        assert evicted == ["insert:a"]
+        db.rollback()
+        assert evicted == ["insert:a"]
+
+        db.get(Item, "a").score = 5
+        bus.publish(db, "item", "bulk")
+        db.commit()
+        assert sorted(evicted[1:]) == ["bulk", "update:a"]
+
+
+def test_new_contacts_reach_other_workers_filters():
+    from models.contact_filter import ContactFilter
+    from models.database import UserDB
+    from models.user_model import _user_invalidations
+
+    writer = InvalidationBus("cache_invalidation_test")
+    reader = InvalidationBus("cache_invalidation_test")
+    contacts = ContactFilter(capacity=1000)
+    contacts.build([])
+    reader.subscribe("contact", contacts.add_key, contacts.reset)
+    reader.subscribe("contact", contacts.add_key, contacts.reset)
+    assert not contacts.might_have_email("new@example.com")
+
+    user = UserDB(unique_id="u1", first_name="New", email="new@example.com", phone_number="+919876543210")
+    for payload in writer.encode(set(_user_invalidations(user, "insert"))):
+        reader.receive(payload)
+    assert contacts.might_have_email("New@Example.com")
+    assert contacts.might_have_phone("+919876543210")
+    assert len(reader._handlers["contact"]) == 1
+
+    reader.reset()
+    assert contacts.might_have_email("unknown@example.com") and contacts.needs_rebuild
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL")
+def test_events_reach_other_workers_through_postgres():
+    engine = create_engine(os.getenv("TEST_DATABASE_URL"))
+    Session = sessionmaker(bind=engine)
+    writer, _ = make_bus()
+    writer.install(Session)
+    reader, evicted = make_bus()
+
+    def connect():
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        return engine.dialect.connect(*cargs, **cparams)
+
+    async def scenario():
+        listener = asyncio.create_task(reader.listen(connect))
+        while reader.stats()["received"] == 0 and not evicted:
+            with Session() as db:
+                db.execute(text("SELECT 1"))
+                writer.publish(db, "item", "rolled-back")
+                db.rollback()
+                db.execute(text("SELECT 1"))
+                writer.publish(db, "item", "u1")
+                db.commit()
+            await asyncio.sleep(0.1)
+        listener.cancel()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=10))
+    assert "u1" in evicted
+    assert "rolled-back" not in evicted
+    engine.dispose()
+
+
+def test_leaderboard_is_evicted_only_by_changes_that_show_on_it(monkeypatch):
+    from controllers import credit_controller
+    from controllers.credit_controller import evict_leaderboard
+    from models.cache_model import cache
+    from src.core.cache import MISSING
+    from models.user_model import leaderboard_event_key
+
+    monkeypatch.setattr(credit_controller, "LEADERBOARD_SIZE", 2)
+    rankings = [{"id": "b", "name": "B", "credits": 50}, {"id": "d", "name": "D", "credits": 30}]
+
+    def evicted_by(key):
+        cache.set("leaderboard", {"rankings": rankings, "updated_at": 0})
+        evict_leaderboard(key)
+        evicted = cache.get("leaderboard") is MISSING
+        cache.delete("leaderboard")
+        return evicted
+
+    assert evicted_by(leaderboard_event_key("d", 10))       # a listed user changed
+    assert evicted_by(leaderboard_event_key("b"))           # a listed user was deleted
+    assert evicted_by(leaderboard_event_key("x", 31))       # climbs above the cutoff
+    assert evicted_by(leaderboard_event_key("c", 30))       # ties the cutoff, wins on unique_id
+    assert evicted_by("leaderboard")                        # no details
+    assert not evicted_by(leaderboard_event_key("x", 30))   # ties the cutoff, loses on unique_id
+    assert not evicted_by(leaderboard_event_key("x", 5))
+    assert not evicted_by(leaderboard_event_key("x"))
+
+    monkeypatch.setattr(credit_controller, "LEADERBOARD_SIZE", 3)
+    assert evicted_by(leaderboard_event_key("x", 0))        # room left on a short board
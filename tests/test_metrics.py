@@ -0,0 +1,165 @@
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.core.bulkhead import BulkheadPool, PoolExhausted
+from src.core.metrics import (
+    POOL_METRICS,
+    UNMATCHED_ROUTE,
+    Histogram,
+    PoolMetrics,
+    RequestMetrics,
+    RequestMetricsMiddleware,
+    render_prometheus,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        poolclass=BulkheadPool,
+        pool_pre_ping=True,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05
+    )
+    engine.pool.bulkhead = "test"
+    PoolMetrics.attach(engine, "test", size=1, max_overflow=0, timeout=0.05)
+    yield engine
+    POOL_METRICS.pop("test", None)
+    engine.dispose()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.01, 0.1))
+    for value in (0.005, 0.05, 0.05, 3):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.01": 1, "0.1": 3, "+Inf": 4}
+    assert snapshot["count"] == 4
+
+
+def test_pool_gauges_and_counters(engine):
+    metrics = POOL_METRICS["test"]
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        during = metrics.snapshot()
+        assert metrics.saturated()
+        with pytest.raises(PoolExhausted):
+            engine.connect()
+
+    after = metrics.snapshot()
+    assert (during["checked_out"], during["capacity"], during["timeout"]) == (1, 1, 0.05)
+    assert after["checked_out"] == 0 and after["idle"] == 1
+    assert (after["connects"], after["checkouts"], after["checkins"], after["rejected"]) == (1, 1, 1, 1)
+    assert after["connection_age"]["open"] == 1
+    # the rejected checkout waited out its timeout too
+    assert after["checkout_wait_seconds"]["count"] == 2
+    assert after["checkout_wait_seconds"]["sum"] >= 0.05
+    assert not metrics.saturated()
+
+
+def test_pre_ping_failures_are_counted(engine):
+    with engine.connect() as conn:
+        dbapi_connection = conn.connection.dbapi_connection
+    dbapi_connection.close()  # the server dropped it while idle in the pool
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    snapshot = POOL_METRICS["test"].snapshot()
+    assert snapshot["pre_ping_failures"] == 1
+    assert snapshot["invalidations"] == 1
+    assert (snapshot["connects"], snapshot["connection_age"]["open"]) == (2, 1)
+
+
+def test_metrics_survive_dispose(engine):
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert POOL_METRICS["test"].snapshot()["checkouts"] == 1
+    assert engine.pool.metrics is POOL_METRICS["test"]
+
+
+def make_app(metrics):
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+    @app.get("/user/{user_id}")
+    async def profile(user_id: str):
+        if user_id == "boom":
+            raise RuntimeError("boom")
+        if user_id == "missing":
+            raise HTTPException(status_code=404, detail="User not found")
+        return {"user_id": user_id}
+
+    async def static_files(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"body {}"})
+
+    app.mount("/static", static_files)
+    return app
+
+
+def test_requests_are_labelled_by_route_template():
+    metrics = RequestMetrics()
+    client = TestClient(make_app(metrics), raise_server_exceptions=False)
+    for path in ("/user/a", "/user/b", "/user/missing", "/user/boom", "/random/probe"):
+        client.get(path)
+
+    assert dict(metrics.responses) == {
+        ("GET", "/user/{user_id}", 200): 2,
+        ("GET", "/user/{user_id}", 404): 1,
+        ("GET", "/user/{user_id}", 500): 1,
+        ("GET", UNMATCHED_ROUTE, 404): 1,
+    }
+    assert metrics.latency[("GET", "/user/{user_id}")].count == 4
+    assert metrics.in_flight["GET"] == 0
+
+
+def test_mounted_apps_are_labelled_by_their_prefix():
+    metrics = RequestMetrics()
+    client = TestClient(make_app(metrics), root_path="/api")
+    client.get("/static/css/site.css")
+    client.get("/static/favicon.ico")
+    client.get("/nowhere")
+
+    assert dict(metrics.responses) == {("GET", "/static", 200): 2, ("GET", UNMATCHED_ROUTE, 404): 1}
+
+
+def test_prometheus_exposition():
+    metrics = RequestMetrics()
+    TestClient(make_app(metrics)).get("/user/a")
+    text = render_prometheus(metrics, pools={})
+
+    assert text.endswith("\n")
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_requests_total{method="GET",route="/user/{user_id}",status="200"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/user/{user_id}",le="+Inf"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/user/{user_id}"} 1' in text
+
+
+@pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="importing the app needs DATABASE_URL")
+def test_metrics_endpoint_requires_the_token_or_an_admin(monkeypatch):
+    import app as app_module
+    from src.core.token import create_access_token
+
+    client = TestClient(app_module.app)
+
+    def status(authorization=None):
+        headers = {"Authorization": authorization} if authorization else {}
+        return client.get("/metrics", headers=headers).status_code
+
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", None)
+    assert status() == 401
+    assert status("Bearer guess") == 401
+    assert status("Bearer " + create_access_token(user_id="u-1", role="USER")) == 401
+    assert status("Bearer " + create_access_token(user_id="u-1", role="ADMIN")) == 200
+
+    monkeypatch.setattr(app_module, "METRICS_TOKEN", "scrape-token")
+    assert status("Bearer scrape-token") == 200
+    assert status("Bearer scrape-token2") == 401
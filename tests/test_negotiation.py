@@ -0,0 +1,41 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.core.responses import NegotiatedResponse, NegotiationMiddleware, wants_msgpack
+
+msgpack = pytest.importorskip("msgpack")
+
+app = FastAPI(default_response_class=NegotiatedResponse)
+app.add_middleware(NegotiationMiddleware)
+
+PAGE = {"users": [{"unique_id": "u-1", "credits": 30, "referred_by": []}], "total": 1, "has_more": False}
+
+
+@app.get("/page")
+async def page():
+    return PAGE
+
+
+client = TestClient(app)
+
+
+def test_wants_msgpack():
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("application/x-msgpack, application/json;q=0.5")
+    assert not wants_msgpack("application/json, application/msgpack;q=0.5")
+    assert not wants_msgpack("*/*")
+    assert not wants_msgpack(None)
+
+
+def test_json_is_the_default():
+    response = client.get("/page")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == PAGE
+    assert "Accept" in response.headers["vary"]
+
+
+def test_msgpack_from_the_same_handler():
+    response = client.get("/page", headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == PAGE
@@ -1,5 +1,12 @@
+import asyncio
 import pytest
-from src.core.security import get_password_hash, verify_password
+from src.core.security import (
+    get_password_hash,
+    verify_password,
+    hash_password_async,
+    verify_password_async,
+    password_needs_rehash
+)
 
 #checking if password can be hashed and verified
 def test_password_hashing_and_verification():
@@ -29,4 +36,19 @@ def test_incorrect_password_verification():
 def test_hash_is_argon2():
     password = "test_password"
     hashed_password = get_password_hash(password)
-    assert hashed_password.startswith("$argon2id")
\ No newline at end of file
+    assert hashed_password.startswith("$argon2id")
+
+#Async wrappers should give the same results as the sync functions
+def test_async_hash_and_verify():
+    password = "Async$ecret123"
+
+    hashed_password = asyncio.run(hash_password_async(password))
+
+    assert hashed_password.startswith("$argon2id")
+    assert asyncio.run(verify_password_async(password, hashed_password)) == True
+    assert asyncio.run(verify_password_async("WrongPassword", hashed_password)) == False
+
+#Hashes created with the configured parameters should not need a rehash
+def test_fresh_hash_does_not_need_rehash():
+    hashed_password = get_password_hash("test_password")
+    assert password_needs_rehash(hashed_password) == False
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from src.core import query_counter
+from src.core.metrics import RequestMetrics, RequestMetricsMiddleware
+from src.core.query_counter import assert_max_queries, track_queries
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    query_counter.install(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_counts_queries_inside_the_block_only(engine):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with track_queries() as outer:
+            conn.execute(text("SELECT 1"))
+            with track_queries() as inner:
+                for _ in range(5):
+                    conn.execute(text("SELECT 2"))
+
+    assert inner.count == 5 and outer.count == 6
+    assert outer.seconds >= inner.seconds > 0
+    assert list(outer.repeated()) == ["SELECT 2"]
+
+
+def test_assert_max_queries_lists_what_ran(engine):
+    with engine.connect() as conn:
+        with assert_max_queries(2):
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+
+        with pytest.raises(AssertionError, match="3 queries run, at most 2") as error:
+            with assert_max_queries(2):
+                for _ in range(3):
+                    conn.execute(text("SELECT 1"))
+    assert "3x SELECT 1" in str(error.value)
+
+
+def test_debug_headers_and_metrics(engine):
+    metrics = RequestMetrics()
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics, debug_headers=True)
+
+    @app.get("/users")
+    async def users():
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return []
+
+    with assert_max_queries(3):
+        response = TestClient(app).get("/users")
+    assert response.headers["x-db-query-count"] == "3"
+    assert float(response.headers["x-db-query-time"]) >= 0
+    assert metrics.queries[("GET", "/users")].sum == 3
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL")
+def test_allocate_and_redeem_query_budget():
+    from sqlalchemy.orm import sessionmaker
+    from controllers.credit_controller import allocate_points, redeem_points
+    from models.database import Base, UserDB
+
+    engine = create_engine(os.getenv("TEST_DATABASE_URL"))
+    query_counter.install(engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    sales_id, target_id = str(uuid.uuid4()), str(uuid.uuid4())
+    with Session() as db:
+        for unique_id, role, balance in ((sales_id, "SALES", 100), (target_id, "USER", 0)):
+            db.add(UserDB(
+                unique_id=unique_id, first_name="Query", last_name="Budget", email=f"{unique_id}@example.com",
+                phone_number=unique_id[:10], role=role, credits=0, balance=balance, transaction_history=[],
+                referral_code=unique_id[:8], referred_by=[], referrals=[]
+            ))
+        db.commit()
+
+    try:
+        # one locking SELECT, an UPDATE per changed row
+        with Session() as db, assert_max_queries(3):
+            asyncio.run(allocate_points({"current_user_id": sales_id, "target_user_id": target_id, "points": 30}, db))
+        with Session() as db, assert_max_queries(2):
+            asyncio.run(redeem_points({"current_user_id": target_id, "points": 10}, db))
+
+        with Session() as db:
+            sales, target = db.get(UserDB, sales_id), db.get(UserDB, target_id)
+            assert sales.balance == 70
+            assert target.credits == 20
+            assert [entry["type"] for entry in target.transaction_history] == ["ALLOCATE", "REDEEM"]
+    finally:
+        with Session() as db:
+            db.query(UserDB).filter(UserDB.unique_id.in_([sales_id, target_id])).delete(synchronize_session=False)
+            db.commit()
+        engine.dispose()
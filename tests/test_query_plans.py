@@ -0,0 +1,134 @@
+"""
+Fails when a hot query can no longer use an index. Each query is captured
+from the code that issues it, then EXPLAINed with enable_seqscan off: the
+planner still picks a sequential scan when no index fits, whatever the
+table size.
+"""
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, event
+
+pytestmark = pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    from migrations import apply_migrations
+    from models.database import Base
+
+    engine = create_engine(os.getenv("TEST_DATABASE_URL"))
+    Base.metadata.create_all(bind=engine)
+    apply_migrations(engine)
+    yield engine
+    engine.dispose()
+
+
+def captured(engine, run):
+    """The (statement, parameters) `run(db)` sends to the database"""
+    from sqlalchemy.orm import sessionmaker
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with sessionmaker(bind=engine)() as db:
+            run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+
+def seq_scans(engine, statement, parameters) -> list:
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+        conn.rollback()
+    finally:
+        conn.close()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+
+    found, nodes = [], [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan":
+            found.append(node["Relation Name"])
+        nodes.extend(node.get("Plans", ()))
+    return found
+
+
+def _leaderboard(db):
+    from controllers.credit_controller import leaderboard
+    from models.cache_model import cache
+
+    cache.delete("leaderboard")
+    asyncio.run(leaderboard(10, db))
+
+
+def _list_page(db):
+    from models.user_model import User
+
+    User.list_page(["unique_id", "credits"], db, after=(datetime(2025, 1, 1, tzinfo=timezone.utc), "u"), limit=20)
+
+
+def _changes(db):
+    from models.user_model import User
+
+    now = datetime.now(timezone.utc)
+    User.changes_since(["unique_id"], db, now, after=(datetime(2025, 1, 1, tzinfo=timezone.utc), "u"))
+    User.deleted_between(db, datetime(2025, 1, 1, tzinfo=timezone.utc), now)
+
+
+def _top_referrers(db):
+    from models.referral_model import get_top_referrers
+
+    get_top_referrers(10, db)
+
+
+def _staff(db):
+    from controllers.admin_controller import get_all_users
+
+    asyncio.run(get_all_users(db, "admin"))
+
+
+def _lookups(db):
+    from models.user_model import User
+
+    User.get_by_id("u1", db)
+    User.get_fields_by_ids(["u1", "u2"], ["credits"], db)
+
+
+HOT_QUERIES = {
+    "leaderboard": _leaderboard,
+    "user list": _list_page,
+    "changes feed": _changes,
+    "top referrers": _top_referrers,
+    "admin role filter": _staff,
+    "user lookups": _lookups,
+}
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_queries_use_an_index(engine, name):
+    statements = captured(engine, HOT_QUERIES[name])
+    assert statements
+    for statement, parameters in statements:
+        assert seq_scans(engine, statement, parameters) == [], statement
+
+
+def test_cache_expiry_uses_an_index(engine):
+    from models.cache_model import PostgresCache
+
+    cache = PostgresCache(engine)
+    statements = captured(engine, lambda db: (cache.get("missing"), cache.sweep()))
+    for statement, parameters in statements:
+        assert seq_scans(engine, statement, parameters) == [], statement
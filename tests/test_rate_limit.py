@@ -0,0 +1,165 @@
+import asyncio
+import json
+import pytest
+
+from src.core.rate_limit import (
+    MAX_INSPECTED_BODY,
+    MemoryBucketStore,
+    RateLimitMiddleware,
+    RateLimitRule,
+    RedisBucketStore,
+    normalize_phone,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _run(middleware, path, body, client=("10.0.0.1", 1234)):
+    """Send one POST through the middleware and return (status, downstream_calls)."""
+    messages = [{"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": [], "client": client}
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"]
+
+
+def _downstream():
+    calls = []
+
+    async def app(scope, receive, send):
+        message = await receive()
+        calls.append(json.loads(message["body"]))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app, calls
+
+
+def test_bucket_rejects_when_empty_and_refills():
+    clock = FakeClock()
+    store = MemoryBucketStore(clock=clock)
+    rule = RateLimitRule("ip", 2, 10)
+
+    assert store.consume("k", rule) == (True, 0.0)
+    assert store.consume("k", rule) == (True, 0.0)
+    allowed, retry_after = store.consume("k", rule)
+    assert allowed is False
+    assert retry_after == pytest.approx(5.0)
+
+    # half the period refills one token
+    clock.now = 5.0
+    assert store.consume("k", rule)[0] is True
+    assert store.consume("k", rule)[0] is False
+
+
+def test_bucket_store_evicts_least_recently_used():
+    store = MemoryBucketStore(max_keys=2)
+    rule = RateLimitRule("ip", 1, 60)
+    store.consume("a", rule)
+    store.consume("b", rule)
+    store.consume("c", rule)
+
+    # "a" was evicted, so it starts with a full bucket again
+    assert store.consume("a", rule)[0] is True
+    assert store.consume("c", rule)[0] is False
+
+
+def test_unknown_scope_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimitRule("user", 1, 60)
+
+
+def test_normalize_phone():
+    assert normalize_phone("+91 77777-77777") == "917777777777"
+    assert normalize_phone("") is None
+    assert normalize_phone(None) is None
+
+
+def test_middleware_limits_per_phone_and_replays_body():
+    app, calls = _downstream()
+    rules = {"/phone/auth": [RateLimitRule("phone", 1, 600)]}
+    middleware = RateLimitMiddleware(app, rules=rules, store=MemoryBucketStore(), enabled=True)
+
+    assert _run(middleware, "/phone/auth", {"phone_number": "7777777777"}) == 200
+    assert calls == [{"phone_number": "7777777777"}]
+
+    # same phone from a different address is still throttled
+    assert _run(middleware, "/phone/auth", {"phone_number": "777-777-7777"}, client=("10.0.0.2", 1)) == 429
+    assert _run(middleware, "/phone/auth", {"phone_number": "8888888888"}) == 200
+    assert len(calls) == 2
+
+
+def test_middleware_rejects_without_calling_route():
+    app, calls = _downstream()
+    rules = {"/user/by_email": [RateLimitRule("ip", 1, 60)]}
+    middleware = RateLimitMiddleware(app, rules=rules, store=MemoryBucketStore(), enabled=True)
+
+    assert _run(middleware, "/user/by_email", {"email": "a@example.com"}) == 200
+    assert _run(middleware, "/user/by_email", {"email": "b@example.com"}) == 429
+    assert len(calls) == 1
+
+    # unrelated routes are never throttled
+    assert _run(middleware, "/user/add", {"first_name": "A"}) == 200
+
+
+def test_oversized_body_on_phone_route_is_rejected():
+    app, calls = _downstream()
+    middleware = RateLimitMiddleware(app, store=MemoryBucketStore())
+
+    padded = {"phone_number": "+1 555 0100", "padding": "x" * MAX_INSPECTED_BODY}
+    assert _run(middleware, "/phone/auth", padded) == 413
+    assert calls == []
+
+
+class FailingScript:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, keys, args):
+        self.calls += 1
+        raise ConnectionError("redis down")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.script = FailingScript()
+
+    def register_script(self, source):
+        return self.script
+
+
+def test_redis_store_falls_back_and_backs_off(caplog):
+    clock = FakeClock()
+    client = FakeRedis()
+    store = RedisBucketStore(client=client, fallback=MemoryBucketStore(clock=clock), clock=clock)
+    rule = RateLimitRule("ip", 2, 10)
+
+    async def consume_three():
+        return [await store.consume("k", rule) for _ in range(3)]
+
+    with caplog.at_level("WARNING", logger="src.core.rate_limit"):
+        results = asyncio.run(consume_three())
+    assert [allowed for allowed, _ in results] == [True, True, False]
+    # one attempt, then the backoff keeps requests away from the server
+    assert client.script.calls == 1
+    assert len(caplog.records) == 1
+
+    clock.now += store.MIN_BACKOFF
+    with caplog.at_level("WARNING", logger="src.core.rate_limit"):
+        asyncio.run(store.consume("k", rule))
+    assert client.script.calls == 2
+    assert store._backoff == 2 * store.MIN_BACKOFF
+    assert len(caplog.records) == 1
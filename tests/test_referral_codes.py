@@ -0,0 +1,74 @@
+import pytest
+
+from models.referral_code import ALPHABET, ReferralCodeAllocator, encode_referral_code
+
+
+def test_codes_are_unique_across_the_whole_space():
+    # two-character codes keep the full space small enough to enumerate
+    space = len(ALPHABET) ** 2
+    codes = [encode_referral_code(n, min_length=2) for n in range(space)]
+
+    assert len(set(codes)) == space
+    assert all(len(code) == 2 for code in codes)
+    assert all(ch in ALPHABET for code in codes for ch in code)
+
+
+def test_code_length_grows_when_space_is_used_up():
+    space = len(ALPHABET) ** 2
+    assert len(encode_referral_code(space - 1, min_length=2)) == 2
+    assert len(encode_referral_code(space, min_length=2)) == 3
+    assert len(encode_referral_code(space + len(ALPHABET) ** 3, min_length=2)) == 4
+
+
+def test_default_codes_keep_the_legacy_length():
+    assert len(encode_referral_code(0)) == 4
+
+
+def test_consecutive_numbers_do_not_give_consecutive_codes():
+    codes = [encode_referral_code(n) for n in range(10)]
+    assert codes != sorted(codes)
+
+
+def test_negative_numbers_are_rejected():
+    with pytest.raises(ValueError):
+        encode_referral_code(-1)
+
+
+class FakeAllocator(ReferralCodeAllocator):
+    """Reserves blocks from an in-memory counter instead of a Postgres sequence."""
+
+    def __init__(self, block_size, taken=()):
+        super().__init__(block_size)
+        self.next_number = 0
+        self.taken = set(taken)
+        self.reservations = 0
+
+    def _reserve_block(self):
+        self.reservations += 1
+        numbers = range(self.next_number, self.next_number + self.block_size)
+        self.next_number += self.block_size
+        codes = [encode_referral_code(n) for n in numbers]
+        return [code for code in codes if code not in self.taken]
+
+
+def test_allocator_reserves_blocks_and_skips_taken_codes():
+    taken = {encode_referral_code(1)}
+    allocator = FakeAllocator(block_size=3, taken=taken)
+
+    codes = [allocator.allocate() for _ in range(5)]
+
+    assert len(set(codes)) == 5
+    assert not taken & set(codes)
+    assert allocator.reservations == 2
+
+
+def test_building_a_user_does_not_allocate_a_code(monkeypatch):
+    from models import user_model
+
+    allocator = FakeAllocator(block_size=3)
+    monkeypatch.setattr(user_model, "referral_code_allocator", allocator)
+
+    user = user_model.User(first_name="Ada", last_name="Lovelace")
+
+    assert user.referral_code is None
+    assert allocator.reservations == 0
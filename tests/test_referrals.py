@@ -0,0 +1,148 @@
+import asyncio
+import os
+import threading
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+
+pytestmark = pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="needs TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="module")
+def Session():
+    from sqlalchemy.orm import sessionmaker
+    from migrations import apply_migrations
+    from models.database import Base
+
+    engine = create_engine(os.getenv("TEST_DATABASE_URL"))
+    Base.metadata.create_all(bind=engine)
+    apply_migrations(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_users(Session):
+    """make_users(n) inserts n users and returns their ids; they are deleted after the test."""
+    from models.database import UserDB
+
+    created = []
+
+    def make(count):
+        ids = [str(uuid.uuid4()) for _ in range(count)]
+        with Session() as db:
+            for unique_id in ids:
+                db.add(UserDB(
+                    unique_id=unique_id, first_name="Ref", last_name=unique_id[:4],
+                    email=f"{unique_id}@example.com", phone_number=unique_id[:13],
+                    referral_code=unique_id[:12], referred_by=[], referrals=[], transaction_history=[]
+                ))
+            db.commit()
+        created.extend(ids)
+        return ids
+
+    yield make
+    with Session() as db:
+        db.query(UserDB).filter(UserDB.unique_id.in_(created)).delete(synchronize_session=False)
+        db.commit()
+
+
+def refer(Session, referrer_id, referee_ids):
+    from models.referral_model import claim_referral_slot
+
+    claimed = []
+    for referee_id in referee_ids:
+        with Session() as db:
+            claimed.append(claim_referral_slot(referrer_id, referee_id, db))
+            db.commit()
+    return claimed
+
+
+def test_sixth_claim_is_rejected(Session, make_users):
+    from models.database import UserDB
+
+    root, *referees = make_users(7)
+    assert refer(Session, root, referees) == [True] * 5 + [False]
+    with Session() as db:
+        user = db.get(UserDB, root)
+        assert user.referral_count == 5
+        assert user.referrals == referees[:5]
+
+
+def test_concurrent_claims_cannot_both_take_the_last_slot(Session, make_users):
+    from models.referral_model import claim_referral_slot
+
+    root, *referees = make_users(7)
+    refer(Session, root, referees[:4])
+
+    first, second = Session(), Session()
+    results = {}
+    try:
+        results["first"] = claim_referral_slot(root, referees[4], first)
+        # blocks on the row lock the first claim holds until it commits
+        racer = threading.Thread(target=lambda: results.update(second=claim_referral_slot(root, referees[5], second)))
+        racer.start()
+        racer.join(0.3)
+        assert racer.is_alive()
+        first.commit()
+        racer.join(5)
+        second.commit()
+    finally:
+        first.close()
+        second.close()
+    assert results == {"first": True, "second": False}
+
+
+def test_tree_stops_at_depth_and_survives_cycles(Session, make_users):
+    from models.database import ReferralEdgeDB
+    from models.referral_model import get_referral_tree
+
+    root, a, b, c = make_users(4)
+    refer(Session, root, [a])
+    refer(Session, a, [b])
+    refer(Session, b, [c])
+    with Session() as db:
+        # c "referred" root: root -> a -> b -> c -> root
+        db.add(ReferralEdgeDB(referee_id=root, referrer_id=c))
+        db.commit()
+
+        shallow = get_referral_tree(root, 2, db)
+        assert [node["id"] for node in shallow] == [a]
+        assert [node["id"] for node in shallow[0]["referrals"]] == [b]
+        assert shallow[0]["referrals"][0]["referrals"] == []
+
+        deep = get_referral_tree(root, 10, db)
+        assert deep[0]["referrals"][0]["referrals"][0]["id"] == c
+        assert deep[0]["referrals"][0]["referrals"][0]["referrals"] == []
+
+
+def test_level_counts_and_top_referrers(Session, make_users):
+    from models.referral_model import get_referral_level_counts, get_top_referrers
+
+    root, a, b, c, d = make_users(5)
+    refer(Session, root, [a, b])
+    refer(Session, a, [c, d])
+    with Session() as db:
+        assert get_referral_level_counts(root, 5, db) == {1: 2, 2: 2}
+        assert get_referral_level_counts(root, 1, db) == {1: 2}
+
+        ours = [entry for entry in get_top_referrers(10000, db) if entry["id"] in (root, a, b, c, d)]
+        assert [(entry["id"], entry["referral_count"]) for entry in ours] == sorted(
+            [(root, 2), (a, 2)], key=lambda pair: pair[0]
+        )
+
+
+def test_deleting_a_referee_releases_the_slot(Session, make_users):
+    from controllers.user_controller import delete_profile
+    from models.database import ReferralEdgeDB, UserDB
+
+    root, a, b = make_users(3)
+    refer(Session, root, [a, b])
+    with Session() as db:
+        asyncio.run(delete_profile({"unique_id": a}, db))
+
+    with Session() as db:
+        user = db.get(UserDB, root)
+        assert (user.referral_count, user.referrals) == (1, [b])
+        assert db.get(ReferralEdgeDB, a) is None
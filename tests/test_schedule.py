@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+from models.schedule_model import DaySchedule, ScheduleIndex, parse_time, parse_time_range
+from controllers.data_controller import query_schedule
+
+EVENTS = [
+    {"name": "Inauguration", "time": "10:00 AM - 11:00 AM"},
+    {"name": "Decibel", "time": "11:00 AM - 3:00 PM"},
+    {"name": "Talk", "time": "4:00 PM - 6:00 PM"},
+    {"name": "Showcase", "time": "11:00 AM - 3:00 PM"},
+    {"name": "Lunch", "time": "12 Noon"},
+    {"name": "Finale", "time": "6:00 PM"},
+    {"name": "Surprise", "time": "TBA"},
+]
+
+
+def test_parse_time_formats():
+    assert parse_time("10:00 AM") == 600
+    assert parse_time("4 PM") == 960
+    assert parse_time("12:30 AM") == 30
+    assert parse_time("12 Noon") == 720
+    assert parse_time("16:30") == 990
+    assert parse_time("25:00") is None
+    assert parse_time("TBA") is None
+
+
+def test_parse_time_range_defaults_lone_times():
+    assert parse_time_range("11:00 AM - 3:00 PM") == (660, 900)
+    assert parse_time_range("6:00 PM") == (1080, 1140)
+    assert parse_time_range("") == (None, None)
+
+
+def test_happening_now():
+    day = DaySchedule(EVENTS)
+    assert [e["name"] for e in day.at(630)] == ["Inauguration"]
+    assert [e["name"] for e in day.at(725)] == ["Decibel", "Showcase", "Lunch"]
+    # end times are exclusive
+    assert [e["name"] for e in day.at(660)] == ["Decibel", "Showcase"]
+    assert day.at(540) == []
+    assert day.at(23 * 60) == []
+
+
+def test_next_events_are_in_start_order():
+    day = DaySchedule(EVENTS)
+    assert [e["name"] for e in day.next(600, 3)] == ["Decibel", "Showcase", "Lunch"]
+    assert [e["name"] for e in day.next(1000, 5)] == ["Finale"]
+
+
+def test_day_listing_is_sorted_with_untimed_last():
+    day = DaySchedule(EVENTS)
+    assert [e["name"] for e in day.events][-1] == "Surprise"
+    assert day.events[0]["start"] == "10:00"
+    assert day.events[0]["end"] == "11:00"
+
+
+def test_find_day_is_lenient():
+    index = ScheduleIndex()
+    index.rebuild({"Day 1": EVENTS, "Day 2": []})
+    assert index.find_day("day 1") == "Day 1"
+    assert index.find_day("2") == "Day 2"
+    assert index.find_day("Day 9") is None
+
+
+def test_query_schedule_against_data_file():
+    result = asyncio.run(query_schedule(day="Day 1", at="10:30 AM", next=2))
+    assert result["day"] == "Day 1"
+    assert result["at"] == "10:30"
+    assert all(e["start"] <= "10:30" < e["end"] for e in result["happening_now"])
+    assert len(result["up_next"]) == 2
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(query_schedule(day="Day 1", at="later"))
+    assert exc_info.value.status_code == 400
+
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(query_schedule(day="Day 42"))
+    assert exc_info.value.status_code == 404
@@ -0,0 +1,25 @@
+from models.schemas import LeaderboardResponse, UserProfileResponse
+from models.user_model import User
+
+
+def test_user_response_matches_to_dict():
+    user = User(
+        first_name="Ada",
+        last_name=None,
+        unique_id="u-1",
+        email="ada@example.com",
+        phone_number="9800000000",
+        is_sales=True,
+        credits=30,
+        transaction_history=[{"transaction_id": "t-1", "type": "ALLOCATE", "points": 30, "metadata": {}}],
+        referral_code="AB12",
+    )
+    body = {"user": user.to_dict()}
+    # routes serialize with response_model_exclude_unset
+    assert UserProfileResponse.model_validate(body).model_dump(mode="json", exclude_unset=True) == body
+
+
+def test_leaderboard_response_omits_unset_fields():
+    cached = {"data": [{"id": "u-1", "name": "Ada", "credits": 30}], "count": 1, "cached": True, "cache_age": 5}
+    dumped = LeaderboardResponse.model_validate(cached).model_dump(mode="json", exclude_none=True)
+    assert dumped == cached
@@ -0,0 +1,49 @@
+from starlette.requests import Request
+
+from src.core.static_files import IMMUTABLE_CACHE_CONTROL, InMemoryStaticFiles
+
+
+def _request(query_string=b"", headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw, "query_string": query_string})
+
+
+def _static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "styles.css").write_text("body { color: black; }\n" * 50)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(200))
+    return InMemoryStaticFiles(directory=str(tmp_path))
+
+
+def test_url_for_fingerprints_known_files(tmp_path):
+    static = _static_dir(tmp_path)
+    url = static.url_for("css/styles.css")
+    assert url == f"/static/css/styles.css?v={static.fingerprints['css/styles.css']}"
+    assert static.url_for("missing.js") == "/static/missing.js"
+
+
+def test_fingerprinted_request_is_immutable(tmp_path):
+    static = _static_dir(tmp_path)
+    fingerprint = static.fingerprints["css/styles.css"]
+
+    response = static.serve(_request(f"v={fingerprint}".encode()), "css/styles.css")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    stale = static.serve(_request(b"v=0000"), "css/styles.css")
+    assert stale.headers["cache-control"] != IMMUTABLE_CACHE_CONTROL
+
+
+def test_serves_precompressed_variants(tmp_path):
+    static = _static_dir(tmp_path)
+    response = static.serve(_request(headers={"Accept-Encoding": "gzip"}), "css/styles.css")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+
+    # images are already compressed
+    image = static.serve(_request(headers={"Accept-Encoding": "gzip, br"}), "logo.png")
+    assert "content-encoding" not in image.headers
+
+
+def test_unknown_path_is_not_served_from_memory(tmp_path):
+    static = _static_dir(tmp_path)
+    assert static.serve(_request(), "nope.css") is None